@@ -0,0 +1,213 @@
+"""
+Headless benchmarks for template loading, actor construction and appearance changes.
+
+Runs on synthetic assets (see SyntheticAssets) with a null or offscreen window, and writes the results as JSON so that
+runs can be compared:
+
+    python -m benchmarks.ActorBenchmark --output before.json
+    python -m benchmarks.ActorBenchmark --output after.json --compare before.json
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from typing import Callable
+
+from panda3d.core import loadPrcFileData, getModelPath, Filename, PandaSystem
+
+
+def timeIt(func: Callable[[], object], repeat: int) -> dict[str, float]:
+    """
+    Calls func repeat times.
+    :return: The mean, median, min and max time of a call, in milliseconds
+    """
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append((time.perf_counter() - start) * 1000)
+    return {"mean": statistics.fmean(times), "median": statistics.median(times), "min": min(times), "max": max(times)}
+
+
+def residentMemory() -> int:
+    """
+    :return: The resident memory of the process in bytes. Only available on Linux, 0 elsewhere.
+    """
+    try:
+        with open("/proc/self/statm") as file:
+            return int(file.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        return 0
+
+
+def countNodes(root) -> int:
+    """
+    :return: The amount of distinct nodes below root, counting instanced nodes once
+    """
+    seen = set()
+    stack = [root.node()]
+    while stack:
+        node = stack.pop()
+        if node.this in seen:
+            continue
+        seen.add(node.this)
+        stack.extend(node.getChildren())
+    return len(seen)
+
+
+def run(args: argparse.Namespace) -> dict:
+    loadPrcFileData("", f"window-type {args.window_type}\naudio-library-name null\nnotify-level-egg error\n"
+                        f"notify-level-Actor error\nnotify-level-device fatal")
+
+    from direct.showbase.ShowBase import ShowBase
+    from benchmarks.SyntheticAssets import SyntheticAssets
+
+    assetDir = args.assets or tempfile.mkdtemp(prefix="toontown_utils_bench_")
+    assets = SyntheticAssets(assetDir, trianglesPerPart=args.triangles)
+    if not os.path.exists(assets.cogFile):
+        assets.generate()
+
+    base = ShowBase()
+    getModelPath().prependDirectory(Filename.fromOsSpecific(assetDir))
+
+    from toontown_utils import TemplateManager
+    from toontown_utils.cog import CogGlobals
+    from toontown_utils.cog.CogActor import CogActor
+    from toontown_utils.toon.ToonActor import ToonActor
+
+    CogGlobals.healthMeterModel = assets.healthMeterModel
+    CogGlobals.healthMeterGlowModel = assets.healthMeterGlowModel
+    CogGlobals.waiterLeg, CogGlobals.waiterBlazer, CogGlobals.waiterSleeve = assets.waiterTextures
+
+    repeat = args.repeat
+    results: dict[str, dict] = {}
+
+    results["TemplateManager.loadFile/cog"] = timeIt(lambda: TemplateManager.loadFile(assets.cogFile), repeat)
+    results["TemplateManager.loadFile/toon"] = timeIt(lambda: TemplateManager.loadFile(assets.toonFile), repeat)
+
+    # the first actor of each kind pays for the disk loads, the rest show the steady state
+    for body in sorted(TemplateManager.Bodies):
+        cogName = next(name for name, cog in TemplateManager.Cogs.items() if cog.body == TemplateManager.Bodies[body])
+        results[f"CogActor/first/{body}"] = timeIt(lambda: CogActor(cogName).cleanup(), 1)
+        results[f"CogActor/{body}"] = timeIt(lambda: CogActor(cogName).cleanup(), repeat)
+    for species, speciesType in sorted(TemplateManager.Species.items()):
+        for head in sorted(speciesType.heads):
+            results[f"ToonActor/first/{species}/{head}"] = timeIt(
+                lambda: ToonActor(species, head, "m", "m", eyelashes=True).cleanup(), 1)
+            results[f"ToonActor/{species}/{head}"] = timeIt(
+                lambda: ToonActor(species, head, "m", "m", eyelashes=True).cleanup(), repeat)
+
+    cogName = next(iter(TemplateManager.Cogs))
+    dept = TemplateManager.Cogs[cogName].department
+    cog = CogActor(cogName)
+    cog.reparentTo(base.render)
+
+    def loseCycle():
+        cog.becomeLoseActor()
+        cog.becomeNormalActor()
+
+    def skelecogCycle():
+        cog.setSkelecog(True)
+        cog.setSkelecog(False)
+
+    results["CogActor.becomeLoseActor+becomeNormalActor"] = timeIt(loseCycle, repeat)
+    results["CogActor.setSkelecog"] = timeIt(skelecogCycle, repeat)
+    cog.prepareVariants()
+    results["CogActor.becomeLoseActor+becomeNormalActor/keepVariants"] = timeIt(loseCycle, repeat)
+    results["CogActor.setSkelecog/keepVariants"] = timeIt(skelecogCycle, repeat)
+    results["CogActor.setDepartmentTextures"] = timeIt(lambda: cog.setDepartmentTextures(dept), repeat)
+    results["CogActor.makeWaiter"] = timeIt(cog.makeWaiter, repeat)
+    results["CogActor.setGloveColor"] = timeIt(lambda: cog.setGloveColor((1, 0, 0, 1)), repeat)
+    results["CogActor.setHeadColor"] = timeIt(lambda: cog.setHeadColor((1, 0, 0, 1)), repeat)
+    cog.cleanup()
+
+    toon = ToonActor("cat", "ls", "m", "m", eyelashes=True)
+    toon.reparentTo(base.render)
+    results["ToonActor.setHeadColor"] = timeIt(lambda: toon.setHeadColor((1, 0, 0, 1)), repeat)
+    results["ToonActor.setLegsColor"] = timeIt(lambda: toon.setLegsColor((1, 0, 0, 1)), repeat)
+    results["ToonActor.setTorsoColor"] = timeIt(lambda: toon.setTorsoColor((1, 0, 0, 1)), repeat)
+    results["ToonActor.setTopTexture"] = timeIt(lambda: toon.setTopTexture("shirt.png"), repeat)
+    results["ToonActor.showMuzzle"] = timeIt(lambda: toon.showMuzzle("laugh"), repeat)
+    toon.cleanup()
+
+    memory: dict[str, dict] = {}
+    for kind, build in (("CogActor", lambda: CogActor(cogName)),
+                        ("ToonActor", lambda: ToonActor("cat", "ls", "m", "m", eyelashes=True))):
+        gc.collect()
+        before = residentMemory()
+        actors = [build() for _ in range(args.actors)]
+        for actor in actors:
+            actor.reparentTo(base.render)
+            actor.loop("neutral")
+        base.taskMgr.step()
+        gc.collect()
+        memory[kind] = {"bytesPerActor": (residentMemory() - before) / args.actors,
+                        "nodesPerActor": countNodes(actors[0])}
+        for actor in actors:
+            actor.cleanup()
+
+    base.destroy()
+    return {
+        "meta": {
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": sys.version.split()[0],
+            "panda3d": PandaSystem.getVersionString(),
+            "platform": platform.platform(),
+            "windowType": args.window_type,
+            "repeat": repeat,
+            "actors": args.actors,
+            "trianglesPerPart": args.triangles,
+        },
+        "timings": results,
+        "memory": memory,
+    }
+
+
+def compare(current: dict, previous: dict) -> None:
+    print(f"{'benchmark':60} {'before ms':>10} {'after ms':>10} {'change':>8}")
+    for name, timing in current["timings"].items():
+        old = previous.get("timings", {}).get(name)
+        if old is None:
+            print(f"{name:60} {'':>10} {timing['median']:>10.3f}")
+            continue
+        change = (timing["median"] / old["median"] - 1) * 100 if old["median"] else 0
+        print(f"{name:60} {old['median']:>10.3f} {timing['median']:>10.3f} {change:>+7.1f}%")
+    for kind, stats in current["memory"].items():
+        old = previous.get("memory", {}).get(kind)
+        if old is not None:
+            print(f"{kind + ' bytes/actor':60} {old['bytesPerActor']:>10.0f} {stats['bytesPerActor']:>10.0f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    parser.add_argument("--compare", help="Compare the results against a previous JSON file")
+    parser.add_argument("--assets", help="Directory of generated assets to reuse (generated if missing)")
+    parser.add_argument("--repeat", type=int, default=50, help="Iterations per timing")
+    parser.add_argument("--actors", type=int, default=50, help="Actors built for the memory measurement")
+    parser.add_argument("--triangles", type=int, default=64, help="Triangles per synthetic model part")
+    parser.add_argument("--window-type", default="none", choices=("none", "offscreen"))
+    args = parser.parse_args()
+
+    results = run(args)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(results, file, indent=2)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as file:
+            compare(results, json.load(file))
+    else:
+        for name, timing in results["timings"].items():
+            print(f"{name:60} {timing['median']:>10.3f} ms")
+        for kind, stats in results["memory"].items():
+            print(f"{kind:60} {stats['bytesPerActor']:>10.0f} bytes/actor, {stats['nodesPerActor']} nodes")
+
+
+if __name__ == "__main__":
+    main()
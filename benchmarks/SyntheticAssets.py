@@ -0,0 +1,206 @@
+"""
+Generates small synthetic cog and toon assets, plus matching ToontownJSON files, so that the benchmarks can run
+without the original game files.
+Characters are written as egg files, loaded, and saved as bam files with one named GeomNode per part, like the
+original models. Animations are egg files, textures are png files.
+"""
+import json
+import os
+
+from panda3d.core import (NodePath, Loader, LoaderOptions, Filename, GeomNode, PNMImage, loadPrcFileData)
+
+# keep the parts of a character in separate Geoms so they can be split into named nodes
+loadPrcFileData("", "egg-flatten 0")
+
+COG_JOINTS = ["joint_root", "joint_attachMeter", "joint_head"]
+LEG_JOINTS = ["joint_legroot", "joint_hips"]
+TORSO_JOINTS = ["joint_torsoroot", "def_head"]
+HEAD_JOINTS = ["joint_headroot"]
+
+DEPARTMENTS = {"s": "SalesIcon", "m": "MoneyIcon", "l": "LegalIcon", "c": "CorpIcon"}
+BODIES = ("a", "b", "c")
+COG_ANIMS = ("neutral", "walk", "lose")
+TOON_SIZES = ("s", "m", "l")
+TOON_ANIMS = ("neutral", "run")
+HEAD_PARTS = ["head-short", "head-long", "ears-short", "ears-long", "eyes", "pupil_L", "pupil_R",
+              "muzzle-neutral", "muzzle-laugh", "muzzle-angry", "lashes-closed", "lashes-open"]
+
+
+class SyntheticAssets:
+    def __init__(self, outDir: str, trianglesPerPart: int = 64, animFrames: int = 24) -> None:
+        """
+        :param outDir: The directory to write the assets to
+        :param trianglesPerPart: Size of each model part
+        :param animFrames: Length of each animation
+        """
+        self.outDir = outDir
+        self.trianglesPerPart = trianglesPerPart
+        self.animFrames = animFrames
+
+        self.cogFile = os.path.join(outDir, "cog.json")
+        self.toonFile = os.path.join(outDir, "toon.json")
+        self.healthMeterModel = "matching_game_gui.egg"
+        self.healthMeterGlowModel = "glow.egg"
+        self.waiterTextures = ("waiter_m_leg.png", "waiter_m_blazer.png", "waiter_m_sleeve.png")
+
+    def generate(self) -> None:
+        os.makedirs(self.outDir, exist_ok=True)
+        self._generateCogs()
+        self._generateToons()
+
+    def _generateCogs(self) -> None:
+        for body in BODIES:
+            self._character(f"cog{body}", ["legs", "torso", "arms", "hands", "tie"], COG_JOINTS)
+            self._character(f"cog{body}_lose", ["legs", "torso", "arms", "hands"], COG_JOINTS)
+            self._character(f"skel{body}", ["tie", "bones"], COG_JOINTS)
+            self._character(f"skel{body}_lose", ["tie", "bones"], COG_JOINTS)
+            self._static(f"heads{body}.egg", [f"head{body}{i}" for i in range(6)])
+            for anim in COG_ANIMS:
+                self._anim(f"cog{body}-{anim}.egg", COG_JOINTS)
+
+        self._static("medallions.egg", list(DEPARTMENTS.values()))
+        self._static(self.healthMeterModel, ["minnieCircle", "other"])
+        self._static(self.healthMeterGlowModel, ["glowCard"])
+        for i, dept in enumerate(DEPARTMENTS):
+            for part in ("blazer", "leg", "sleeve", "tie"):
+                self._texture(f"{dept}_{part}.png", i / len(DEPARTMENTS), 0.5, 0.5)
+        for tex in self.waiterTextures:
+            self._texture(tex, 0.1, 0.1, 0.1)
+        self._texture("headtex.png", 1, 0, 0)
+
+        departments = {}
+        for dept, icon in DEPARTMENTS.items():
+            departments[dept] = {
+                "blazer": f"{dept}_blazer.png", "leg": f"{dept}_leg.png",
+                "sleeve": f"{dept}_sleeve.png", "tie": f"{dept}_tie.png",
+                "medallion": {"model": "medallions.egg", "part": icon, "color": [0.5, 0.5, 0.5]},
+                "gloveColor": [0.9, 0.3, 0.3]
+            }
+        bodies = {}
+        for body in BODIES:
+            bodies[body] = {
+                "model": f"cog{body}.bam", "headsModel": f"heads{body}.egg", "loseModel": f"cog{body}_lose.bam",
+                "skelecog": {"model": f"skel{body}.bam", "loseModel": f"skel{body}_lose.bam"},
+                "animations": {anim: f"cog{body}-{anim}.egg" for anim in COG_ANIMS},
+                "sizeFactor": 5
+            }
+        cogs = {}
+        for dept in DEPARTMENTS:
+            for body in BODIES:
+                for head in range(2):
+                    cogs[f"{dept}{body}{head}"] = {
+                        "department": dept, "body": body, "size": 4 + head, "head": f"head{body}{head}",
+                        "head2": f"head{body}{head + 2}" if head else None,
+                        "headTexture": "headtex.png" if head else None
+                    }
+        self._json(self.cogFile, {"$schema": "cogschema.json", "departments": departments, "bodies": bodies,
+                                  "cogs": cogs})
+
+    def _generateToons(self) -> None:
+        for size in TOON_SIZES:
+            self._character(f"legs_{size}", ["legs", "feet", "shoes", "boots_short", "boots_long"], LEG_JOINTS)
+            self._character(f"torso_{size}", ["arms", "neck", "hands", "torso-top", "sleeves", "torso-bot"],
+                            TORSO_JOINTS)
+            for anim in TOON_ANIMS:
+                self._anim(f"legs_{size}-{anim}.egg", LEG_JOINTS)
+                self._anim(f"torso_{size}-{anim}.egg", TORSO_JOINTS)
+        self._character("cathead", HEAD_PARTS, HEAD_JOINTS)
+        self._static("muzzles_extra.egg", ["muzzle-surprise", "muzzle-sad"])
+        self._static("lashes.egg", ["open-lashes", "closed-lashes"])
+        self._texture("shirt.png", 0, 0, 1)
+
+        shortHead = {
+            "model": "cathead.bam",
+            "muzzles": {"neutral": "muzzle-neutral", "laugh": "muzzle-laugh"},
+            "parts": {"color": ["head-short", "ears-short"], "pupil_L": "pupil_L", "pupil_R": "pupil_R",
+                      "eyes": "eyes", "keep": ["lashes-closed"]},
+            "eyelashes": {"open": "lashes-open", "closed": "lashes-closed"},
+            "extraMuzzles": {"muzzles_extra.egg": {"surprise": "muzzle-surprise"}}
+        }
+        longHead = dict(shortHead, parts=dict(shortHead["parts"], color=["head-long", "ears-long"]),
+                        eyelashes={"open": "open-lashes", "closed": "closed-lashes", "model": "lashes.egg"})
+
+        def parts(prefix: str) -> dict:
+            return {size: {"model": f"{prefix}_{size}.bam",
+                           "anims": {anim: f"{prefix}_{size}-{anim}.egg" for anim in TOON_ANIMS}}
+                    for size in TOON_SIZES}
+
+        self._json(self.toonFile, {
+            "$schema": "toonschema.json",
+            "parts": {"legs": {"all": parts("legs")},
+                      "torsos": {"skirt": parts("torso"), "shorts": parts("torso")}},
+            "species": {"cat": {"heads": {"ss": shortHead, "ls": longHead}, "size": 1.1},
+                        "dog": {"heads": {"ss": shortHead}}}
+        })
+
+    def _group(self, name: str, x: float) -> tuple[str, str]:
+        count = self.trianglesPerPart * 3
+        vertices = " ".join(f"<Vertex> {k} {{ {x + k * 0.001} {k % 3 * 0.1} {k % 2} <UV> {{ {k % 2} {k % 3 / 2} }} }}"
+                            for k in range(count))
+        polygons = " ".join(f"<Polygon> {{ <VertexRef> {{ {t * 3} {t * 3 + 1} {t * 3 + 2} <Ref> {{ {name}_v }} }} }}"
+                            for t in range(self.trianglesPerPart))
+        return f"<VertexPool> {name}_v {{ {vertices} }}", f"<Group> {name} {{ {polygons} }}"
+
+    def _joints(self, names: list[str], membership: dict[str, list[str]]) -> str:
+        vertices = " ".join(str(k) for k in range(self.trianglesPerPart * 3))
+        result = ""
+        for name in reversed(names):
+            refs = " ".join(f"<VertexRef> {{ {vertices} <Ref> {{ {part}_v }} }}" for part in membership.get(name, []))
+            result = f"<Joint> {name} {{ <DCS> {{ 1 }} <Transform> {{ <Translate> {{ 0 0 0.5 }} }} {refs} {result} }}"
+        return result
+
+    def _character(self, name: str, parts: list[str], joints: list[str]) -> None:
+        pools, groups, membership = [], [], {}
+        for i, part in enumerate(parts):
+            pool, group = self._group(part, i)
+            pools.append(pool)
+            groups.append(group)
+            membership.setdefault(joints[i % len(joints)], []).append(part)
+
+        eggPath = os.path.join(self.outDir, name + ".egg")
+        with open(eggPath, "w") as file:
+            file.write("<CoordinateSystem> { Z-Up }\n" + "\n".join(pools) +
+                       f"\n<Group> {name} {{ <Dart> {{ 1 }} {' '.join(groups)} {self._joints(joints, membership)} }}\n")
+
+        # the egg loader merges all animated geometry into one GeomNode, split it back into one node per part
+        model = NodePath(Loader.getGlobalPtr().loadSync(Filename.fromOsSpecific(eggPath),
+                                                        LoaderOptions(LoaderOptions.LFNoCache)))
+        character = model.find("**/+Character")
+        merged = character.find("+GeomNode")
+        for i in range(merged.node().getNumGeoms()):
+            geom = merged.node().modifyGeom(i)
+            part = GeomNode(parts[int(geom.getBounds().getCenter().x + 0.5)])
+            part.addGeom(geom, merged.node().getGeomState(i))
+            character.attachNewNode(part)
+        merged.removeNode()
+        model.writeBamFile(Filename.fromOsSpecific(os.path.join(self.outDir, name + ".bam")))
+        os.remove(eggPath)
+
+    def _anim(self, path: str, joints: list[str]) -> None:
+        values = " ".join(str((frame % 12) * 0.05) for frame in range(self.animFrames))
+        tables = ""
+        for name in reversed(joints):
+            tables = (f"<Table> {name} {{ <Xfm$Anim_S$> xform {{ <Scalar> fps {{ 24 }} <Char*> order {{ sprht }} "
+                      f"<S$Anim> z {{ <V> {{ {values} }} }} }} {tables} }}")
+        with open(os.path.join(self.outDir, path), "w") as file:
+            file.write(f"<CoordinateSystem> {{ Z-Up }}\n<Table> {{ <Bundle> {path.split('-')[0]} {{ "
+                       f"<Table> \"<skeleton>\" {{ {tables} }} }} }}\n")
+
+    def _static(self, path: str, parts: list[str]) -> None:
+        pools, groups = [], []
+        for i, part in enumerate(parts):
+            pool, group = self._group(part, i)
+            pools.append(pool)
+            groups.append(group.replace(f"<Group> {part} {{", f"<Group> {part} {{ <Model> {{ 1 }}"))
+        with open(os.path.join(self.outDir, path), "w") as file:
+            file.write("<CoordinateSystem> { Z-Up }\n" + "\n".join(pools) + f"\n<Group> root {{ {' '.join(groups)} }}\n")
+
+    def _texture(self, path: str, r: float, g: float, b: float) -> None:
+        image = PNMImage(16, 16)
+        image.fill(r, g, b)
+        image.write(Filename.fromOsSpecific(os.path.join(self.outDir, path)))
+
+    @staticmethod
+    def _json(path: str, contents: dict) -> None:
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump(contents, file, indent=1)
@@ -0,0 +1,167 @@
+from __future__ import annotations
+import json
+from typing import TYPE_CHECKING, NamedTuple
+
+from panda3d.core import NodePath, BamFile, BamWriter, Filename, Texture, Vec4
+
+from toontown_utils import LoaderUtils, AssetIndex, PhaseMounter
+
+if TYPE_CHECKING:
+    from direct.actor.Actor import Actor
+
+# Actors written to a single BAM file as they were assembled, with their textures, colors and attachments applied.
+# See CogActor.bake() and ToonActor.bake(). Reading one back is a single model load: the parts of the actor are picked
+# out of the file by tags, and the state the actor needs to keep changing its appearance is read from metadata stored
+# in a tag of the root node. Animations aren't written, they're shared through the AnimCache like any other actor's.
+
+# bump whenever the metadata changes, so that old files are rejected
+BAKE_VERSION = 1
+
+_METADATA_TAG = "bakedActor"
+# the part and level of detail of every Character in the file
+_PART_TAG = "bakedPart"
+_LOD_TAG = "bakedLOD"
+
+
+class BakedActor(NamedTuple):
+    # the Character of each part, as (part name, LOD name, node), in the order they should be loaded into the actor
+    parts: list[tuple[str, str, NodePath]]
+    metadata: dict
+    # the textures used in the file, by path
+    textures: dict[str, Texture]
+
+
+def write(actor: Actor, path: str, kind: str, metadata: dict, embedTextures=False) -> bool:
+    """
+    Writes the model of an actor and its metadata to a BAM file. The actor's own transform isn't written.
+    :param actor:
+    :param path: The .bam file to write
+    :param kind: What kind of actor it is, read() checks it
+    :param metadata: Anything JSON can store
+    :param embedTextures: Should the textures be stored in the file? They're referenced by path otherwise.
+    :return: Whether the file was written
+    """
+    root = actor.getGeomNode().node()
+    # the most detailed level comes first, so it is the one the other levels are merged into when loading
+    parts = [(partName, lodName) for lodName in actor.getLODNames()
+             for partName in actor.getPartBundleDict()[lodName]]
+    for partName, lodName in parts:
+        node = actor.getPartBundleDict()[lodName][partName].partBundleNP.node()
+        node.setTag(_PART_TAG, partName)
+        node.setTag(_LOD_TAG, lodName)
+    root.setTag(_METADATA_TAG, json.dumps({"version": BAKE_VERSION, "kind": kind, "parts": parts, **metadata}))
+
+    bam = BamFile()
+    written = bam.openWrite(Filename.fromOsSpecific(path))
+    if written:
+        if embedTextures:
+            bam.getWriter().setFileTextureMode(BamWriter.BTM_rawdata)
+        written = bam.writeObject(root)
+        bam.close()
+    if not written:
+        print(f"ActorBaker ERROR: Failed to write {path}")
+
+    root.clearTag(_METADATA_TAG)
+    for partName, lodName in parts:
+        node = actor.getPartBundleDict()[lodName][partName].partBundleNP.node()
+        node.clearTag(_PART_TAG)
+        node.clearTag(_LOD_TAG)
+    return written
+
+
+def read(path: str, kind: str) -> BakedActor | None:
+    """
+    Loads a file written by write(), through the ModelPool.
+    :param path:
+    :param kind: The kind of actor the file should hold
+    :return: The parts and metadata of the actor, None if the file couldn't be loaded or holds something else
+    """
+    PhaseMounter.require(path)
+    model = loader.loadModel(AssetIndex.resolve(path), okMissing=True)
+    if model is None:
+        print(f"ActorBaker ERROR: Failed to load {path}")
+        return None
+
+    holder = model if model.hasTag(_METADATA_TAG) else model.find(f"**/={_METADATA_TAG}")
+    if holder.isEmpty():
+        print(f"ActorBaker ERROR: {path} isn't a baked actor")
+        return None
+    metadata = json.loads(holder.getTag(_METADATA_TAG))
+    if metadata.get("version") != BAKE_VERSION or metadata.get("kind") != kind:
+        print(f"ActorBaker ERROR: {path} holds a {metadata.get('kind')} baked with version {metadata.get('version')}, "
+              f"expected a {kind} baked with version {BAKE_VERSION}")
+        return None
+    holder.clearTag(_METADATA_TAG)
+
+    # nodes shown at several levels of detail are found once per level, the first one found is kept
+    found: dict[tuple[str, str], NodePath] = {}
+    for node in model.findAllMatches(f"**/={_PART_TAG}"):
+        found.setdefault((node.getTag(_PART_TAG), node.getTag(_LOD_TAG)), node)
+    parts = []
+    for partName, lodName in metadata["parts"]:
+        node = found.get((partName, lodName))
+        if node is None:
+            print(f"ActorBaker ERROR: {path} is missing the part {partName} of level {lodName}")
+            return None
+        node.node().clearTag(_PART_TAG)
+        node.node().clearTag(_LOD_TAG)
+        parts.append((partName, lodName, node))
+
+    textures = {texture.getFullpath().getFullpath(): texture for texture in model.findAllTextures()}
+    return BakedActor(parts, metadata, textures)
+
+
+def getTexture(baked: BakedActor, path: str | None) -> Texture | None:
+    """
+    :param baked:
+    :param path: A texture path written in the metadata
+    :return: The texture from the file, or loaded from the path if the file doesn't use it
+    """
+    if path is None:
+        return None
+    texture = baked.textures.get(path)
+    if texture is None:
+        texture = LoaderUtils.loadTexture(path)
+    return texture
+
+
+def getTexturePath(texture: Texture | None) -> str | None:
+    if texture is None:
+        return None
+    return texture.getFullpath().getFullpath()
+
+
+def encodeColor(color: Vec4 | None) -> list[float] | None:
+    if color is None:
+        return None
+    return [color[0], color[1], color[2], color[3]]
+
+
+def decodeColor(color: list[float] | None) -> Vec4 | None:
+    if color is None:
+        return None
+    return Vec4(*color)
+
+
+def getLODDistances(actor: Actor, lodNames: list[str]) -> list[float]:
+    """
+    :param actor: An actor set up by LoaderUtils.setupLODs()
+    :param lodNames: The names of its levels of detail
+    :return: The distance past which each level after the first is used
+    """
+    if not lodNames:
+        return []
+    lodNode = actor.getLODNode()
+    return [lodNode.getIn(i) for i in range(len(lodNames) - 1)]
+
+
+def setupLODs(actor: Actor, distances: list[float]) -> list[str]:
+    """
+    The inverse of getLODDistances().
+    :param actor: An actor that has no model yet
+    :param distances:
+    :return: The names of the levels, see LoaderUtils.setupLODs()
+    """
+    if not distances:
+        return []
+    return LoaderUtils.setupLODs(actor, [LoaderUtils.ModelLOD(None, distance) for distance in distances])
@@ -0,0 +1,135 @@
+from abc import ABC, abstractmethod
+from typing import Hashable
+
+from direct.actor.Actor import Actor
+
+
+class ActorPool(ABC):
+    """
+    Keeps released actors around so that they can be handed out again without rebuilding their models.
+    Actors are grouped by a key (e.g. their Body): only actors with a matching key can be reused.
+    Subclasses define the key, how to build a fresh actor for it and how to reset an actor on release.
+    """
+    def __init__(self, lowWatermark: int = 0, highWatermark: int = 8) -> None:
+        """
+        ActorPool constructor.
+        :param lowWatermark: The default amount of free actors replenish() keeps ready for each key.
+        :param highWatermark: The default maximum amount of free actors kept for each key.
+        Actors released past this amount are destroyed.
+        """
+        self.lowWatermark = lowWatermark
+        self.highWatermark = highWatermark
+
+        self._watermarks: dict[Hashable, tuple[int, int]] = {}
+        self._free: dict[Hashable, list[Actor]] = {}
+        # the arguments used to build a fresh actor for each key that has been requested
+        self._sources: dict[Hashable, tuple] = {}
+
+    def setWatermarks(self, key: Hashable, low: int, high: int) -> None:
+        """
+        Overrides the watermarks for a single key. Free actors past the new high watermark are destroyed.
+        :param key:
+        :param low:
+        :param high:
+        :return:
+        """
+        self._watermarks[key] = (low, max(low, high))
+        self.trim()
+
+    def getWatermarks(self, key: Hashable) -> tuple[int, int]:
+        return self._watermarks.get(key, (self.lowWatermark, self.highWatermark))
+
+    def getFreeCount(self, key: Hashable = None) -> int:
+        """
+        :param key: The key to count actors for. If not specified, all free actors are counted.
+        :return: The amount of free actors in the pool
+        """
+        if key is not None:
+            return len(self._free.get(key, ()))
+        return sum(len(free) for free in self._free.values())
+
+    def release(self, actor: Actor) -> None:
+        """
+        Returns an actor to the pool. The actor is removed from the scene graph and reset, or destroyed if the pool
+        already holds enough actors of its kind. The caller must not use the actor afterwards.
+        :param actor:
+        :return:
+        """
+        key = self.getActorKey(actor)
+        actor.detachNode()
+
+        free = self._free.setdefault(key, [])
+        _, high = self.getWatermarks(key)
+        if len(free) >= high:
+            actor.cleanup()
+            return
+
+        self.resetActor(actor)
+        free.append(actor)
+
+    def replenish(self) -> int:
+        """
+        Builds actors until every key that has been requested from the pool has at least its low watermark of free
+        actors. Call this when a hitch doesn't matter, e.g. during a loading screen.
+        :return: The amount of actors built
+        """
+        built = 0
+        for key, source in self._sources.items():
+            low, _ = self.getWatermarks(key)
+            free = self._free.setdefault(key, [])
+            while len(free) < low:
+                actor = self.buildActor(*source)
+                self.resetActor(actor)
+                free.append(actor)
+                built += 1
+        return built
+
+    def trim(self) -> None:
+        """
+        Destroys free actors past the high watermark of their key.
+        :return:
+        """
+        for key, free in self._free.items():
+            _, high = self.getWatermarks(key)
+            while len(free) > high:
+                free.pop().cleanup()
+
+    def clear(self) -> None:
+        """
+        Destroys all free actors.
+        :return:
+        """
+        for free in self._free.values():
+            for actor in free:
+                actor.cleanup()
+        self._free.clear()
+
+    def _take(self, key: Hashable, source: tuple) -> Actor | None:
+        self._sources.setdefault(key, source)
+        free = self._free.get(key)
+        if free:
+            return free.pop()
+        return None
+
+    @abstractmethod
+    def getActorKey(self, actor: Actor) -> Hashable:
+        """
+        :param actor: An actor handed out by the pool
+        :return: The key the actor is pooled under
+        """
+
+    @abstractmethod
+    def buildActor(self, *source) -> Actor:
+        """
+        Builds a fresh actor from the arguments the key was first requested with.
+        :param source:
+        :return:
+        """
+
+    @abstractmethod
+    def resetActor(self, actor: Actor) -> None:
+        """
+        Returns an actor to a neutral state before it is kept in the pool.
+        :param actor:
+        :return:
+        """
@@ -0,0 +1,245 @@
+from __future__ import annotations
+import weakref
+from typing import TYPE_CHECKING, NamedTuple
+
+from panda3d.core import (NodePath, PandaNode, ModelPool, TexturePool, TextureAttrib, Filename, VirtualFileSystem,
+                          getModelPath)
+
+if TYPE_CHECKING:
+    from direct.actor.Actor import Actor
+
+# Tracks every live CogActor and ToonActor while enabled, so that their memory use can be inspected at runtime.
+# Registering an actor only stores a weak reference and counting pool hits only checks the pool before loading,
+# the scene graph is walked when stats are asked for, so the registry can be left enabled in production.
+enabled: bool = False
+
+_actors: dict[int, weakref.ref] = {}
+
+modelHits: int = 0
+modelMisses: int = 0
+textureHits: int = 0
+textureMisses: int = 0
+
+_vfs = VirtualFileSystem.getGlobalPtr()
+
+
+class PoolStats(NamedTuple):
+    hits: int
+    misses: int
+
+    def getHitRate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+class ActorStats(NamedTuple):
+    nodes: int
+    geoms: int
+    # rows of the distinct vertex datas, shared geometry is counted once
+    vertices: int
+    textures: int
+    # estimated, in bytes
+    textureMemory: int
+    anims: int
+    # anims that have been bound to the actor (played at least once)
+    boundAnims: int
+
+
+class RegistryStats(NamedTuple):
+    # live actors, by class name
+    actors: dict[str, int]
+    nodes: int
+    geoms: int
+    # vertex datas and textures shared by several actors are counted once
+    vertices: int
+    textures: int
+    textureMemory: int
+    anims: int
+    boundAnims: int
+    modelPool: PoolStats
+    texturePool: PoolStats
+
+
+def enable() -> None:
+    """
+    Starts tracking actors. Actors created before this are not tracked.
+    :return:
+    """
+    global enabled
+    enabled = True
+
+
+def disable() -> None:
+    global enabled
+    enabled = False
+    _actors.clear()
+
+
+def register(actor: Actor) -> None:
+    if not enabled:
+        return
+    key = id(actor)
+    # NodePaths hash by the node they point to, so actors are keyed by identity instead of going in a WeakSet
+    _actors[key] = weakref.ref(actor, lambda ref: _actors.pop(key, None) if _actors.get(key) is ref else None)
+
+
+def unregister(actor: Actor) -> None:
+    _actors.pop(id(actor), None)
+
+
+def getActors() -> list[Actor]:
+    """
+    :return: Every live tracked actor that hasn't been cleaned up
+    """
+    actors = []
+    for ref in list(_actors.values()):
+        actor = ref()
+        if actor is not None and not actor.isEmpty():
+            actors.append(actor)
+    return actors
+
+
+def getNumActors() -> int:
+    return len(getActors())
+
+
+def getActorStats(actor: Actor) -> ActorStats:
+    """
+    Measures a single actor, tracked or not. Stashed nodes (e.g. hidden heads) are included.
+    :param actor:
+    :return:
+    """
+    textures: dict[int, int] = {}
+    vertexData: dict[int, int] = {}
+    nodes, geoms = _measure(actor, textures, vertexData)
+    anims, boundAnims = _countAnims(actor)
+    return ActorStats(nodes, geoms, sum(vertexData.values()), len(textures), sum(textures.values()), anims,
+                      boundAnims)
+
+
+def getStats() -> RegistryStats:
+    """
+    Measures every tracked actor. This walks all of their scene graphs, so it's meant for debug overlays and reports
+    rather than for every frame.
+    :return:
+    """
+    counts: dict[str, int] = {}
+    textures: dict[int, int] = {}
+    vertexData: dict[int, int] = {}
+    nodes = geoms = anims = boundAnims = 0
+    for actor in getActors():
+        name = type(actor).__name__
+        counts[name] = counts.get(name, 0) + 1
+        actorNodes, actorGeoms = _measure(actor, textures, vertexData)
+        nodes += actorNodes
+        geoms += actorGeoms
+        actorAnims, actorBound = _countAnims(actor)
+        anims += actorAnims
+        boundAnims += actorBound
+    return RegistryStats(counts, nodes, geoms, sum(vertexData.values()), len(textures), sum(textures.values()),
+                         anims, boundAnims, getModelPoolStats(), getTexturePoolStats())
+
+
+def getModelPoolStats() -> PoolStats:
+    return PoolStats(modelHits, modelMisses)
+
+
+def getTexturePoolStats() -> PoolStats:
+    return PoolStats(textureHits, textureMisses)
+
+
+def resetPoolStats() -> None:
+    global modelHits, modelMisses, textureHits, textureMisses
+    modelHits = modelMisses = textureHits = textureMisses = 0
+
+
+def noteModelLoad(path: str | NodePath) -> None:
+    """
+    Records whether a model about to be loaded is already in the ModelPool. Does nothing while disabled.
+    :param path: The model path. Models passed as NodePaths aren't loaded, so they're ignored.
+    :return:
+    """
+    global modelHits, modelMisses
+    if not enabled or not isinstance(path, str):
+        return
+    # the pool is keyed by resolved path
+    filename = Filename(path)
+    if _vfs.resolveFilename(filename, getModelPath().getValue()) and ModelPool.hasModel(filename):
+        modelHits += 1
+    else:
+        modelMisses += 1
+
+
+def noteTextureLoad(path: str) -> None:
+    """
+    Records whether a texture about to be loaded is already in the TexturePool. Does nothing while disabled.
+    :param path:
+    :return:
+    """
+    global textureHits, textureMisses
+    if not enabled:
+        return
+    if TexturePool.hasTexture(path):
+        textureHits += 1
+    else:
+        textureMisses += 1
+
+
+def printStats() -> None:
+    stats = getStats()
+    actors = ", ".join(f"{count} {name}" for name, count in stats.actors.items()) or "none"
+    print(f"ActorRegistry: {actors}")
+    print(f"ActorRegistry: {stats.nodes} nodes, {stats.geoms} Geoms, {stats.vertices} vertices")
+    print(f"ActorRegistry: {stats.textures} textures ({stats.textureMemory / 1048576:.1f} MiB)")
+    print(f"ActorRegistry: {stats.anims} anims, {stats.boundAnims} bound")
+    print(f"ActorRegistry: ModelPool {stats.modelPool.getHitRate():.0%} hits of "
+          f"{stats.modelPool.hits + stats.modelPool.misses}, TexturePool {stats.texturePool.getHitRate():.0%} hits "
+          f"of {stats.texturePool.hits + stats.texturePool.misses}")
+
+
+def _measure(root: NodePath, textures: dict[int, int], vertexData: dict[int, int]) -> tuple[int, int]:
+    """
+    Counts the nodes and Geoms below root, including stashed ones, and collects the textures and vertex datas they use.
+    :param root:
+    :param textures: Filled with the estimated memory of each texture, by pointer
+    :param vertexData: Filled with the rows of each vertex data, by pointer
+    :return: The amount of nodes and of Geoms
+    """
+    nodes = 0
+    geoms = 0
+    stack: list[PandaNode] = [root.node()]
+    while stack:
+        node = stack.pop()
+        nodes += 1
+        _addTextures(node.getState(), textures)
+        if node.isGeomNode():
+            geoms += node.getNumGeoms()
+            for i in range(node.getNumGeoms()):
+                _addTextures(node.getGeomState(i), textures)
+                data = node.getGeom(i).getVertexData()
+                vertexData[data.this] = data.getNumRows()
+        stack.extend(node.getChildren())
+        stack.extend(node.getStashed())
+    return nodes, geoms
+
+
+def _addTextures(state, textures: dict[int, int]) -> None:
+    attrib = state.getAttrib(TextureAttrib)
+    if attrib is None:
+        return
+    for i in range(attrib.getNumOnStages()):
+        texture = attrib.getOnTexture(attrib.getOnStage(i))
+        if texture.this not in textures:
+            textures[texture.this] = texture.estimateTextureMemory()
+
+
+def _countAnims(actor: Actor) -> tuple[int, int]:
+    anims = 0
+    bound = 0
+    for _, lodInfo in actor.getActorInfo():
+        for _, _, animInfo in lodInfo:
+            for _, _, animControl in animInfo:
+                anims += 1
+                if animControl is not None:
+                    bound += 1
+    return anims, bound
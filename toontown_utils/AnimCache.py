@@ -0,0 +1,115 @@
+from panda3d.core import NodePath, LoaderOptions, AnimBundleNode, AnimBundle
+from direct.actor.Actor import Actor
+
+from toontown_utils import AssetIndex, PhaseMounter
+
+# Animations loaded once and shared by every actor. Actors given animations through loadAnims() only load each file
+# the first time it is bound (e.g. played), and are then handed the shared bundle instead of going back through the
+# loader. Each actor still binds its own AnimControl, so playback stays independent.
+_bundles: dict[str, NodePath] = {}
+
+_animLoaderOptions = LoaderOptions(LoaderOptions.LFSearch | LoaderOptions.LFReportErrors | LoaderOptions.LFConvertAnim)
+
+
+class _SharedAnimDef(Actor.AnimDef):
+    """
+    An animation of an actor whose bundle is only looked up in the cache the first time the actor binds it.
+    Animations that fail to load are left to the Actor, which reports the error when they're played.
+    """
+    def __init__(self, filename: str) -> None:
+        self._bundle: AnimBundle = None
+        self._looked = False
+        Actor.AnimDef.__init__(self, filename)
+
+    @property
+    def animBundle(self) -> AnimBundle | None:
+        if self._bundle is None and not self._looked:
+            self._looked = True
+            bundle = getBundle(self.filename)
+            if bundle is not None:
+                self._bundle = bundle.node().getBundle()
+        return self._bundle
+
+    @animBundle.setter
+    def animBundle(self, bundle: AnimBundle | None) -> None:
+        self._bundle = bundle
+
+    def makeCopy(self) -> Actor.AnimDef:
+        if self._bundle is None:
+            return _SharedAnimDef(self.filename)
+        return Actor.AnimDef(self.filename, self._bundle)
+
+
+def loadAnims(actor: Actor, anims: dict[str, str], partName: str = "modelRoot") -> None:
+    """
+    Gives animations to an actor, like Actor.loadAnims() with file names: nothing is loaded until an animation is
+    bound. Each file is then loaded once and its bundle shared with every other actor.
+    :param actor:
+    :param anims: Animation names to file paths
+    :param partName:
+    :return:
+    """
+    actor.loadAnims(anims, partName)
+    for parts in actor.getAnimControlDict().values():
+        animDefs = parts.get(partName)
+        if animDefs is None:
+            continue
+        for animName, path in anims.items():
+            animDefs[animName] = _SharedAnimDef(path)
+
+
+def getAnims(anims: dict[str, str]) -> dict[str, NodePath | str]:
+    """
+    Loads the shared animation bundles for a dict of animation names to file paths right away, in the format
+    Actor.loadAnims() expects. Animations that fail to load are left as paths, so the Actor reports the error when
+    they're played. Use loadAnims() to only load them once they're played.
+    :param anims:
+    :return:
+    """
+    result: dict[str, NodePath | str] = {}
+    for animName, path in anims.items():
+        bundle = getBundle(path)
+        result[animName] = bundle if bundle is not None else path
+    return result
+
+
+def getBundle(path: str) -> NodePath | None:
+    """
+    :param path:
+    :return: The shared AnimBundleNode of an animation file, loading it if needed. None if it fails to load.
+    """
+    bundle = _bundles.get(path)
+    if bundle is None:
+        bundle = _loadBundle(path)
+        if bundle is not None:
+            _bundles[path] = bundle
+    return bundle
+
+
+def getSize() -> int:
+    return len(_bundles)
+
+
+def clear() -> None:
+    """
+    Forgets every shared animation. Actors that already bound them keep theirs.
+    :return:
+    """
+    _bundles.clear()
+
+
+def invalidate(path: str) -> None:
+    _bundles.pop(path, None)
+
+
+def _loadBundle(path: str) -> NodePath | None:
+    PhaseMounter.require(path)
+    model = loader.loadModel(AssetIndex.resolve(path), loaderOptions=_animLoaderOptions, okMissing=True)
+    if model is None:
+        return None
+    if model.node().isOfType(AnimBundleNode.getClassType()):
+        return model
+    bundle = model.find("**/+AnimBundleNode")
+    if bundle.isEmpty():
+        return None
+    return bundle
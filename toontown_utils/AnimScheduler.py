@@ -0,0 +1,247 @@
+from __future__ import annotations
+from typing import NamedTuple
+
+from panda3d.core import NodePath, Point3, BoundingVolume, Character, PartGroup, ClockObject
+from direct.actor.Actor import Actor
+
+# Characters that must not update this frame are given an LOD animation centered far below them, which delays their
+# next update by about 100000 seconds no matter where the camera is. Clearing it lets them update again right away.
+_HOLD_CENTER = Point3(0, 0, -100000)
+
+
+class SchedulerStats(NamedTuple):
+    actors: int
+    # actors allowed to update their joints
+    updated: int
+    # actors held because they're hidden, paused or outside of the camera's view
+    offscreen: int
+    # actors held because they updated too recently for their distance
+    rateSkipped: int
+    # actors held because the joint budget was spent
+    budgetSkipped: int
+    jointsUpdated: int
+    jointsSkipped: int
+
+
+class _Entry:
+    __slots__ = ("actor", "characters", "bundles", "joints", "lastUpdate", "running", "paused")
+
+    def __init__(self, actor: Actor) -> None:
+        self.actor = actor
+        self.characters: list[Character] = []
+        # the pointers of the actor's part bundles, to notice when its model is replaced
+        self.bundles: tuple[int, ...] = ()
+        self.joints = 0
+        self.lastUpdate = -1
+        self.running = True
+        self.paused = False
+
+
+class AnimScheduler:
+    """
+    Decides every frame which registered actors get their joints updated, so that actors far from the camera animate
+    at a lower rate, actors out of view don't animate at all and no more than a set amount of joints are updated per
+    frame.
+    Held actors keep playing: their AnimControls still advance with the clock, so they jump straight to the right frame
+    once they update again.
+    The scheduler works through Panda3D's LOD animation (see Actor.setLODAnimation()), so scheduled actors shouldn't
+    use it themselves.
+    """
+    def __init__(self, camera: NodePath = None, rates: list[tuple[float, int]] = None, farInterval: int = 8,
+                 jointBudget: int = 0, taskSort: int = 49) -> None:
+        """
+        AnimScheduler constructor.
+        :param camera: The camera (a node with a lens) the actors are seen from. Defaults to base.cam.
+        :param rates: The update interval in frames of actors up to each distance from the camera, sorted by distance.
+        Defaults to every frame up to 30 units, every 2nd frame up to 60 and every 4th up to 120.
+        :param farInterval: The update interval of actors further than every distance in rates.
+        :param jointBudget: The maximum amount of joints to update per frame, 0 for no limit. Actors that have waited
+        the longest past their interval are updated first, so every actor eventually gets its turn.
+        :param taskSort: The sort of the scheduling task. It should run after the camera and actors have moved, and
+        before the frame is rendered.
+        """
+        self.camera = camera
+        self.rates = list(rates) if rates is not None else [(30.0, 1), (60.0, 2), (120.0, 4)]
+        self.farInterval = farInterval
+        self.jointBudget = jointBudget
+        self.taskSort = taskSort
+
+        self._entries: dict[int, _Entry] = {}
+        self._task = None
+        self._stats = SchedulerStats(0, 0, 0, 0, 0, 0, 0)
+        self._totals = SchedulerStats(0, 0, 0, 0, 0, 0, 0)
+
+    def addActor(self, actor: Actor) -> None:
+        if id(actor) not in self._entries:
+            self._entries[id(actor)] = _Entry(actor)
+
+    def removeActor(self, actor: Actor) -> None:
+        """
+        Stops scheduling an actor, letting it animate every frame again.
+        :param actor:
+        :return:
+        """
+        entry = self._entries.pop(id(actor), None)
+        if entry is not None and not actor.isEmpty():
+            self._setRunning(entry, True)
+
+    def hasActor(self, actor: Actor) -> bool:
+        return id(actor) in self._entries
+
+    def pause(self, actor: Actor) -> None:
+        """
+        Holds an actor as if it was out of view, e.g. when the game knows it is hidden behind a wall.
+        :param actor:
+        :return:
+        """
+        entry = self._entries.get(id(actor))
+        if entry is not None:
+            entry.paused = True
+
+    def resume(self, actor: Actor) -> None:
+        entry = self._entries.get(id(actor))
+        if entry is not None:
+            entry.paused = False
+
+    def getInterval(self, distance: float) -> int:
+        """
+        :param distance: The distance of an actor from the camera
+        :return: How many frames the actor waits between updates
+        """
+        for maxDistance, interval in self.rates:
+            if distance <= maxDistance:
+                return interval
+        return self.farInterval
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = taskMgr.add(self._updateTask, "AnimScheduler", sort=self.taskSort)
+
+    def stop(self) -> None:
+        """
+        Stops scheduling, letting every actor animate every frame again. The actors stay registered.
+        :return:
+        """
+        if self._task is not None:
+            taskMgr.remove(self._task)
+            self._task = None
+        for entry in self._entries.values():
+            if not entry.actor.isEmpty():
+                self._setRunning(entry, True)
+
+    def getStats(self) -> SchedulerStats:
+        """
+        :return: What was scheduled on the last frame
+        """
+        return self._stats
+
+    def getTotals(self) -> SchedulerStats:
+        """
+        :return: The sums of the frame stats since the scheduler was created or resetTotals() was called
+        """
+        return self._totals
+
+    def resetTotals(self) -> None:
+        self._totals = SchedulerStats(0, 0, 0, 0, 0, 0, 0)
+
+    def update(self) -> SchedulerStats:
+        """
+        Schedules the current frame. This is done by the task while the scheduler is started.
+        :return: The stats of the frame
+        """
+        camera = self.camera if self.camera is not None else base.cam
+        frame = ClockObject.getGlobalClock().getFrameCount()
+        lensBounds = camera.node().getLens().makeBounds()
+        top = camera.getTop()
+
+        offscreen = rateSkipped = budgetSkipped = 0
+        jointsSkipped = 0
+        due: list[tuple[float, float, _Entry]] = []
+        for key, entry in list(self._entries.items()):
+            actor = entry.actor
+            if actor.isEmpty():
+                # the actor was cleaned up
+                del self._entries[key]
+                continue
+            self._refresh(entry)
+
+            if entry.paused or actor.isHidden() or actor.getTop() != top or \
+                    not self._isInView(actor, camera, lensBounds):
+                offscreen += 1
+                jointsSkipped += entry.joints
+                self._setRunning(entry, False)
+                continue
+
+            distance = actor.getDistance(camera)
+            interval = self.getInterval(distance)
+            waited = frame - entry.lastUpdate
+            if entry.lastUpdate >= 0 and waited < interval:
+                rateSkipped += 1
+                jointsSkipped += entry.joints
+                self._setRunning(entry, False)
+                continue
+            # actors that are the most overdue go first, then the closest ones
+            due.append((-waited / interval if entry.lastUpdate >= 0 else float("-inf"), distance, entry))
+
+        due.sort(key=lambda item: (item[0], item[1]))
+        updated = 0
+        jointsUpdated = 0
+        for _, _, entry in due:
+            if self.jointBudget > 0 and jointsUpdated > 0 and jointsUpdated + entry.joints > self.jointBudget:
+                budgetSkipped += 1
+                jointsSkipped += entry.joints
+                self._setRunning(entry, False)
+                continue
+            updated += 1
+            jointsUpdated += entry.joints
+            entry.lastUpdate = frame
+            self._setRunning(entry, True)
+
+        self._stats = SchedulerStats(len(self._entries), updated, offscreen, rateSkipped, budgetSkipped, jointsUpdated,
+                                     jointsSkipped)
+        self._totals = SchedulerStats(*(total + value for total, value in zip(self._totals, self._stats)))
+        return self._stats
+
+    def cleanup(self) -> None:
+        self.stop()
+        self._entries.clear()
+
+    def _updateTask(self, task):
+        self.update()
+        return task.cont
+
+    @staticmethod
+    def _isInView(actor: Actor, camera: NodePath, lensBounds: BoundingVolume) -> bool:
+        bounds = actor.getBounds()
+        if bounds.isEmpty() or bounds.isInfinite():
+            return True
+        bounds.xform(actor.getMat(camera))
+        return lensBounds.contains(bounds) != BoundingVolume.IFNoIntersection
+
+    def _refresh(self, entry: _Entry) -> None:
+        # models can be replaced (e.g. when becoming a lose actor), which brings in new characters
+        # the levels of detail of a part share one bundle
+        bundles = list({bundle.this: bundle for bundle in entry.actor.getPartBundles()}.values())
+        key = tuple(bundle.this for bundle in bundles)
+        if key == entry.bundles:
+            return
+        entry.bundles = key
+        entry.characters = [bundle.getNode(i) for bundle in bundles for i in range(bundle.getNumNodes())]
+        entry.joints = sum(_countJoints(bundle) for bundle in bundles)
+        # the new characters animate every frame until told otherwise
+        entry.running = True
+
+    @staticmethod
+    def _setRunning(entry: _Entry, running: bool) -> None:
+        if entry.running == running:
+            return
+        entry.running = running
+        for character in entry.characters:
+            if running:
+                character.clearLodAnimation()
+            else:
+                character.setLodAnimation(_HOLD_CENTER, 1.0, 0.0, 1.0)
+
+
+def _countJoints(group: PartGroup) -> int:
+    return sum(_countJoints(child) + child.isCharacterJoint() for child in group.getChildren())
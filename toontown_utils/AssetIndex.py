@@ -0,0 +1,137 @@
+from __future__ import annotations
+import time
+from typing import Iterable, NamedTuple
+
+from panda3d.core import Filename, DSearchPath, VirtualFileSystem, getModelPath
+
+# Asset paths resolved against the model path ahead of time. The loaders look paths up here and hand the resolved
+# path to Panda3D, which then doesn't search the model path again. Paths that aren't indexed load as usual.
+# See TemplateManager.resolveAssets().
+
+# resolved path by asset path, None if the asset doesn't exist
+_paths: dict[str, str | None] = {}
+
+MODEL_EXTENSIONS = ("bam", "bam.pz", "egg", "egg.pz")
+TEXTURE_EXTENSIONS = ("png", "jpg", "jpeg", "rgb", "tif")
+
+_vfs = VirtualFileSystem.getGlobalPtr()
+
+
+class AssetReport(NamedTuple):
+    resolved: int
+    missing: list[str]
+    # assets found in several directories of the model path, with every candidate. The first one is used, like the
+    # loader would.
+    ambiguous: dict[str, list[str]]
+    # assets that don't exist with their extension, but do with another one (e.g. an egg instead of a bam), and the
+    # path that is used instead
+    substituted: dict[str, str]
+    seconds: float
+
+
+def build(models: Iterable[str] = (), textures: Iterable[str] = (), searchPath: DSearchPath = None,
+          refresh=False) -> AssetReport:
+    """
+    Resolves asset paths and adds them to the index.
+    :param models: Model and animation paths
+    :param textures: Texture paths
+    :param searchPath: Where to look for the assets, defaults to the model path
+    :param refresh: Should paths that are already indexed be resolved again? They're skipped otherwise.
+    :return: What was resolved, missing or ambiguous among the paths that were resolved
+    """
+    start = time.perf_counter()
+    if searchPath is None:
+        searchPath = getModelPath().getValue()
+
+    resolved = 0
+    missing: list[str] = []
+    ambiguous: dict[str, list[str]] = {}
+    substituted: dict[str, str] = {}
+    for paths, extensions in ((models, MODEL_EXTENSIONS), (textures, TEXTURE_EXTENSIONS)):
+        for path in paths:
+            if path is None or (path in _paths and not refresh):
+                continue
+            candidates = _findAll(path, searchPath)
+            if not candidates:
+                for alternative in _getAlternatives(path, extensions):
+                    candidates = _findAll(alternative, searchPath)
+                    if candidates:
+                        substituted[path] = alternative
+                        break
+            if not candidates:
+                _paths[path] = None
+                missing.append(path)
+                continue
+            _paths[path] = candidates[0]
+            resolved += 1
+            if len(candidates) > 1:
+                ambiguous[path] = candidates
+    return AssetReport(resolved, missing, ambiguous, substituted, time.perf_counter() - start)
+
+
+def resolve(path: str) -> str:
+    """
+    :param path:
+    :return: The resolved path of an indexed asset, or the path itself if it isn't indexed or doesn't exist
+    """
+    resolved = _paths.get(path)
+    return resolved if resolved is not None else path
+
+
+def exists(path: str) -> bool | None:
+    """
+    :param path:
+    :return: Whether the asset exists, None if it isn't indexed
+    """
+    if path not in _paths:
+        return None
+    return _paths[path] is not None
+
+
+def getMissing() -> list[str]:
+    return [path for path, resolved in _paths.items() if resolved is None]
+
+
+def getSize() -> int:
+    return len(_paths)
+
+
+def clear() -> None:
+    """
+    Forgets every resolved path, e.g. after changing the model path.
+    :return:
+    """
+    _paths.clear()
+
+
+def printReport(report: AssetReport) -> None:
+    for path in report.missing:
+        print(f"AssetIndex ERROR: Missing asset {path}")
+    for path, candidates in report.ambiguous.items():
+        print(f"AssetIndex WARN: {path} is ambiguous, using {candidates[0]} over {', '.join(candidates[1:])}")
+    for path, alternative in report.substituted.items():
+        print(f"AssetIndex WARN: {path} doesn't exist, using {alternative}")
+
+
+def _findAll(path: str, searchPath: DSearchPath) -> list[str]:
+    filename = Filename(path)
+    if filename.isFullyQualified():
+        return [filename.getFullpath()] if _vfs.exists(filename) else []
+
+    results = DSearchPath.Results()
+    _vfs.findAllFiles(filename, searchPath, results)
+    candidates: dict[str, None] = {}
+    for i in range(results.getNumFiles()):
+        # the same directory can be on the search path twice under different names
+        found = Filename(results.getFile(i))
+        found.standardize()
+        candidates[found.getFullpath()] = None
+    return list(candidates)
+
+
+def _getAlternatives(path: str, extensions: tuple[str, ...]) -> list[str]:
+    for extension in sorted(extensions, key=len, reverse=True):
+        if path.endswith("." + extension):
+            base = path[:-len(extension) - 1]
+            return [f"{base}.{other}" for other in extensions if other != extension]
+    return []
@@ -0,0 +1,106 @@
+from collections.abc import MutableMapping
+from typing import Any, Callable, Generic, Iterator, TypeVar
+
+T = TypeVar("T")
+
+# marks entries that are still raw data
+_unbuilt = object()
+
+
+class LazyRegistry(MutableMapping, Generic[T]):
+    """
+    A dict of templates that can also hold entries as raw data, only building them the first time they are looked up.
+    Checking for a name, iterating over names and len() never build anything.
+    If an entry fails to build (the builder returns None), it is removed and the lookup raises a KeyError.
+    """
+    def __init__(self) -> None:
+        self._entries: dict[str, Any] = {}
+        # the builder and raw data of every entry that hasn't been built yet
+        self._raw: dict[str, tuple[Callable[[str, Any], T | None], Any]] = {}
+
+    def addRaw(self, name: str, data: Any, builder: Callable[[str, Any], T | None]) -> None:
+        """
+        Adds an entry that is built on first access, replacing any existing entry with that name.
+        :param name:
+        :param data: The raw data passed to the builder
+        :param builder: Builds the entry from its name and data, returns None if the data is invalid
+        :return:
+        """
+        self._entries[name] = _unbuilt
+        self._raw[name] = (builder, data)
+
+    def isBuilt(self, name: str) -> bool:
+        return name in self._entries and name not in self._raw
+
+    def getNumBuilt(self) -> int:
+        return len(self._entries) - len(self._raw)
+
+    def buildAll(self) -> None:
+        """
+        Builds every entry that hasn't been built yet, e.g. to validate a file up front.
+        :return:
+        """
+        for name in list(self._raw):
+            self.get(name)
+
+    def __getitem__(self, name: str) -> T:
+        value = self._entries[name]
+        if value is _unbuilt:
+            builder, data = self._raw.pop(name)
+            value = builder(name, data)
+            if value is None:
+                del self._entries[name]
+                raise KeyError(name)
+            self._entries[name] = value
+        return value
+
+    def __setitem__(self, name: str, value: T) -> None:
+        self._raw.pop(name, None)
+        self._entries[name] = value
+
+    def __delitem__(self, name: str) -> None:
+        del self._entries[name]
+        self._raw.pop(name, None)
+
+    def __contains__(self, name: object) -> bool:
+        return name in self._entries
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._entries)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def items(self) -> list[tuple[str, T]]:
+        """
+        Builds every entry that hasn't been built yet. Entries that fail to build are removed and left out.
+        :return: The name and template of every entry
+        """
+        items = []
+        for name in list(self._entries):
+            value = self.get(name)
+            if value is not None:
+                items.append((name, value))
+        return items
+
+    def values(self) -> list[T]:
+        """
+        Builds every entry that hasn't been built yet. Entries that fail to build are removed and left out.
+        :return:
+        """
+        return [value for name, value in self.items()]
+
+    def update(self, other=(), /, **kwargs) -> None:
+        # copy unbuilt entries as they are instead of building them
+        if isinstance(other, LazyRegistry):
+            for name, value in other._entries.items():
+                if value is _unbuilt:
+                    builder, data = other._raw[name]
+                    self.addRaw(name, data, builder)
+                else:
+                    self[name] = value
+            other = ()
+        super().update(other, **kwargs)
+
+    def __repr__(self) -> str:
+        return f"LazyRegistry({len(self)} entries, {self.getNumBuilt()} built)"
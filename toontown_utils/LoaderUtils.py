@@ -1,10 +1,33 @@
-from typing import Any
+from __future__ import annotations
+from typing import TYPE_CHECKING, Any, NamedTuple
 
-from panda3d.core import Vec4
+from panda3d.core import NodePath, Vec4, Texture
+
+from toontown_utils import ActorRegistry, AssetIndex, PhaseMounter
+
+if TYPE_CHECKING:
+    from direct.actor.Actor import Actor
 
 defaultTextureExtension = "jpg"
 defaultModelExtension = "bam"
 
+# the distance past which the least detailed level of an actor stops being drawn
+lodFarDistance: float = 100000.0
+
+
+class ModelLOD(NamedTuple):
+    """
+    A lower level of detail of a model.
+    """
+    model: str
+    # the distance from the camera past which this level is used instead of the previous one
+    distance: float
+
+
+class FreezeReport(NamedTuple):
+    nodesRemoved: int
+    geomsRemoved: int
+
 
 def readColor(col: list | None) -> Vec4 | None:
     if col is None:
@@ -23,3 +46,186 @@ def addExtensionIfMissing(tex: str | None, ext: str) -> None | str:
 def addExtensions(data: dict[Any, str], ext: str):
     for k, v in data.items():
         data[k] = addExtensionIfMissing(v, ext)
+
+
+def readLODs(data: list[dict] | None) -> list[ModelLOD] | None:
+    """
+    Reads the lower levels of detail of a model from JSON, e.g. [{"model": "suitA-500", "distance": 50}].
+    :param data:
+    :return: The levels, from the most to the least detailed
+    """
+    if not data:
+        return None
+    lods = [ModelLOD(addExtensionIfMissing(lod["model"], defaultModelExtension), lod["distance"]) for lod in data]
+    return sorted(lods, key=lambda lod: lod.distance)
+
+
+def getLevelModels(model: str, lods: list[ModelLOD] | None, count: int) -> list[str]:
+    """
+    Lists the model to load into each level of detail of an actor. Models with fewer levels than the actor repeat their
+    least detailed level, extra levels are left out.
+    :param model: The most detailed model
+    :param lods: Its lower levels of detail
+    :param count: How many levels of detail the actor has
+    :return:
+    """
+    models = [model, *(lod.model for lod in lods or ())][:count]
+    return models + [models[-1]] * (count - len(models))
+
+
+def setupLODs(actor: Actor, lods: list[ModelLOD]) -> list[str]:
+    """
+    Turns an actor that has no model yet into an LOD actor switching between a model and its lower levels of detail.
+    The levels are named from their amount down to 1, as Actor sorts LOD names from the highest number to the lowest.
+    :param actor:
+    :param lods: The lower levels of detail, the most detailed model being the first level
+    :return: The names of the levels, from the most to the least detailed
+    """
+    names = [str(len(lods) + 1 - i) for i in range(len(lods) + 1)]
+    distances = [0.0, *(lod.distance for lod in lods), lodFarDistance]
+    actor.setLODNode()
+    for i, name in enumerate(names):
+        actor.addLOD(name, distances[i + 1], distances[i])
+    return names
+
+
+def setLODDistances(actor: Actor, lods: list[ModelLOD]) -> None:
+    """
+    Moves the switch distances of an LOD actor to those of another model with as many levels.
+    :param actor:
+    :param lods:
+    :return:
+    """
+    distances = [0.0, *(lod.distance for lod in lods), lodFarDistance]
+    for i in range(len(distances) - 1):
+        actor.getLODNode().setSwitch(i, distances[i + 1], distances[i])
+
+
+def removeInstances(node: NodePath) -> None:
+    """
+    Removes a node from every parent it is instanced under, e.g. an attachment shared by every level of detail.
+    :param node:
+    :return:
+    """
+    pandaNode = node.node()
+    for parent in pandaNode.getParents():
+        parent.removeChild(pandaNode)
+
+
+def indexNodes(root: NodePath) -> dict[str, NodePath]:
+    """
+    Maps the names of all the nodes below root to the nodes, so that they can be looked up without searching the
+    scene graph. When several nodes share a name, the one find("**/name") would return is kept.
+    Stashed nodes are skipped, like find() does.
+    :param root:
+    :return:
+    """
+    index: dict[str, NodePath] = {}
+    for node in root.findAllMatches("**"):
+        if node != root:
+            index.setdefault(node.getName(), node)
+    return index
+
+
+def walk(root: NodePath, path: tuple[int, ...]) -> NodePath:
+    """
+    :param root:
+    :param path: Child indices, negative for stashed children
+    :return: The node at the end of the path
+    """
+    node = root
+    for i in path:
+        node = node.getChild(i) if i >= 0 else node.getStashedChildren()[-i - 1]
+    return node
+
+
+def pathTo(root: NodePath, node: NodePath) -> tuple[int, ...]:
+    """
+    The inverse of walk().
+    :param root:
+    :param node: A node below root
+    :return: The path from root to node
+    """
+    path = []
+    while node != root:
+        parent = node.getParent()
+        index = parent.node().findChild(node.node())
+        if index < 0:
+            index = -parent.node().findStashed(node.node()) - 1
+        path.append(index)
+        node = parent
+    return tuple(reversed(path))
+
+
+def countNodes(root: NodePath) -> tuple[int, int]:
+    """
+    :param root:
+    :return: The amount of nodes and of Geoms below root, including stashed ones
+    """
+    nodes = 0
+    geoms = 0
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        nodes += 1
+        if node.node().isGeomNode():
+            geoms += node.node().getNumGeoms()
+        stack.extend(node.getChildren())
+        stack.extend(node.getStashedChildren())
+    return nodes, geoms
+
+
+def removeStashed(root: NodePath, keep: list[NodePath] = ()) -> None:
+    """
+    Removes every stashed node below root, along with everything below them.
+    :param root:
+    :param keep: Stashed nodes to leave in place
+    :return:
+    """
+    keptNodes = {node.node().this for node in keep}
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        for stashed in node.getStashedChildren():
+            if stashed.node().this not in keptNodes:
+                stashed.removeNode()
+        stack.extend(node.getChildren())
+
+
+def loadModel(path: str) -> NodePath:
+    """
+    Loads a model through the ModelPool, recording the pool hit in the ActorRegistry. Paths in the AssetIndex are
+    loaded from where they were resolved, and the phase of the model is mounted first if needed.
+    :param path:
+    :return:
+    """
+    PhaseMounter.require(path)
+    path = AssetIndex.resolve(path)
+    ActorRegistry.noteModelLoad(path)
+    return loader.loadModel(path)
+
+
+def loadTexture(path: str) -> Texture:
+    """
+    Loads a texture through the TexturePool, recording the pool hit in the ActorRegistry. Paths in the AssetIndex are
+    loaded from where they were resolved, and the phase of the texture is mounted first if needed.
+    :param path:
+    :return:
+    """
+    PhaseMounter.require(path)
+    path = AssetIndex.resolve(path)
+    ActorRegistry.noteTextureLoad(path)
+    return loader.loadTexture(path)
+
+
+async def loadModelsAsync(paths: list[str]) -> list[NodePath]:
+    """
+    Loads models in parallel on Panda3D's loader threads. The models end up in the ModelPool, so loading them again
+    afterwards (e.g. from an Actor) doesn't touch the disk.
+    :param paths:
+    :return: The loaded models
+    """
+    if not paths:
+        return []
+    PhaseMounter.requireAll(paths)
+    return await loader.loadModel([AssetIndex.resolve(path) for path in paths], blocking=False)
@@ -0,0 +1,179 @@
+from __future__ import annotations
+import os
+import threading
+import time
+from typing import Iterable, NamedTuple
+
+from panda3d.core import Filename, Multifile, VirtualFileSystem
+
+# Mounts the phase multifiles (phase_3.mf, phase_3.5.mf, ...) only once an asset inside them is about to be loaded,
+# instead of mounting every phase on startup. While enabled, the loaders of toontown_utils ask for the phase of each
+# path they load, so building or preloading an actor mounts exactly the phases its templates use.
+# Assets are sorted into phases by the first directory of their path named phase_*, e.g. phase_3.5/maps/tie.png.
+enabled: bool = False
+# the directory of the .mf files
+directory: str = "."
+# where the archives are mounted, it should be on the model path. Defaults to the directory of the archives.
+mountPoint: str = None
+
+_mounts: dict[str, MountStats] = {}
+_multifiles: dict[str, Multifile] = {}
+_lock = threading.Lock()
+_vfs = VirtualFileSystem.getGlobalPtr()
+
+
+class MountStats(NamedTuple):
+    phase: str
+    archive: str
+    mounted: bool
+    seconds: float
+    # growth of the resident memory of the process while mounting, in bytes. Only measured on Linux, 0 elsewhere.
+    memory: int
+    # size of the archive on disk, in bytes
+    size: int
+    subfiles: int
+
+
+def enable(archiveDirectory: str = ".", archiveMountPoint: str = None) -> None:
+    """
+    Starts mounting phases on demand.
+    :param archiveDirectory: The directory of the .mf files
+    :param archiveMountPoint: Where to mount them, defaults to archiveDirectory
+    :return:
+    """
+    global enabled, directory, mountPoint
+    enabled = True
+    directory = archiveDirectory
+    mountPoint = archiveMountPoint
+
+
+def disable() -> None:
+    """
+    Stops mounting phases on demand. Phases already mounted stay mounted.
+    :return:
+    """
+    global enabled
+    enabled = False
+
+
+def getPhase(path: str) -> str | None:
+    """
+    :param path: An asset path
+    :return: The phase the asset is in, None if it isn't in one
+    """
+    for part in path.replace("\\", "/").split("/"):
+        if part.startswith("phase_"):
+            return part
+    return None
+
+
+def getPhases(paths: Iterable[str]) -> list[str]:
+    """
+    :param paths: Asset paths
+    :return: The unique phases the assets are in, sorted
+    """
+    phases = {getPhase(path) for path in paths if path is not None}
+    phases.discard(None)
+    return sorted(phases, key=_phaseOrder)
+
+
+def require(path: str) -> None:
+    """
+    Mounts the phase of an asset that is about to be loaded, if it isn't mounted yet. Does nothing while disabled.
+    :param path:
+    :return:
+    """
+    if not enabled or not isinstance(path, str):
+        return
+    phase = getPhase(path)
+    if phase is not None and phase not in _mounts:
+        mount(phase)
+
+
+def requireAll(paths: Iterable[str]) -> list[MountStats]:
+    """
+    Mounts the phases of several assets. Does nothing while disabled.
+    :param paths:
+    :return: The stats of the phases that were mounted by this call
+    """
+    if not enabled:
+        return []
+    return [mount(phase) for phase in getPhases(paths) if phase not in _mounts]
+
+
+def mount(phase: str) -> MountStats:
+    """
+    Mounts the archive of a phase, once. Archives that are missing are reported once and not looked for again.
+    :param phase: e.g. phase_3.5
+    :return: How long mounting took and how much memory it used
+    """
+    with _lock:
+        stats = _mounts.get(phase)
+        if stats is not None:
+            return stats
+
+        archive = os.path.join(directory, f"{phase}.mf")
+        start = time.perf_counter()
+        memoryBefore = _residentMemory()
+        multifile = Multifile()
+        mounted = multifile.openRead(Filename.fromOsSpecific(archive))
+        if mounted:
+            point = Filename.fromOsSpecific(mountPoint if mountPoint is not None else directory)
+            mounted = _vfs.mount(multifile, point, VirtualFileSystem.MFReadOnly)
+        seconds = time.perf_counter() - start
+
+        if mounted:
+            _multifiles[phase] = multifile
+            stats = MountStats(phase, archive, True, seconds, max(0, _residentMemory() - memoryBefore),
+                               os.path.getsize(archive), multifile.getNumSubfiles())
+        else:
+            print(f"PhaseMounter ERROR: Failed to mount {archive}")
+            stats = MountStats(phase, archive, False, seconds, 0, 0, 0)
+        _mounts[phase] = stats
+        return stats
+
+
+def isMounted(phase: str) -> bool:
+    stats = _mounts.get(phase)
+    return stats is not None and stats.mounted
+
+
+def getMountStats() -> list[MountStats]:
+    """
+    :return: The stats of every phase mounted (or that failed to mount) so far, in the order they were mounted
+    """
+    return list(_mounts.values())
+
+
+def unmountAll() -> None:
+    with _lock:
+        for multifile in _multifiles.values():
+            _vfs.unmount(multifile)
+        _multifiles.clear()
+        _mounts.clear()
+
+
+def printStats() -> None:
+    for stats in getMountStats():
+        if not stats.mounted:
+            print(f"PhaseMounter: {stats.phase} failed to mount")
+            continue
+        print(f"PhaseMounter: {stats.phase} mounted in {stats.seconds * 1000:.1f} ms, {stats.subfiles} files, "
+              f"{stats.size / 1048576:.1f} MiB on disk, {stats.memory / 1024:.0f} KiB in memory")
+
+
+def _phaseOrder(phase: str) -> tuple:
+    # phase_3.5 comes before phase_4 and after phase_3
+    number = phase[len("phase_"):]
+    try:
+        return 0, float(number), phase
+    except ValueError:
+        return 1, 0.0, phase
+
+
+def _residentMemory() -> int:
+    try:
+        with open("/proc/self/statm") as file:
+            return int(file.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return 0
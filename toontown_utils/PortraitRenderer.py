@@ -0,0 +1,327 @@
+"""
+Renders portraits of cogs and toons to PNG files without a window, spreading the work over a pool of processes.
+Every worker loads the templates once, then renders its share of the appearances into an offscreen buffer.
+
+    python -m toontown_utils.PortraitRenderer --templates cog.json toon.json --cogs --output portraits
+    python -m toontown_utils.PortraitRenderer --templates packs --appearances npcs.json --workers 8 --software
+
+Appearances are listed in a JSON file, e.g.
+    [{"cog": "ColdCaller", "waiter": true},
+     {"name": "flippy", "toon": {"species": "dog", "head": "ls", "torso": "m", "legs": "m", "headColor": [1, 0.5, 0]}}]
+The toon fields are those of ToonDNA. A manifest of every image and the throughput is written next to the images.
+"""
+from __future__ import annotations
+import argparse
+import json
+import math
+import multiprocessing
+import os
+import re
+import time
+from typing import Any, NamedTuple
+
+from toontown_utils import LoaderUtils
+
+# fraction of the image left around the framed model
+_MARGIN = 1.15
+
+
+class PortraitOptions(NamedTuple):
+    # template files (or directories of them) loaded by every worker
+    templates: list[str]
+    # directories added to the model path
+    modelPaths: list[str] = []
+    size: int = 256
+    # "body" frames the whole actor, "head" only its head
+    framing: str = "body"
+    background: tuple[float, float, float, float] = (0, 0, 0, 0)
+    # render with the software renderer (tinydisplay) instead of the default display
+    software: bool = False
+    # the animation and frame to pose the actors in, if they have it
+    anim: str = "neutral"
+    frame: int = 0
+    # the heading of the actors, 180 faces the camera
+    heading: float = 180
+    fov: float = 30
+    # CogGlobals attributes to override, e.g. the health meter model
+    cogGlobals: dict[str, str] = {}
+
+
+class PortraitResult(NamedTuple):
+    name: str
+    file: str | None
+    # milliseconds spent building, posing and rendering the actor
+    time: float
+    error: str | None = None
+
+
+class PortraitReport(NamedTuple):
+    images: list[PortraitResult]
+    failed: list[PortraitResult]
+    seconds: float
+    workers: int
+
+    def getImagesPerSecond(self) -> float:
+        return len(self.images) / self.seconds if self.seconds else 0.0
+
+
+def renderPortraits(appearances: list[dict[str, Any]], outputDir: str, options: PortraitOptions,
+                    workers: int = None, manifest: str = "manifest.json") -> PortraitReport:
+    """
+    Renders a portrait of every appearance.
+    :param appearances: Dicts with either a "cog" template name (and optional "skelecog" and "waiter" flags) or a "toon"
+    dict of ToonDNA fields. An optional "name" names the image, it defaults to the cog template or toon parts.
+    :param outputDir: The directory to write the images and the manifest to
+    :param options:
+    :param workers: The amount of processes to render in, defaults to the amount of CPUs. With 1, the portraits are
+    rendered in this process, which then can't render anything else afterwards.
+    :param manifest: The name of the manifest file, None to not write one
+    :return: The rendered images and failures, with the time everything took
+    """
+    os.makedirs(outputDir, exist_ok=True)
+    jobs = [(name, os.path.join(outputDir, f"{name}.png"), appearance)
+            for name, appearance in zip(_nameAppearances(appearances), appearances)]
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = max(1, min(workers, len(jobs)))
+
+    start = time.perf_counter()
+    if workers == 1:
+        _initWorker(options)
+        results = [_renderJob(job) for job in jobs]
+    else:
+        # workers are spawned rather than forked, Panda3D's threads and graphics state don't survive a fork
+        context = multiprocessing.get_context("spawn")
+        with context.Pool(workers, initializer=_initWorker, initargs=(options,)) as pool:
+            results = list(pool.imap_unordered(_renderJob, jobs, chunksize=max(1, len(jobs) // (workers * 8))))
+    seconds = time.perf_counter() - start
+
+    report = PortraitReport([result for result in results if result.error is None],
+                            [result for result in results if result.error is not None], seconds, workers)
+    if manifest is not None:
+        _writeManifest(os.path.join(outputDir, manifest), report, options, appearances, jobs)
+    return report
+
+
+def getCogAppearances(names: list[str] = None) -> list[dict[str, Any]]:
+    """
+    :param names: The cog templates to list, every loaded one if None
+    :return: An appearance of each cog for renderPortraits()
+    """
+    from toontown_utils import TemplateManager
+    return [{"cog": name} for name in (names if names is not None else sorted(TemplateManager.Cogs))]
+
+
+def _nameAppearances(appearances: list[dict[str, Any]]) -> list[str]:
+    names = []
+    used: dict[str, int] = {}
+    for appearance in appearances:
+        name = appearance.get("name")
+        if name is None:
+            if "cog" in appearance:
+                name = appearance["cog"]
+                if appearance.get("skelecog"):
+                    name += "-skelecog"
+                if appearance.get("waiter"):
+                    name += "-waiter"
+            else:
+                toon = appearance.get("toon", {})
+                name = "-".join(str(toon.get(field)) for field in ("species", "head", "torso", "legs"))
+        name = re.sub(r"[^\w.-]", "_", name)
+        # identical names get numbered, so no image overwrites another
+        count = used.get(name, 0)
+        used[name] = count + 1
+        names.append(name if count == 0 else f"{name}-{count}")
+    return names
+
+
+def _writeManifest(path: str, report: PortraitReport, options: PortraitOptions, appearances: list[dict[str, Any]],
+                   jobs: list[tuple[str, str, dict]]) -> None:
+    appearanceByName = {name: appearance for (name, _, _), appearance in zip(jobs, appearances)}
+    contents = {
+        "options": options._asdict(),
+        "images": [{"name": result.name, "file": os.path.basename(result.file), "ms": result.time,
+                    "appearance": appearanceByName[result.name]} for result in report.images],
+        "failed": [{"name": result.name, "error": result.error, "appearance": appearanceByName[result.name]}
+                   for result in report.failed],
+        "stats": {"images": len(report.images), "failed": len(report.failed), "seconds": report.seconds,
+                  "imagesPerSecond": report.getImagesPerSecond(), "workers": report.workers},
+    }
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump(contents, file, indent=2)
+
+
+# the renderer of this process, set up by _initWorker()
+_renderer: _PortraitRenderer = None
+
+
+def _initWorker(options: PortraitOptions) -> None:
+    global _renderer
+    _renderer = _PortraitRenderer(options)
+
+
+def _renderJob(job: tuple[str, str, dict[str, Any]]) -> PortraitResult:
+    name, path, appearance = job
+    start = time.perf_counter()
+    try:
+        _renderer.render(appearance, path)
+    except Exception as e:
+        return PortraitResult(name, None, (time.perf_counter() - start) * 1000, f"{type(e).__name__}: {e}")
+    return PortraitResult(name, path, (time.perf_counter() - start) * 1000)
+
+
+class _PortraitRenderer:
+    def __init__(self, options: PortraitOptions) -> None:
+        from panda3d.core import loadPrcFileData, getModelPath, Filename
+
+        display = "load-display p3tinydisplay\n" if options.software else ""
+        loadPrcFileData("", f"window-type offscreen\nwin-size {options.size} {options.size}\n{display}"
+                            f"framebuffer-alpha true\naudio-library-name null\nsync-video false\n"
+                            f"notify-level-egg error\nnotify-level-Actor error\nnotify-level-device fatal")
+
+        from direct.showbase.ShowBase import ShowBase
+        from panda3d.core import AmbientLight, DirectionalLight
+
+        self.options = options
+        self.base = ShowBase()
+        self.base.setBackgroundColor(*options.background)
+        self.base.camLens.setFov(options.fov)
+        for path in reversed(options.modelPaths):
+            getModelPath().prependDirectory(Filename.fromOsSpecific(path))
+
+        ambient = self.base.render.attachNewNode(AmbientLight("ambient"))
+        ambient.node().setColor((0.5, 0.5, 0.5, 1))
+        sun = self.base.render.attachNewNode(DirectionalLight("sun"))
+        sun.node().setColor((0.7, 0.7, 0.7, 1))
+        sun.setHpr(30, -45, 0)
+        self.base.render.setLight(ambient)
+        self.base.render.setLight(sun)
+
+        from toontown_utils import TemplateManager
+        from toontown_utils.cog import CogGlobals
+
+        for attribute, value in options.cogGlobals.items():
+            setattr(CogGlobals, attribute, value)
+        for path in options.templates:
+            if os.path.isdir(path):
+                TemplateManager.loadDirectory(path)
+            elif not TemplateManager.loadFile(path):
+                raise ValueError(f"Could not load templates from {path}")
+
+    def render(self, appearance: dict[str, Any], path: str) -> None:
+        from panda3d.core import Filename
+
+        actor = self.buildActor(appearance)
+        try:
+            actor.reparentTo(self.base.render)
+            actor.setH(self.options.heading)
+            if self.options.anim in actor.getAnimNames():
+                actor.pose(self.options.anim, self.options.frame)
+            self.frame(actor)
+
+            self.base.graphicsEngine.renderFrame()
+            # the buffer is read back on the frame after it was rendered
+            self.base.graphicsEngine.renderFrame()
+            if not self.base.win.saveScreenshot(Filename.fromOsSpecific(path)):
+                raise OSError(f"Could not write {path}")
+        finally:
+            actor.cleanup()
+            actor.removeNode()
+
+    def buildActor(self, appearance: dict[str, Any]):
+        if "cog" in appearance:
+            from toontown_utils import TemplateManager
+            from toontown_utils.cog.CogActor import CogActor
+
+            name = appearance["cog"]
+            if name not in TemplateManager.Cogs:
+                raise KeyError(f"No such cog template {name}")
+            cog = CogActor(name, skelecog=appearance.get("skelecog", False), waiter=appearance.get("waiter", False))
+            if cog.healthMeter is not None:
+                cog.healthMeter.hide()
+            return cog
+
+        from toontown_utils.toon.ToonActor import ToonActor
+        from toontown_utils.toon.ToonDNA import ToonDNA, COLOR_FIELDS
+
+        fields = dict(appearance["toon"])
+        for field in COLOR_FIELDS:
+            if field in fields:
+                fields[field] = LoaderUtils.readColor(fields[field])
+        return ToonActor.fromDNA(ToonDNA(**fields))
+
+    def frame(self, actor) -> None:
+        """
+        Moves the camera so that the actor (or its head) fills the image.
+        """
+        subject = actor
+        if self.options.framing == "head" and actor.head is not None:
+            subject = actor.head
+        bounds = subject.getTightBounds(self.base.render)
+        if bounds is None:
+            bounds = actor.getTightBounds(self.base.render)
+        low, high = bounds
+        center = (low + high) / 2
+        # fit the largest side of the bounds in the vertical field of view
+        extent = max(high.x - low.x, high.z - low.z) / 2 * _MARGIN
+        distance = extent / math.tan(math.radians(self.options.fov / 2)) + (high.y - low.y) / 2
+        self.base.camera.setPos(center.x, center.y - distance, center.z)
+        self.base.camera.lookAt(center)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--templates", nargs="+", required=True, help="Template files or directories to load")
+    parser.add_argument("--model-path", nargs="*", default=[], help="Directories to add to the model path")
+    parser.add_argument("--cogs", nargs="*", help="Cog templates to render, every cog if given without names")
+    parser.add_argument("--appearances", help="JSON file listing the appearances to render")
+    parser.add_argument("--output", default="portraits", help="Directory to write the images and manifest to")
+    parser.add_argument("--workers", type=int, help="Rendering processes, defaults to the amount of CPUs")
+    parser.add_argument("--size", type=int, default=256, help="Width and height of the images")
+    parser.add_argument("--framing", default="body", choices=("body", "head"))
+    parser.add_argument("--background", type=float, nargs=4, default=(0, 0, 0, 0), metavar=("R", "G", "B", "A"))
+    parser.add_argument("--software", action="store_true", help="Render with the software renderer")
+    parser.add_argument("--anim", default="neutral", help="Animation to pose the actors in")
+    parser.add_argument("--frame", type=int, default=0, help="Frame of the animation")
+    parser.add_argument("--cog-global", nargs="*", default=[], metavar="NAME=VALUE",
+                        help="CogGlobals paths to override, e.g. healthMeterModel=gui/meter.bam")
+    args = parser.parse_args()
+
+    appearances: list[dict[str, Any]] = []
+    if args.appearances is not None:
+        with open(args.appearances, encoding="utf-8") as file:
+            appearances.extend(json.load(file))
+    if args.cogs is not None:
+        names = args.cogs or None
+        if names is None:
+            # the templates are needed to list every cog, the workers load them again
+            from toontown_utils import TemplateManager
+            for path in args.templates:
+                if os.path.isdir(path):
+                    TemplateManager.loadDirectory(path)
+                else:
+                    TemplateManager.loadFile(path)
+        appearances.extend(getCogAppearances(names))
+    if not appearances:
+        parser.error("nothing to render, pass --cogs or --appearances")
+
+    options = PortraitOptions(
+        templates=args.templates,
+        modelPaths=args.model_path,
+        size=args.size,
+        framing=args.framing,
+        background=tuple(args.background),
+        software=args.software,
+        anim=args.anim,
+        frame=args.frame,
+        cogGlobals=dict(setting.split("=", 1) for setting in args.cog_global),
+    )
+    report = renderPortraits(appearances, args.output, options, workers=args.workers)
+    for result in report.failed:
+        print(f"PortraitRenderer: {result.name} failed: {result.error}")
+    print(f"PortraitRenderer: {len(report.images)} images in {report.seconds:.2f} s with {report.workers} workers "
+          f"({report.getImagesPerSecond():.1f} images/s)")
+
+
+if __name__ == "__main__":
+    main()
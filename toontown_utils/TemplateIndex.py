@@ -0,0 +1,84 @@
+from typing import Hashable, Iterable
+
+
+class TemplateIndex:
+    """
+    Secondary indexes over the templates of a registry, e.g. cog names by department.
+    Each template is added with the values of its indexed fields. A field can have several values per template, e.g. a
+    cog with two heads. Adding a template again replaces its previous values, so overridden templates stay correct.
+    """
+    def __init__(self) -> None:
+        # field -> value -> names, dicts are used as insertion ordered sets
+        self._fields: dict[str, dict[Hashable, dict[Hashable, None]]] = {}
+        # name -> field -> values
+        self._entries: dict[Hashable, dict[str, tuple]] = {}
+
+    def add(self, name: Hashable, **fields: Iterable[Hashable]) -> None:
+        """
+        Indexes a template, replacing any previous entry with that name.
+        :param name: The name of the template in its registry
+        :param fields: The values of each indexed field
+        :return:
+        """
+        self.remove(name)
+        entry = {field: tuple(values) for field, values in fields.items()}
+        self._entries[name] = entry
+        for field, values in entry.items():
+            index = self._fields.setdefault(field, {})
+            for value in values:
+                index.setdefault(value, {})[name] = None
+
+    def remove(self, name: Hashable) -> None:
+        entry = self._entries.pop(name, None)
+        if entry is None:
+            return
+        for field, values in entry.items():
+            index = self._fields[field]
+            for value in values:
+                names = index[value]
+                names.pop(name, None)
+                if not names:
+                    del index[value]
+
+    def query(self, **criteria: Hashable) -> list[Hashable]:
+        """
+        Finds the templates matching every criterion. Criteria that are None are ignored.
+        Only the smallest matching set is scanned, so a query costs about as much as its result.
+        :param criteria: The value each field must have
+        :return: The names of the matching templates, in the order they were added
+        """
+        criteria = {field: value for field, value in criteria.items() if value is not None}
+        if not criteria:
+            return list(self._entries)
+
+        candidates = []
+        for field, value in criteria.items():
+            names = self._fields.get(field, {}).get(value)
+            if not names:
+                return []
+            candidates.append((len(names), field, names))
+        _, smallestField, names = min(candidates, key=lambda candidate: candidate[0])
+
+        others = [(field, value) for field, value in criteria.items() if field != smallestField]
+        return [name for name in names if all(value in self._entries[name][field] for field, value in others)]
+
+    def getValues(self, field: str) -> list[Hashable]:
+        """
+        :param field:
+        :return: Every value of the field that at least one template has
+        """
+        return list(self._fields.get(field, {}))
+
+    def clear(self) -> None:
+        self._fields.clear()
+        self._entries.clear()
+
+    def update(self, other: "TemplateIndex") -> None:
+        for name, entry in other._entries.items():
+            self.add(name, **entry)
+
+    def __contains__(self, name: Hashable) -> bool:
+        return name in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
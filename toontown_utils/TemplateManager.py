@@ -1,11 +1,21 @@
 from __future__ import annotations
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, NamedTuple, Iterable
+from concurrent.futures import ThreadPoolExecutor
+import glob
 import json
+import os
+import pickle
+import time
 
-from toontown_utils.cog import CogLoader
+from panda3d.core import Filename, Loader, LoaderOptions, TexturePool, VirtualFileSystem, getModelPath
+
+from toontown_utils import AssetIndex, PhaseMounter
+from toontown_utils.LazyRegistry import LazyRegistry
+from toontown_utils.cog import CogLoader, CogGlobals
 
 from toontown_utils.toon import ToonLoader
 if TYPE_CHECKING:
+    from toontown_utils.cog.TemplateCog import TemplateCog
     from toontown_utils.toon.ToonPart import ToonPart
 
 Cogs = CogLoader.Cogs
@@ -16,6 +26,66 @@ Legs = ToonLoader.Legs
 Torsos = ToonLoader.Torsos
 Species = ToonLoader.Species
 
+# bump whenever the template classes change, so that old caches are rejected
+CACHE_VERSION = 4
+
+# (absolute path, mtime in ns, size) of every file loaded so far, used to validate caches
+_loadedSources: list[tuple[str, int, int]] = []
+
+
+class LoadedFile(NamedTuple):
+    path: str
+    schema: str | None
+    loaded: bool
+    parseSeconds: float
+    mergeSeconds: float
+
+
+class TemplateConflict(NamedTuple):
+    registry: str
+    name: str
+    # the file that defined the template before, None if it was loaded before loadDirectory() was called
+    previous: str | None
+    winner: str
+
+
+class DirectoryReport(NamedTuple):
+    files: list[LoadedFile]
+    conflicts: list[TemplateConflict]
+    seconds: float
+
+
+# sections of the template files, in the order loadDirectory() merges them across all files, so that everything a
+# template references is merged before the template itself, whichever file defines it
+_SECTIONS = (
+    ("cog", "departments"),
+    ("cog", "bodies"),
+    ("toon", "parts"),
+    ("cog", "cogs"),
+    ("toon", "species"),
+)
+
+
+class PreloadedAsset(NamedTuple):
+    path: str
+    kind: str
+    loaded: bool
+    seconds: float
+    bytes: int = 0
+
+
+def setLazy(lazy: bool) -> None:
+    """
+    Sets whether templates loaded from now on are kept as raw data, only being built and validated when they are first
+    looked up. Useful with large content packs of which a scene only uses a few templates. Templates that fail to build
+    print their error on first access and are then removed from their registry.
+    Departments and bodies are always loaded immediately.
+    :param lazy:
+    :return:
+    """
+    CogLoader.lazy = lazy
+    ToonLoader.lazy = lazy
+
 
 def getLegs(type: str, clothingType: str) -> ToonPart:
     try:
@@ -31,35 +101,501 @@ def getTorso(type: str, clothingType: str) -> ToonPart:
         return Torsos["all"][type]
 
 
+def findName(registry, template) -> str | None:
+    """
+    :param registry: A dict of templates, e.g. Bodies
+    :param template:
+    :return: The name the template is registered under, None if it isn't
+    """
+    for name, candidate in registry.items():
+        if candidate is template:
+            return name
+    return None
+
+
+def queryCogs(department: str = None, body: str = None, head: str = None, size: float = None,
+              headsModel: str = None) -> list[TemplateCog]:
+    """
+    Finds the cog templates matching every given criterion, using indexes kept up to date as files are loaded.
+    :param department: The name of the department
+    :param body: The name of the body
+    :param head: A head part the cog uses, as head or head2
+    :param size: Matches every cog of the same size rounded down, e.g. 4 matches sizes 4 to 4.99
+    :param headsModel: The heads model of the cog's body
+    :return: The matching templates, in load order
+    """
+    if size is not None:
+        size = CogLoader.getSizeBucket(size)
+
+    if headsModel is None:
+        names = CogLoader.CogIndex.query(department=department, body=body, head=head, size=size)
+    else:
+        names = []
+        for bodyName, bodyType in Bodies.items():
+            if bodyType.headsModel == headsModel and (body is None or body == bodyName):
+                names.extend(CogLoader.CogIndex.query(department=department, body=bodyName, head=head, size=size))
+
+    templates = []
+    for name in names:
+        template = Cogs.get(name)
+        if template is None:
+            # a lazily loaded template that turned out to be invalid
+            CogLoader.CogIndex.remove(name)
+            continue
+        templates.append(template)
+    return templates
+
+
+def queryHeads(species: str = None, head: str = None) -> list[tuple[str, str]]:
+    """
+    Finds toon heads by species and/or head name, e.g. every species that has a "ls" head.
+    :param species:
+    :param head:
+    :return: (species, head) name pairs
+    """
+    return ToonLoader.HeadIndex.query(species=species, head=head)
+
+
+def queryParts(area: str, clothingType: str) -> list[str]:
+    """
+    Lists the parts a toon wearing the clothing type can use, as resolved by getLegs() and getTorso().
+    :param area: "legs" or "torsos"
+    :param clothingType:
+    :return: The part names
+    """
+    registry = Legs if area == "legs" else Torsos
+    names = dict.fromkeys(registry.get(clothingType, ()))
+    names.update(dict.fromkeys(registry["all"]))
+    return list(names)
+
+
 def loadFile(path: str, schema: str = None) -> bool:
+    contents = _readFile(path)
+    if contents is None:
+        return False
+
+    if schema is None:
+        schema = _detectSchema(contents, path)
+        if schema is None:
+            return False
+
+    if schema == "toon":
+        ToonLoader.readFile(contents)
+    elif schema == "cog":
+        CogLoader.readFile(contents)
+
+    source = _getSourceStamp(path)
+    if source is not None:
+        _loadedSources.append(source)
+    return True
+
+
+def _readFile(path: str) -> dict | None:
     try:
         file = open(path, 'r', encoding='utf-8')
     except OSError:
         print(f"TemplateManager ERROR: Failed to open {path}")
-        return False
+        return None
 
     try:
         contents: dict = json.loads(file.read())
     except json.JSONDecodeError:
-        file.close()
         print(f"TemplateManager ERROR: {path} is not a valid JSON file.")
-        return False
+        return None
+    finally:
+        file.close()
+    return contents
 
-    file.close()
 
-    if schema is None:
-        schema = contents.get("$schema")
-        if schema == "toonschema.json":
-            schema = "toon"
-        elif schema == "cogschema.json":
-            schema = "cog"
+def _detectSchema(contents: dict, path: str) -> str | None:
+    schema = contents.get("$schema")
+    if schema == "toonschema.json":
+        return "toon"
+    elif schema == "cogschema.json":
+        return "cog"
+    print(f"TemplateManager ERROR: Could not auto-detect schema of {path}")
+    return None
+
+
+def loadFiles(paths: list[str], cachePath: str = None) -> bool:
+    """
+    Loads several template files in order. If cachePath is given and holds a cache of exactly these files, unchanged
+    since it was written, the cache is loaded instead. Otherwise the files are loaded and the cache is rewritten.
+    A cache holds every loaded template, so it must be loaded before any other template: the cache isn't written if
+    templates were already loaded when loadFiles() was called.
+    :param paths:
+    :param cachePath:
+    :return: True if every file (or the cache) was loaded successfully
+    """
+    if cachePath is not None and loadCache(cachePath, paths):
+        return True
+
+    loadedBefore = _hasTemplates()
+    success = True
+    for path in paths:
+        success = loadFile(path) and success
+
+    if cachePath is not None and success:
+        if loadedBefore:
+            print(f"TemplateManager WARN: Not writing the cache {cachePath}, other templates were loaded before "
+                  f"{', '.join(paths)}")
         else:
-            print(f"TemplateManager ERROR: Could not auto-detect schema of {path}")
+            saveCache(cachePath, paths)
+    return success
+
+
+def _hasTemplates() -> bool:
+    if Cogs or Departments or Bodies or Species:
+        return True
+    return any(parts for registry in (Legs, Torsos) for parts in registry.values())
+
+
+def loadDirectory(path: str, pattern: str = "*.json", priority: dict[str, int] = None, recursive=False,
+                  maxWorkers: int = None, warnConflicts=True) -> DirectoryReport:
+    """
+    Loads every template file in a directory (or matching a glob pattern), reading and parsing them on a thread pool.
+    Files are merged in a deterministic order: by priority, then by path. When several files define the same template,
+    the one merged last wins and the conflict is reported.
+    Sections are merged across all files before the next one, departments and bodies before cogs and parts before
+    species, so templates can reference things defined in other files.
+    :param path: A directory, or a glob pattern if it isn't one
+    :param pattern: The pattern of the files to load inside the directory
+    :param priority: Priority of files by file name, default 0. Files with a higher priority are merged later.
+    :param recursive: Should subdirectories be searched too? "**" in the pattern matches any subdirectory.
+    :param maxWorkers: The maximum amount of parsing threads
+    :param warnConflicts: Should conflicts be printed?
+    :return: The time each file took to parse and merge, and every conflict
+    """
+    start = time.perf_counter()
+    if os.path.isdir(path):
+        pattern = os.path.join(path, "**", pattern) if recursive else os.path.join(path, pattern)
+    else:
+        pattern = path
+    priority = priority or {}
+    paths = sorted(glob.glob(pattern, recursive=recursive),
+                   key=lambda file: (priority.get(os.path.basename(file), 0), file))
+
+    with ThreadPoolExecutor(max_workers=maxWorkers) as executor:
+        parsed = list(executor.map(_parseFile, paths))
+
+    mergeSeconds = [0.0] * len(paths)
+    owners: dict[tuple[str, str], str] = {}
+    conflicts: list[TemplateConflict] = []
+    for schema, section in _SECTIONS:
+        for i, (filePath, (contents, fileSchema, _)) in enumerate(zip(paths, parsed)):
+            if fileSchema != schema or contents.get(section) is None:
+                continue
+            sectionStart = time.perf_counter()
+            data = contents[section]
+            for key in _listTemplates(section, data):
+                if key in owners or _isLoaded(*key):
+                    conflicts.append(TemplateConflict(*key, owners.get(key), filePath))
+                owners[key] = filePath
+            _mergeSection(section, data)
+            mergeSeconds[i] += time.perf_counter() - sectionStart
+
+    files = []
+    for filePath, (contents, schema, parseSeconds), merge in zip(paths, parsed, mergeSeconds):
+        files.append(LoadedFile(filePath, schema, schema is not None, parseSeconds, merge))
+        if schema is not None:
+            source = _getSourceStamp(filePath)
+            if source is not None:
+                _loadedSources.append(source)
+
+    if warnConflicts:
+        for conflict in conflicts:
+            previous = conflict.previous if conflict.previous is not None else "an earlier load"
+            print(f"TemplateManager WARN: {conflict.registry} {conflict.name} from {previous} "
+                  f"is overridden by {conflict.winner}")
+    return DirectoryReport(files, conflicts, time.perf_counter() - start)
+
+
+def _parseFile(path: str) -> tuple[dict | None, str | None, float]:
+    start = time.perf_counter()
+    contents = _readFile(path)
+    schema = _detectSchema(contents, path) if contents is not None else None
+    return contents, schema, time.perf_counter() - start
+
+
+def _listTemplates(section: str, data: dict) -> list[tuple[str, str]]:
+    if section != "parts":
+        return [(section, name) for name in data]
+    templates = []
+    for area in ("legs", "torsos"):
+        for category in ("all", "skirt", "shorts"):
+            parts = data.get(area, {}).get(category)
+            if parts is not None:
+                templates.extend((f"{area}/{category}", name) for name in parts)
+    return templates
+
+
+def _isLoaded(registry: str, name: str) -> bool:
+    if "/" in registry:
+        area, category = registry.split("/")
+        return name in (Legs if area == "legs" else Torsos).get(category, {})
+    return name in {"departments": Departments, "bodies": Bodies, "cogs": Cogs, "species": Species}[registry]
+
+
+def _mergeSection(section: str, data: dict) -> None:
+    if section == "departments":
+        CogLoader.loadDepartments(data)
+    elif section == "bodies":
+        CogLoader.loadBodies(data)
+    elif section == "cogs":
+        CogLoader.loadCogs(data)
+    elif section == "parts":
+        ToonLoader.loadAllParts(data)
+    elif section == "species":
+        ToonLoader.loadSpecies(data)
+
+
+def saveCache(path: str, sources: list[str] = None) -> bool:
+    """
+    Writes every loaded template to a binary cache file, along with the path, modification time and size of the
+    files they were loaded from. Loading the cache skips JSON parsing and all the template normalization.
+    :param path:
+    :param sources: The files the loaded templates come from, defaults to every file loaded so far. The cache is
+    rejected once any of them changes.
+    :return: True if the cache was written
+    """
+    if sources is None:
+        stamps = _loadedSources
+    else:
+        stamps = [_getSourceStamp(source) for source in sources]
+        if None in stamps:
+            print(f"TemplateManager ERROR: Failed to write cache {path}, a source file is missing")
             return False
+    registries = {
+        "Cogs": Cogs,
+        "Departments": Departments,
+        "Bodies": Bodies,
+        "Legs": Legs,
+        "Torsos": Torsos,
+        "Species": Species,
+        "CogIndex": CogLoader.CogIndex,
+        "HeadIndex": ToonLoader.HeadIndex,
+    }
+    try:
+        with open(path, 'wb') as file:
+            pickle.dump((CACHE_VERSION, stamps, registries), file, protocol=pickle.HIGHEST_PROTOCOL)
+    except OSError:
+        print(f"TemplateManager ERROR: Failed to write cache {path}")
+        return False
+    return True
 
-    if schema == "toon":
-        ToonLoader.readFile(contents)
-    elif schema == "cog":
-        CogLoader.readFile(contents)
 
+def loadCache(path: str, sources: list[str] = None) -> bool:
+    """
+    Loads templates from a cache written by saveCache(), if every file it was built from is unchanged.
+    Cache files are trusted, only load caches your application wrote itself.
+    :param path:
+    :param sources: If given, the cache is only used if it was built from exactly these files, in this order.
+    :return: True if the cache was valid and has been loaded
+    """
+    try:
+        with open(path, 'rb') as file:
+            version, cachedSources, registries = pickle.load(file)
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError, ValueError, TypeError):
+        return False
+
+    if version != CACHE_VERSION:
+        return False
+    if sources is not None and [os.path.abspath(source) for source in sources] != [s[0] for s in cachedSources]:
+        return False
+    for source in cachedSources:
+        if _getSourceStamp(source[0]) != tuple(source):
+            return False
+
+    Cogs.update(registries["Cogs"])
+    Departments.update(registries["Departments"])
+    Bodies.update(registries["Bodies"])
+    Species.update(registries["Species"])
+    CogLoader.CogIndex.update(registries["CogIndex"])
+    ToonLoader.HeadIndex.update(registries["HeadIndex"])
+    for registry, cached in ((Legs, registries["Legs"]), (Torsos, registries["Torsos"])):
+        for category, parts in cached.items():
+            registry.setdefault(category, LazyRegistry()).update(parts)
+
+    _loadedSources.extend(tuple(source) for source in cachedSources)
     return True
+
+
+def _getSourceStamp(path: str) -> tuple[str, int, int] | None:
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return os.path.abspath(path), stat.st_mtime_ns, stat.st_size
+
+
+def collectAssetPaths(cogs: Iterable[str] = None, departments: Iterable[str] = None,
+                      species: Iterable[str] = None) -> tuple[list[str], list[str]]:
+    """
+    Walks the loaded templates and collects the models (including animations) and textures they reference.
+    If no selection is given, every loaded template is included.
+    :param cogs: Names of cog templates to include
+    :param departments: Names of departments to include all cogs of
+    :param species: Names of species to include all heads of. Selecting any species also includes all toon legs and torsos
+    :return: The unique model paths and texture paths
+    """
+    selectAll = cogs is None and departments is None and species is None
+    models: dict[str, None] = {}
+    textures: dict[str, None] = {}
+
+    cogTemplates = []
+    if selectAll:
+        cogTemplates.extend(Cogs.values())
+    else:
+        for name in cogs or ():
+            try:
+                cogTemplates.append(Cogs[name])
+            except KeyError:
+                print(f"TemplateManager ERROR: No such cog template {name}")
+        for name in departments or ():
+            dept = Departments.get(name)
+            if dept is None:
+                print(f"TemplateManager ERROR: No such department {name}")
+                continue
+            cogTemplates.extend(cog for cog in Cogs.values() if cog.department == dept)
+
+    for cog in cogTemplates:
+        body = cog.body
+        for skelecog in (False, True) if body.skelecog is not None else (False,):
+            for lose in (False, True):
+                models.update(dict.fromkeys(CogLoader.getModelPaths(body, cog.department, skelecog=skelecog, lose=lose)))
+        dept = cog.department
+        textures.update(dict.fromkeys((dept.leg, dept.blazer, dept.sleeve, dept.tie)))
+        if cog.headTexture is not None:
+            textures[cog.headTexture] = None
+    if cogTemplates:
+        textures.update(dict.fromkeys((CogGlobals.waiterLeg, CogGlobals.waiterBlazer, CogGlobals.waiterSleeve)))
+
+    speciesTemplates = []
+    if selectAll:
+        speciesTemplates.extend(Species.values())
+    else:
+        for name in species or ():
+            try:
+                speciesTemplates.append(Species[name])
+            except KeyError:
+                print(f"TemplateManager ERROR: No such species {name}")
+
+    if speciesTemplates:
+        for partDict in (*Legs.values(), *Torsos.values()):
+            for part in partDict.values():
+                models[part.model] = None
+                if part.lods is not None:
+                    models.update(dict.fromkeys(lod.model for lod in part.lods))
+                if part.anims is not None:
+                    models.update(dict.fromkeys(part.anims.values()))
+        for speciesTemplate in speciesTemplates:
+            for head in speciesTemplate.heads.values():
+                models[head.model] = None
+                if head.anims is not None:
+                    models.update(dict.fromkeys(head.anims.values()))
+                if head.extraMuzzles is not None:
+                    models.update(dict.fromkeys(head.extraMuzzles.keys()))
+                if head.eyelashes.model:
+                    models[head.eyelashes.model] = None
+
+    models.pop(None, None)
+    textures.pop(None, None)
+    return list(models), list(textures)
+
+
+def preload(cogs: Iterable[str] = None, departments: Iterable[str] = None, species: Iterable[str] = None,
+            maxWorkers: int = None) -> list[PreloadedAsset]:
+    """
+    Loads every model, animation and texture referenced by the selected templates into the ModelPool and TexturePool,
+    using a thread pool. Actors built afterwards don't need to touch the disk.
+    The selection works as in collectAssetPaths(): if nothing is selected, every loaded template is preloaded.
+    If the PhaseMounter is enabled, the phases of the selected templates are mounted first.
+    :param cogs: Names of cog templates to preload
+    :param departments: Names of departments to preload all cogs of
+    :param species: Names of species to preload
+    :param maxWorkers: The maximum amount of loading threads
+    :return: A report of every asset, with the time it took to load and its file size
+    """
+    models, textures = collectAssetPaths(cogs, departments, species)
+    PhaseMounter.requireAll(models + textures)
+    jobs = [(path, "model") for path in models] + [(path, "texture") for path in textures]
+    with ThreadPoolExecutor(max_workers=maxWorkers) as executor:
+        results = list(executor.map(lambda job: _preloadAsset(*job), jobs))
+
+    for result in results:
+        if not result.loaded:
+            print(f"TemplateManager ERROR: Failed to preload {result.kind} {result.path}")
+    return results
+
+
+def resolveAssets(cogs: Iterable[str] = None, departments: Iterable[str] = None, species: Iterable[str] = None,
+                  refresh=False, report=True) -> AssetIndex.AssetReport:
+    """
+    Resolves every model, animation and texture path of the selected templates against the model path once, and
+    keeps the results in the AssetIndex. Actors and loaders then load the resolved paths directly, and missing or
+    ambiguous assets are known before any actor is built.
+    The selection works as in collectAssetPaths(): if nothing is selected, every loaded template is resolved.
+    If the PhaseMounter is enabled, the phases of the selected templates are mounted first.
+    Resolve the assets again after changing the model path or mounting new files, with refresh=True.
+    :param cogs: Names of cog templates to resolve
+    :param departments: Names of departments to resolve all cogs of
+    :param species: Names of species to resolve
+    :param refresh: Should paths resolved by an earlier call be resolved again?
+    :param report: Should missing, ambiguous and substituted assets be printed?
+    :return: The assets that were resolved, missing or ambiguous
+    """
+    models, textures = collectAssetPaths(cogs, departments, species)
+    # assets can only be found once their phase is mounted
+    PhaseMounter.requireAll(models + textures)
+    assets = AssetIndex.build(models, textures, refresh=refresh)
+    if report:
+        AssetIndex.printReport(assets)
+    return assets
+
+
+def getPhaseMap(cogs: Iterable[str] = None, departments: Iterable[str] = None,
+                species: Iterable[str] = None) -> dict[tuple[str, str], list[str]]:
+    """
+    Maps templates to the phases their assets are in, e.g. to plan which phase archives a scene needs.
+    The selection works as in collectAssetPaths(): if nothing is selected, every loaded template is mapped.
+    :param cogs: Names of cog templates to map
+    :param departments: Names of departments to map all cogs of
+    :param species: Names of species to map
+    :return: The phases of ("cog", name) and ("species", name) keys. A species needs the phases of its heads and of
+    every toon torso and legs.
+    """
+    selectAll = cogs is None and departments is None and species is None
+    cogNames = list(Cogs) if selectAll else list(cogs or ())
+    for name in departments or ():
+        dept = Departments.get(name)
+        if dept is None:
+            print(f"TemplateManager ERROR: No such department {name}")
+            continue
+        cogNames.extend(cog for cog, template in Cogs.items() if template.department == dept)
+    speciesNames = list(Species) if selectAll else list(species or ())
+
+    phaseMap: dict[tuple[str, str], list[str]] = {}
+    for name in dict.fromkeys(cogNames):
+        models, textures = collectAssetPaths(cogs=[name])
+        phaseMap[("cog", name)] = PhaseMounter.getPhases(models + textures)
+    for name in speciesNames:
+        models, textures = collectAssetPaths(species=[name])
+        phaseMap[("species", name)] = PhaseMounter.getPhases(models + textures)
+    return phaseMap
+
+
+def _preloadAsset(path: str, kind: str) -> PreloadedAsset:
+    start = time.perf_counter()
+    filename = Filename(AssetIndex.resolve(path))
+    if kind == "model":
+        # the loader keeps the model in the ModelPool
+        loaded = Loader.getGlobalPtr().loadSync(filename, LoaderOptions()) is not None
+    else:
+        loaded = TexturePool.loadTexture(filename) is not None
+    seconds = time.perf_counter() - start
+
+    size = 0
+    file = VirtualFileSystem.getGlobalPtr().findFile(filename, getModelPath().getValue())
+    if file is not None:
+        size = file.getFileSize()
+    return PreloadedAsset(path, kind, loaded, seconds, size)
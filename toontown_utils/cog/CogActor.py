@@ -1,9 +1,26 @@
-from panda3d.core import NodePath, Texture
+from typing import NamedTuple
+
+from panda3d.core import NodePath, Texture, RenderState
 from direct.actor.Actor import Actor
 
 from toontown_utils.cog.TemplateCog import *
-from toontown_utils.cog import CogGlobals
-from toontown_utils.TemplateManager import Cogs
+from toontown_utils import LoaderUtils, AnimCache, ActorRegistry, AssetIndex, PhaseMounter, ActorBaker
+from toontown_utils.cog import CogGlobals, CogAssetCache, CogLoader, CogStates
+from toontown_utils.TemplateManager import Cogs, Bodies, Departments, findName
+
+
+class ModelVariant(NamedTuple):
+    """
+    A body model (one per level of detail) kept resident while another one is shown, along with the attachments built
+    for it.
+    """
+    models: list[NodePath]
+    nodeIndices: list[dict[str, NodePath]]
+    department: Department = None
+    head: NodePath = None
+    medallion: NodePath = None
+    healthMeter: NodePath = None
+    healthMeterGlow: NodePath = None
 
 
 class CogActor(Actor):
@@ -11,7 +28,7 @@ class CogActor(Actor):
     # they could also be made redundant in future by loading attachments + texture areas from body script
     def __init__(self, cogType: TemplateCog | str = None,
                  bodyType: CogBody = None, dept: Department = None, head: str = None,
-                 skelecog=False, waiter=False, lose=False) -> None:
+                 skelecog=False, waiter=False, lose=False, keepVariants=False) -> None:
         """
         CogActor constructor.
         If cogType is specified, bodyType, dept and head are ignored.
@@ -23,11 +40,21 @@ class CogActor(Actor):
         :param skelecog: Should this cog be a skelecog?
         :param waiter: Should this cog be a waiter?
         :param lose: Should the lose model be used?
+        :param keepVariants: Should the normal, lose and skelecog models be kept loaded when switching between them?
+        This makes becomeLoseActor(), becomeNormalActor() and setSkelecog() instant after the first switch, at the cost
+        of memory. See also prepareVariants().
+        If the first Body the cog is created with has levels of detail, the cog becomes an LOD actor that switches
+        between them by distance. Models without levels of detail (e.g. lose models) are then shown at every distance.
         """
         Actor.__init__(self)
+        ActorRegistry.register(self)
         self._isLose = lose
         self._isSkelecog = skelecog
 
+        self._keepVariants = keepVariants
+        self._variants: dict[tuple[bool, bool], ModelVariant] = {}
+        self._modelVariant: tuple[bool, bool] = None
+
         self._bodyType: CogBody = bodyType
         self._medallionDept: Department = dept
 
@@ -36,6 +63,12 @@ class CogActor(Actor):
         self.healthMeter: NodePath = None
         self.healthMeterGlow: NodePath = None
         self.showingHeads: list[str] = []
+        self._nodeIndex: dict[str, NodePath] = {}
+        # the names of the levels of detail, from the most detailed, empty if the cog isn't an LOD actor
+        self._lodNames: list[str] = []
+        # the node indices of the lower levels of detail
+        self._lodIndices: list[dict[str, NodePath]] = []
+        self._frozen = False
 
         self._legTexture = None
         self._blazerTexture = None
@@ -60,9 +93,126 @@ class CogActor(Actor):
             if waiter:
                 self.makeWaiter()
 
+    @classmethod
+    async def create(cls, cogType: TemplateCog | str = None,
+                     bodyType: CogBody = None, dept: Department = None, head: str = None,
+                     skelecog=False, waiter=False, lose=False, keepVariants=False,
+                     parent: NodePath = None) -> "CogActor":
+        """
+        Asynchronously creates a CogActor. Every model and animation it needs is loaded in parallel on Panda3D's
+        loader threads first, so that building the actor afterwards doesn't stall the frame on disk access.
+        Use it with await inside a coroutine, or pass it to taskMgr.add() and await/poll the returned task.
+        Takes the same arguments as the constructor.
+        :param parent: The node to parent the actor to once it is fully built.
+        :return: The new actor
+        """
+        template = cogType
+        if isinstance(template, str):
+            template = Cogs.get(template)
+        if template is not None:
+            bodyType = template.body
+            dept = template.department
+
+        if bodyType is not None:
+            await LoaderUtils.loadModelsAsync(CogLoader.getModelPaths(bodyType, dept, skelecog=skelecog, lose=lose))
+
+        actor = cls(cogType, bodyType=bodyType, dept=dept, head=head, skelecog=skelecog, waiter=waiter, lose=lose,
+                    keepVariants=keepVariants)
+        if parent is not None:
+            actor.reparentTo(parent)
+        return actor
+
+    def bake(self, path: str, embedTextures=False) -> bool:
+        """
+        Writes the cog as it is assembled, with its textures, colors, heads, medallion and health meter, to a single BAM
+        file that fromBaked() loads back in one go. Only the current model is written, not the kept variants.
+        :param path: The .bam file to write
+        :param embedTextures: Should the textures be stored in the file? They're loaded by path otherwise, like the
+        textures of the models.
+        :return: Whether the file was written
+        """
+        models = self.getBodyModels()
+        if not models:
+            print("CogActor: bake() called, but the cog has no model")
+            return False
+
+        animations = self._bodyType.animations
+        if animations is not None and self._isLose:
+            animations = {self._bodyType.loseAnim: animations[self._bodyType.loseAnim]} \
+                if self._bodyType.loseAnim in animations else None
+        attachments = {"head": self.head, "medallion": self.medallion, "healthMeter": self.healthMeter,
+                       "healthMeterGlow": self.healthMeterGlow}
+        metadata = {
+            "body": findName(Bodies, self._bodyType),
+            "department": findName(Departments, self._medallionDept),
+            "skelecog": self._isSkelecog,
+            "lose": self._isLose,
+            "frozen": self._frozen,
+            "showingHeads": self.showingHeads,
+            "lodDistances": ActorBaker.getLODDistances(self, self._lodNames),
+            "scale": list(self.getScale()),
+            "animations": animations,
+            "textures": {name: ActorBaker.getTexturePath(texture) for name, texture in (
+                ("leg", self._legTexture), ("blazer", self._blazerTexture), ("sleeve", self._sleeveTexture),
+                ("tie", self._tieTexture), ("head", self._headTexture))},
+            "gloveColor": ActorBaker.encodeColor(self._gloveColor),
+            "headColor": ActorBaker.encodeColor(self._headColor),
+            "nodes": {name: LoaderUtils.pathTo(models[0], node)
+                      for name, node in attachments.items() if node is not None},
+        }
+        return ActorBaker.write(self, path, "cog", metadata, embedTextures)
+
+    @classmethod
+    def fromBaked(cls, path: str) -> "CogActor | None":
+        """
+        Creates a cog from a file written by bake(), loading its whole model at once.
+        The cog can change its appearance like any other cog. Changing its model (e.g. becoming a skelecog), or showing
+        another head on a cog that was frozen when baked, needs its Body to be loaded in the TemplateManager under the
+        name it had when it was baked.
+        :param path:
+        :return: The new actor, None if the file couldn't be loaded
+        """
+        baked = ActorBaker.read(path, "cog")
+        if baked is None:
+            return None
+        data = baked.metadata
+
+        actor = cls(skelecog=data["skelecog"], lose=data["lose"])
+        actor._bodyType = Bodies.get(data["body"])
+        actor._medallionDept = Departments.get(data["department"])
+        actor._modelVariant = (data["skelecog"], data["lose"])
+        actor._lodNames = ActorBaker.setupLODs(actor, data["lodDistances"])
+        for partName, lodName, model in baked.parts:
+            actor.loadModel(model, partName, lodName, copy=False)
+        actor.buildNodeIndex()
+
+        top = actor.getBodyModels()[0]
+        nodes = {name: LoaderUtils.walk(top, nodePath) for name, nodePath in data["nodes"].items()}
+        actor.head = nodes.get("head")
+        actor.medallion = nodes.get("medallion")
+        actor.healthMeter = nodes.get("healthMeter")
+        actor.healthMeterGlow = nodes.get("healthMeterGlow")
+
+        textures = data["textures"]
+        actor._legTexture = ActorBaker.getTexture(baked, textures["leg"])
+        actor._blazerTexture = ActorBaker.getTexture(baked, textures["blazer"])
+        actor._sleeveTexture = ActorBaker.getTexture(baked, textures["sleeve"])
+        actor._tieTexture = ActorBaker.getTexture(baked, textures["tie"])
+        actor._headTexture = ActorBaker.getTexture(baked, textures["head"])
+        actor._gloveColor = ActorBaker.decodeColor(data["gloveColor"])
+        actor._headColor = ActorBaker.decodeColor(data["headColor"])
+        actor.showingHeads = data["showingHeads"]
+        actor._frozen = data["frozen"]
+
+        actor.setScale(*data["scale"])
+        if data["animations"] is not None:
+            AnimCache.loadAnims(actor, data["animations"])
+        return actor
+
     def loadTemplate(self, template: TemplateCog | str) -> None:
         """
         Applies all the data from a template onto the actor.
+        The current model is kept if it already uses the template's Body.
         :param template: Either the template, or the string name of the template
         :return:
         """
@@ -73,19 +223,59 @@ class CogActor(Actor):
                 print(f"CogActor: No such cog template {template}")
                 return
 
-        self.createModel(template.body, department=template.department, skelecog=self._isSkelecog, lose=self._isLose)
+        if "modelRoot" not in self.getPartNames() or self._bodyType != template.body:
+            self.createModel(template.body, department=template.department, skelecog=self._isSkelecog, lose=self._isLose)
+        elif self._medallionDept != template.department or (self.medallion is None and not self._isLose):
+            # the model can be reused, only the medallion needs to be swapped
+            self.createMedallion(template.department)
         self.setScale(template.size / template.body.sizeFactor)
 
-        self.setDepartmentTextures(template.department)
-        self.setGloveColor(template.gloveColor)
-        self.setHeadColor(template.headColor)
+        states = CogStates.getTemplateStates(template)
+        self.applyBodyStates(states.body)
+        self._setGloveState(template.gloveColor, states.gloves)
+        self._setHeadState(template.headColor, states.head)
 
         self.showHeadModel(template.head)
 
         if template.head2 is not None:
             self.showHeadModel(template.head2, False)
 
-        self.setHeadTexture(template.headTexture)
+        self.setHeadTexture(states.headTexture)
+
+    def resetState(self) -> None:
+        """
+        Returns the actor to a neutral state without unloading its model, so that it can be reused for another cog.
+        Stops animations, clears the transform, leaves the lose model, hides the heads and clears the head
+        texture, head color, glove color and health meter color.
+        :return:
+        """
+        self.stop()
+        self.clearTransform()
+        self.clearColorScale()
+        self.show()
+        if self._isLose:
+            self.becomeNormalActor()
+
+        self.hideHeadModels()
+        self.setHeadTexture(None)
+        self.setHeadColor(None)
+        self.setGloveColor(None)
+
+        if self.healthMeter is not None:
+            self.setHealthMeterColor(CogGlobals.HealthColor["off"], CogGlobals.HealthGlowColor["green"])
+            self.healthMeter.hide()
+
+    def getBodyType(self) -> CogBody:
+        return self._bodyType
+
+    def getDepartment(self) -> Department:
+        return self._medallionDept
+
+    def isSkelecog(self) -> bool:
+        return self._isSkelecog
+
+    def isLose(self) -> bool:
+        return self._isLose
 
     def createHead(self, bodyType: CogBody):
         """
@@ -93,10 +283,13 @@ class CogActor(Actor):
         :param bodyType:
         :return:
         """
+        if bodyType is None:
+            print("CogActor ERROR: createHead() called without a Body")
+            return
         if self.head is not None:
-            self.head.removeNode()
-        self.head = loader.loadModel(bodyType.headsModel).getChild(0)
-        self.head.reparentTo(self.find("**/joint_head"))
+            LoaderUtils.removeInstances(self.head)
+        self.head = CogAssetCache.copyHeads(bodyType, self.findNode("joint_head"))
+        self._instanceToLODs(self.head, "joint_head")
 
     def createModel(self, bodyType: CogBody, department: Department = None, skelecog=False, lose=False) -> None:
         """
@@ -107,38 +300,241 @@ class CogActor(Actor):
         :param lose: Should the lose model be used? (respects skelecog)
         :return:
         """
-        currModel = self.getPart("modelRoot")
-        if currModel is not None:
-            currModel.removeNode()
-            if self.head is not None:
-                self.head.removeNode()
-                self.head = None
+        if bodyType != self._bodyType:
+            self.clearVariants()
+
+        currModels = self.getBodyModels()
+        if currModels:
+            if self._keepVariants:
+                self._variants[self._modelVariant] = ModelVariant(currModels, [self._nodeIndex, *self._lodIndices],
+                                                                  self._medallionDept, self.head, self.medallion,
+                                                                  self.healthMeter, self.healthMeterGlow)
+                for model in currModels:
+                    model.detachNode()
+            else:
+                for model in currModels:
+                    model.removeNode()
+                if self.head is not None:
+                    self.head.removeNode()
+            self.head = None
+            self.medallion = None
+            self.healthMeter = None
+            self.healthMeterGlow = None
+        elif not self._lodNames and bodyType.lods:
+            # the levels of detail can only be set up before the first model is loaded
+            self._lodNames = LoaderUtils.setupLODs(self, bodyType.lods)
+        if self._lodNames and bodyType.lods and len(bodyType.lods) + 1 == len(self._lodNames):
+            LoaderUtils.setLODDistances(self, bodyType.lods)
 
         self._bodyType = bodyType
-        if not lose:
+        self._modelVariant = (skelecog, lose)
+        self._frozen = False
+
+        variant = self._variants.pop(self._modelVariant, None)
+        if variant is not None:
+            for lodName, model in zip(self.getLODNamesInUse(), variant.models):
+                self.loadModel(model, lodName=lodName, copy=False)
+            self._nodeIndex, *self._lodIndices = variant.nodeIndices
+            self.head = variant.head
+            self.medallion = variant.medallion
+            self.healthMeter = variant.healthMeter
+            self.healthMeterGlow = variant.healthMeterGlow
+            if not lose and department is not None and department != variant.department:
+                self.createMedallion(department)
+        elif not lose:
             if not skelecog:
-                self.loadModel(bodyType.model)
+                self.loadBodyModels(bodyType.model, bodyType.lods)
                 if self.head is None:
                     self.createHead(bodyType)
             else:
-                self.loadModel(bodyType.skelecog.model)
+                self.loadBodyModels(bodyType.skelecog.model, bodyType.skelecog.lods)
 
             self.createHealthMeter()
             if department is not None:
                 self.createMedallion(department)
-
-            if bodyType.animations is not None:
-                self.loadAnims(bodyType.animations)
         else:
             if not skelecog:
-                self.loadModel(bodyType.loseModel)
+                self.loadBodyModels(bodyType.loseModel)
                 if self.head is None:
                     self.createHead(bodyType)
             else:
-                self.loadModel(bodyType.skelecog.loseModel)
+                self.loadBodyModels(bodyType.skelecog.loseModel)
+
+        if not lose:
+            if bodyType.animations is not None:
+                AnimCache.loadAnims(self, bodyType.animations)
+        elif bodyType.animations is not None and bodyType.loseAnim is not None:
+            AnimCache.loadAnims(self, {bodyType.loseAnim: bodyType.animations[bodyType.loseAnim]})
+
+    def loadBodyModels(self, model: str, lods: list[LoaderUtils.ModelLOD] = None) -> None:
+        """
+        Loads a body model into every level of detail of the cog and indexes its nodes.
+        :param model: The most detailed model
+        :param lods: Its lower levels of detail
+        :return:
+        """
+        lodNames = self.getLODNamesInUse()
+        for lodName, path in zip(lodNames, LoaderUtils.getLevelModels(model, lods, len(lodNames))):
+            self.loadModel(path, lodName=lodName)
+        self.buildNodeIndex()
+
+    def getLODNamesInUse(self) -> list[str]:
+        """
+        :return: The names of the cog's levels of detail from the most detailed, or just lodRoot if it has none
+        """
+        return self._lodNames or ["lodRoot"]
+
+    def getBodyModels(self) -> list[NodePath]:
+        """
+        :return: The body model of every level of detail, from the most detailed. Empty if no model is loaded.
+        """
+        if "modelRoot" not in self.getPartNames():
+            return []
+        models = [self.getPart("modelRoot", lodName) for lodName in self.getLODNamesInUse()]
+        return [model for model in models if model is not None]
+
+    def prepareVariants(self) -> None:
+        """
+        Builds every model variant (normal, lose, skelecog and skelecog lose) the Body has, with the current appearance
+        applied, and keeps them loaded so that switching between them later is instant. Enables keepVariants.
+        :return:
+        """
+        if self._bodyType is None:
+            return
+        self.unfreeze()
+        self._keepVariants = True
+        current = (self._isSkelecog, self._isLose)
+
+        wanted = [(False, False)]
+        if self._bodyType.loseModel is not None:
+            wanted.append((False, True))
+        if self._bodyType.skelecog is not None:
+            wanted.append((True, False))
+            if self._bodyType.skelecog.loseModel is not None:
+                wanted.append((True, True))
+
+        for variant in wanted:
+            if variant == current or variant in self._variants:
+                continue
+            self._switchVariant(*variant)
+        self._switchVariant(*current)
+
+    def clearVariants(self) -> None:
+        """
+        Unloads the model variants that aren't currently shown.
+        :return:
+        """
+        for variant in self._variants.values():
+            for model in variant.models:
+                model.removeNode()
+        self._variants.clear()
 
-            if bodyType.animations is not None and bodyType.loseAnim is not None:
-                self.loadAnims({bodyType.loseAnim: bodyType.animations[bodyType.loseAnim]})
+    def _switchVariant(self, skelecog: bool, lose: bool) -> None:
+        self._isSkelecog = skelecog
+        self._isLose = lose
+        self.createModel(self._bodyType, department=self._medallionDept, skelecog=skelecog, lose=lose)
+        self.reapplyTextures()
+        self.reapplyShowingHeads()
+
+    def cleanup(self) -> None:
+        ActorRegistry.unregister(self)
+        self.clearVariants()
+        Actor.cleanup(self)
+
+    def loadModel(self, modelPath, *args, **kwargs) -> None:
+        if isinstance(modelPath, str):
+            PhaseMounter.require(modelPath)
+            modelPath = AssetIndex.resolve(modelPath)
+        ActorRegistry.noteModelLoad(modelPath)
+        Actor.loadModel(self, modelPath, *args, **kwargs)
+
+    def freeze(self) -> LoaderUtils.FreezeReport:
+        """
+        Frees what the current appearance doesn't need, for cogs whose appearance is final: removes the hidden heads,
+        unloads the kept model variants (disabling keepVariants) and flattens the medallion and health meter.
+        Showing another head afterwards calls unfreeze(). Changing models works as usual and unfreezes the cog.
+        :return: How many nodes and Geoms were removed
+        """
+        variants = [model for variant in self._variants.values() for model in variant.models]
+        nodesBefore, geomsBefore = map(sum, zip(*(LoaderUtils.countNodes(model) for model in [self, *variants])))
+        self.clearVariants()
+        self._keepVariants = False
+
+        LoaderUtils.removeStashed(self)
+        if self.medallion is not None:
+            self.medallion.flattenStrong()
+        if self.healthMeter is not None:
+            # the glow is colored separately, so it's flattened on its own
+            for child in self.healthMeter.getChildren():
+                if child != self.healthMeterGlow:
+                    child.flattenStrong()
+            self.healthMeterGlow.flattenStrong()
+        self.buildNodeIndex()
+        self._frozen = True
+
+        nodesAfter, geomsAfter = LoaderUtils.countNodes(self)
+        return LoaderUtils.FreezeReport(nodesBefore - nodesAfter, geomsBefore - geomsAfter)
+
+    def unfreeze(self) -> None:
+        """
+        Reloads the heads removed by freeze().
+        :return:
+        """
+        if not self._frozen:
+            return
+        if self._bodyType is None:
+            # e.g. a frozen cog loaded by fromBaked() without its Body registered
+            print("CogActor ERROR: Can't reload the heads removed by freeze(), the cog's Body isn't known")
+            return
+        self._frozen = False
+        if self.head is None:
+            return
+        self.createHead(self._bodyType)
+        self.setHeadTexture(self._headTexture)
+        self.setHeadColor(self._headColor)
+        self.reapplyShowingHeads()
+
+    def isFrozen(self) -> bool:
+        return self._frozen
+
+    def buildNodeIndex(self) -> None:
+        """
+        Indexes the nodes of the body model by name for findNode(). Called whenever the model is created, you only
+        need to call this if you modify the model manually.
+        :return:
+        """
+        models = self.getBodyModels()
+        self._nodeIndex = LoaderUtils.indexNodes(models[0])
+        self._lodIndices = [LoaderUtils.indexNodes(model) for model in models[1:]]
+
+    def findNode(self, name: str) -> NodePath:
+        """
+        Finds a part or joint of the body model by name without searching the scene graph.
+        :param name:
+        :return: The node in the most detailed level, or an empty NodePath if there is none
+        """
+        node = self._nodeIndex.get(name)
+        if node is None:
+            return self.find(f"**/{name}")
+        return node
+
+    def findNodes(self, name: str) -> list[NodePath]:
+        """
+        Finds a part or joint of the body model in every level of detail.
+        :param name:
+        :return: The node of each level that has it, from the most detailed
+        """
+        node = self.findNode(name)
+        nodes = [] if node.isEmpty() else [node]
+        nodes.extend(index[name] for index in self._lodIndices if name in index)
+        return nodes
+
+    def _instanceToLODs(self, attachment: NodePath, jointName: str) -> None:
+        # attachments are built once on the most detailed level and shared with the other levels
+        for index in self._lodIndices:
+            joint = index.get(jointName)
+            if joint is not None:
+                attachment.instanceTo(joint)
 
     def createMedallion(self, dept: Department) -> None:
         """
@@ -151,20 +547,9 @@ class CogActor(Actor):
         if self._isLose:
             return
         if self.medallion is not None:
-            self.medallion.removeNode()
-        medallion = dept.medallion
-        attachment = self.find("**/joint_attachMeter")
-
-        medallionModel = loader.loadModel(medallion.model)
-        if medallion.part is not None:
-            self.medallion = medallionModel.find(f"**/{medallion.part}").copyTo(attachment)
-        else:
-            self.medallion = medallionModel.copyTo(attachment)
-
-        self.medallion.setPosHprScale(0.02, 0.05, 0.04, 180.0, 0.0, 0.0, 0.51, 0.51, 0.51)
-        if medallion.color is not None:
-            self.medallion.setColor(medallion.color)
-        medallionModel.removeNode()
+            LoaderUtils.removeInstances(self.medallion)
+        self.medallion = CogAssetCache.copyMedallion(dept.medallion, self.findNode("joint_attachMeter"))
+        self._instanceToLODs(self.medallion, "joint_attachMeter")
 
     def createHealthMeter(self) -> None:
         """
@@ -174,24 +559,9 @@ class CogActor(Actor):
         if self._isLose:
             return
         if self.healthMeter is not None:
-            self.healthMeter.removeNode()
-            self.healthMeterGlow.removeNode()
-        model = loader.loadModel(CogGlobals.healthMeterModel)
-        button = model.find("**/minnieCircle").copyTo(self.find("**/joint_attachMeter"))
-        button.setScale(3)
-        button.setH(180)
-        button.setColor(CogGlobals.HealthColor["off"])
-        button.hide()
-        self.healthMeter = button
-
-        glow = loader.loadModel(CogGlobals.healthMeterGlowModel)
-        glow.reparentTo(button)
-        glow.setScale(0.28)
-        glow.setPos(-0.005, 0.01, 0.015)
-        glow.setColor(0.25, 1, 0.25, 0.5)
-        self.healthMeterGlow = glow
-
-        model.removeNode()
+            LoaderUtils.removeInstances(self.healthMeter)
+        self.healthMeter, self.healthMeterGlow = CogAssetCache.copyHealthMeter(self.findNode("joint_attachMeter"))
+        self._instanceToLODs(self.healthMeter, "joint_attachMeter")
 
     def becomeLoseActor(self) -> None:
         """
@@ -202,9 +572,6 @@ class CogActor(Actor):
             print("CogActor: becomeLoseActor() called, but already in the lose state")
             return
         self._isLose = True
-        self.medallion = None
-        self.healthMeter = None
-        self.healthMeterGlow = None
 
         self.createModel(self._bodyType, department=self._medallionDept, skelecog=self._isSkelecog, lose=True)
         self.reapplyTextures()
@@ -224,11 +591,9 @@ class CogActor(Actor):
         self.reapplyTextures()
         self.reapplyShowingHeads()
 
-        self.createHealthMeter()
-
     def setSkelecog(self, skelecog: bool) -> None:
         """
-        Sets whether the cog is a skelecog. This will regenerate the model.
+        Sets whether the cog is a skelecog. This will regenerate the model, unless keepVariants is enabled.
         :param skelecog:
         :return:
         """
@@ -240,10 +605,6 @@ class CogActor(Actor):
         self.reapplyTextures()
         if not skelecog:
             self.reapplyShowingHeads()
-        if not self._isLose:
-            attachment = self.find("**/joint_attachMeter")
-            self.medallion.reparentTo(attachment)
-            self.healthMeter.reparentTo(attachment)
 
     def setHealthMeterColor(self, color: Vec4, glowColor: Vec4 = None) -> None:
         """
@@ -292,6 +653,7 @@ class CogActor(Actor):
         Hides all the parts of the head model.
         :return:
         """
+        self.unfreeze()
         self.showingHeads.clear()
         if self._isSkelecog:
             return
@@ -304,6 +666,7 @@ class CogActor(Actor):
         :param hideOthers: Hide all other head parts?
         :return:
         """
+        self.unfreeze()
         if hideOthers:
             self.hideHeadModels()
         self.showingHeads.append(wantedHead)
@@ -323,11 +686,29 @@ class CogActor(Actor):
         :param tieTex:
         :return:
         """
-        self.setLegTexture(legTex)
-        self.setBlazerTexture(blazerTex)
-        self.setSleeveTexture(sleeveTex)
-        if tieTex is not None:
-            self.setTieTexture(tieTex)
+        self.applyBodyStates(CogStates.getBodyStates(legTex, blazerTex, sleeveTex, tieTex))
+
+    def applyBodyStates(self, states: CogStates.BodyStates) -> None:
+        """
+        Applies compiled body textures, sharing their render states with every other cog using them.
+        :param states:
+        :return:
+        """
+        self._legTexture = states.legTexture
+        self._blazerTexture = states.blazerTexture
+        self._sleeveTexture = states.sleeveTexture
+        if not self._isSkelecog:
+            self._applyBodyState("legs", states.legs)
+            self._applyBodyState("torso", states.torso)
+            self._applyBodyState("arms", states.arms)
+        if states.tieTexture is not None:
+            self._tieTexture = states.tieTexture
+            if self._isSkelecog:
+                self._applyBodyState("tie", states.tie)
+
+    def _applyBodyState(self, name: str, state: RenderState) -> None:
+        for node in self.findNodes(name):
+            CogStates.applyState(node, state)
 
     def setDepartmentTextures(self, dept: Department) -> None:
         """
@@ -335,66 +716,72 @@ class CogActor(Actor):
         :param dept:
         :return:
         """
-        self.setBodyTextures(dept.leg, dept.blazer, dept.sleeve, dept.tie)
+        self.applyBodyStates(CogStates.getDepartmentStates(dept))
 
     def makeWaiter(self) -> None:
         """
         Sets the body textures to the waiter textures (configured in CogGlobals)
         :return:
         """
-        self.setBodyTextures(CogGlobals.waiterLeg, CogGlobals.waiterBlazer, CogGlobals.waiterSleeve)
+        self.applyBodyStates(CogStates.getWaiterStates())
 
     def setLegTexture(self, tex: str | Texture) -> None:
         if not isinstance(tex, Texture):
-            tex = loader.loadTexture(tex)
+            tex = LoaderUtils.loadTexture(tex)
         self._legTexture = tex
         if not self._isSkelecog:
-            self.find("**/legs").setTexture(tex, 1)
+            self._applyBodyState("legs", CogStates.getTextureState(tex))
 
     def setBlazerTexture(self, tex: str | Texture) -> None:
         if not isinstance(tex, Texture):
-            tex = loader.loadTexture(tex)
+            tex = LoaderUtils.loadTexture(tex)
         self._blazerTexture = tex
         if not self._isSkelecog:
-            self.find("**/torso").setTexture(tex, 1)
+            self._applyBodyState("torso", CogStates.getTextureState(tex))
 
     def setSleeveTexture(self, tex: str | Texture) -> None:
         if not isinstance(tex, Texture):
-            tex = loader.loadTexture(tex)
+            tex = LoaderUtils.loadTexture(tex)
         self._sleeveTexture = tex
         if not self._isSkelecog:
-            self.find("**/arms").setTexture(tex, 1)
+            self._applyBodyState("arms", CogStates.getTextureState(tex))
 
     def setTieTexture(self, tex: str | Texture) -> None:
         if not isinstance(tex, Texture):
-            tex = loader.loadTexture(tex)
+            tex = LoaderUtils.loadTexture(tex)
         self._tieTexture = tex
         if self._isSkelecog:
-            self.find("**/tie").setTexture(tex, 1)
+            self._applyBodyState("tie", CogStates.getTextureState(tex))
 
     def setHeadTexture(self, tex: str | Texture | None) -> None:
         if isinstance(tex, str):
-            tex = loader.loadTexture(tex)
+            tex = LoaderUtils.loadTexture(tex)
         self._headTexture = tex
         if not self._isSkelecog:
             if tex is None:
                 self.head.clearTexture()
             else:
-                self.head.setTexture(tex, 1)
+                CogStates.applyState(self.head, CogStates.getTextureState(tex))
 
     def setGloveColor(self, color: Vec4 | None) -> None:
+        self._setGloveState(color, CogStates.getColorState(color) if color is not None else None)
+
+    def setHeadColor(self, color: Vec4 | None) -> None:
+        self._setHeadState(color, CogStates.getColorState(color) if color is not None else None)
+
+    def _setGloveState(self, color: Vec4 | None, state: RenderState | None) -> None:
         self._gloveColor = color
         if not self._isSkelecog:
-            hands = self.find("**/hands")
-            if color is None:
-                hands.clearColor()
+            if state is None:
+                for hands in self.findNodes("hands"):
+                    hands.clearColor()
             else:
-                hands.setColor(color)
+                self._applyBodyState("hands", state)
 
-    def setHeadColor(self, color: Vec4 | None) -> None:
+    def _setHeadState(self, color: Vec4 | None, state: RenderState | None) -> None:
         self._headColor = color
         if self.head is not None:
-            if color is None:
+            if state is None:
                 self.head.clearColor()
             else:
-                self.head.setColor(color)
+                CogStates.applyState(self.head, state)
@@ -0,0 +1,53 @@
+from typing import Hashable
+
+from toontown_utils.ActorPool import ActorPool
+from toontown_utils.cog.CogActor import CogActor
+from toontown_utils.cog.TemplateCog import TemplateCog
+from toontown_utils.cog.CogBody import CogBody
+from toontown_utils.TemplateManager import Cogs
+
+
+class CogActorPool(ActorPool):
+    """
+    Recycles CogActors. Actors are keyed by their Body (and whether they are skelecogs), so a released actor can be
+    re-skinned as any cog of the same Body without reloading its model.
+    """
+    def acquire(self, template: TemplateCog | str, skelecog=False, waiter=False) -> CogActor | None:
+        """
+        Gets an actor for the given cog, reusing a released one if possible. The actor is not parented to anything.
+        :param template: Either the template, or the string name of the template
+        :param skelecog: Should this cog be a skelecog?
+        :param waiter: Should this cog be a waiter?
+        :return: The actor, or None if the template doesn't exist
+        """
+        if isinstance(template, str):
+            try:
+                template = Cogs[template]
+            except KeyError:
+                print(f"CogActorPool: No such cog template {template}")
+                return None
+
+        actor: CogActor = self._take(self.getKey(template.body, skelecog), (template.body, skelecog))
+        if actor is None:
+            return CogActor(template, skelecog=skelecog, waiter=waiter)
+
+        actor.loadTemplate(template)
+        if waiter:
+            actor.makeWaiter()
+        return actor
+
+    def setBodyWatermarks(self, bodyType: CogBody, low: int, high: int, skelecog=False) -> None:
+        self.setWatermarks(self.getKey(bodyType, skelecog), low, high)
+
+    @staticmethod
+    def getKey(bodyType: CogBody, skelecog=False) -> Hashable:
+        return bodyType.model, skelecog
+
+    def getActorKey(self, actor: CogActor) -> Hashable:
+        return self.getKey(actor.getBodyType(), actor.isSkelecog())
+
+    def buildActor(self, bodyType: CogBody, skelecog: bool) -> CogActor:
+        return CogActor(bodyType=bodyType, skelecog=skelecog)
+
+    def resetActor(self, actor: CogActor) -> None:
+        actor.resetState()
@@ -0,0 +1,161 @@
+from collections import OrderedDict
+
+from panda3d.core import NodePath
+
+from toontown_utils import LoaderUtils
+from toontown_utils.cog import CogGlobals
+from toontown_utils.cog.CogBody import CogBody
+from toontown_utils.cog.Department import Medallion
+
+# Prototypes of the sub-trees every CogActor attaches to itself. Each one is built once from the loaded model
+# (with its transform, color, etc. already applied) and actors receive a copy of it.
+# The least recently used prototype is evicted once the cache holds more than maxSize entries.
+maxSize: int = 64
+
+_prototypes: OrderedDict[tuple, NodePath] = OrderedDict()
+
+
+def setMaxSize(size: int) -> None:
+    """
+    Sets the maximum amount of prototypes kept in the cache, evicting the oldest ones if necessary.
+    :param size: The new limit. 0 disables caching.
+    :return:
+    """
+    global maxSize
+    maxSize = size
+    _trim()
+
+
+def getSize() -> int:
+    return len(_prototypes)
+
+
+def clear() -> None:
+    """
+    Removes every cached prototype. Copies already handed out to actors are not affected.
+    :return:
+    """
+    for prototype in _prototypes.values():
+        prototype.removeNode()
+    _prototypes.clear()
+
+
+def invalidate(key: tuple) -> None:
+    prototype = _prototypes.pop(key, None)
+    if prototype is not None:
+        prototype.removeNode()
+
+
+def invalidateBody(bodyType: CogBody) -> None:
+    invalidate(_headsKey(bodyType))
+
+
+def invalidateMedallion(medallion: Medallion) -> None:
+    invalidate(_medallionKey(medallion))
+
+
+def invalidateHealthMeter() -> None:
+    invalidate(_healthMeterKey())
+
+
+def copyHeads(bodyType: CogBody, parent: NodePath) -> NodePath:
+    """
+    Copies the head model of the given Body to parent.
+    :param bodyType:
+    :param parent:
+    :return: The copied head model
+    """
+    key = _headsKey(bodyType)
+    prototype = _fetch(key)
+    if prototype is None:
+        prototype = LoaderUtils.loadModel(bodyType.headsModel).getChild(0)
+        prototype.detachNode()
+        _store(key, prototype)
+    return prototype.copyTo(parent)
+
+
+def copyMedallion(medallion: Medallion, parent: NodePath) -> NodePath:
+    """
+    Copies the medallion to parent, already positioned and colored.
+    :param medallion:
+    :param parent:
+    :return: The copied medallion
+    """
+    key = _medallionKey(medallion)
+    prototype = _fetch(key)
+    if prototype is None:
+        medallionModel = LoaderUtils.loadModel(medallion.model)
+        if medallion.part is not None:
+            prototype = medallionModel.find(f"**/{medallion.part}").copyTo(NodePath())
+        else:
+            prototype = medallionModel.copyTo(NodePath())
+        medallionModel.removeNode()
+
+        prototype.setPosHprScale(0.02, 0.05, 0.04, 180.0, 0.0, 0.0, 0.51, 0.51, 0.51)
+        if medallion.color is not None:
+            prototype.setColor(medallion.color)
+        _store(key, prototype)
+    return prototype.copyTo(parent)
+
+
+def copyHealthMeter(parent: NodePath) -> tuple[NodePath, NodePath]:
+    """
+    Copies the health meter to parent.
+    :param parent:
+    :return: The copied health meter and its glow
+    """
+    key = _healthMeterKey()
+    prototype = _fetch(key)
+    if prototype is None:
+        model = LoaderUtils.loadModel(CogGlobals.healthMeterModel)
+        prototype = model.find("**/minnieCircle").copyTo(NodePath())
+        prototype.setScale(3)
+        prototype.setH(180)
+        prototype.setColor(CogGlobals.HealthColor["off"])
+        prototype.hide()
+        model.removeNode()
+
+        glow = LoaderUtils.loadModel(CogGlobals.healthMeterGlowModel)
+        glow.setName("healthMeterGlow")
+        glow.reparentTo(prototype)
+        glow.setScale(0.28)
+        glow.setPos(-0.005, 0.01, 0.015)
+        glow.setColor(0.25, 1, 0.25, 0.5)
+        _store(key, prototype)
+
+    meter = prototype.copyTo(parent)
+    return meter, meter.find("healthMeterGlow")
+
+
+def _headsKey(bodyType: CogBody) -> tuple:
+    return "heads", bodyType.headsModel
+
+
+def _medallionKey(medallion: Medallion) -> tuple:
+    color = tuple(medallion.color) if medallion.color is not None else None
+    return "medallion", medallion.model, medallion.part, color
+
+
+def _healthMeterKey() -> tuple:
+    return "healthMeter", CogGlobals.healthMeterModel, CogGlobals.healthMeterGlowModel
+
+
+def _fetch(key: tuple) -> NodePath | None:
+    prototype = _prototypes.get(key)
+    if prototype is not None:
+        _prototypes.move_to_end(key)
+    return prototype
+
+
+def _store(key: tuple, prototype: NodePath) -> None:
+    if maxSize <= 0:
+        # caching is disabled, the prototype is only used for this copy
+        return
+    _prototypes[key] = prototype
+    _trim()
+
+
+def _trim() -> None:
+    while len(_prototypes) > max(maxSize, 0):
+        _, prototype = _prototypes.popitem(last=False)
+        prototype.removeNode()
@@ -1,9 +1,12 @@
 from typing import NamedTuple
 
+from toontown_utils.LoaderUtils import ModelLOD
+
 
 class Skelecog(NamedTuple):
     model: str
     loseModel: str = None
+    lods: list[ModelLOD] = None
 
 
 class CogBody(NamedTuple):
@@ -14,3 +17,5 @@ class CogBody(NamedTuple):
     skelecog: Skelecog = None
     loseAnim: str = "lose"
     sizeFactor: float = 1
+    # lower levels of detail of the model
+    lods: list[ModelLOD] = None
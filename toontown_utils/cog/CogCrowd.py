@@ -0,0 +1,103 @@
+from panda3d.core import NodePath, Vec3
+
+from toontown_utils.cog.CogActor import CogActor
+from toontown_utils.cog.TemplateCog import TemplateCog
+
+
+class CogCrowd:
+    """
+    Renders many identical cogs by instancing a few fully set up CogActors instead of building one actor per cog.
+    Each member of the crowd is a node with its own transform that instances one of the actors, so the animation is
+    only evaluated once per actor and the scene graph only grows by one node per member.
+    With more than one phase, members are spread over that many actors playing the animation at evenly spaced
+    offsets, so the crowd doesn't move in lockstep.
+    """
+    def __init__(self, cogType: TemplateCog | str, phases: int = 1, skelecog=False, waiter=False,
+                 parent: NodePath = None) -> None:
+        """
+        CogCrowd constructor.
+        :param cogType: The cog template every member of the crowd uses
+        :param phases: How many actors to build. Members are distributed over them.
+        :param skelecog: Should the crowd be skelecogs?
+        :param waiter: Should the crowd be waiters?
+        :param parent: The node to parent the crowd to
+        """
+        self.root = NodePath("CogCrowd")
+        if parent is not None:
+            self.root.reparentTo(parent)
+
+        self.actors: list[CogActor] = [CogActor(cogType, skelecog=skelecog, waiter=waiter)
+                                       for _ in range(max(phases, 1))]
+        self.members: list[NodePath] = []
+        self._nextPhase = 0
+
+    def addMember(self, pos: Vec3 = None, hpr: Vec3 = None, scale: float = None, phase: int = None) -> NodePath:
+        """
+        Adds a cog to the crowd.
+        :param pos: The member's position relative to the crowd
+        :param hpr: The member's rotation
+        :param scale: The member's scale, relative to the template's size
+        :param phase: Which actor the member instances. If not specified, the actors are used in turn.
+        :return: The member node. It can be moved around like any other node, but shouldn't be given children.
+        """
+        if phase is None:
+            phase = self._nextPhase
+            self._nextPhase = (self._nextPhase + 1) % len(self.actors)
+        actor = self.actors[phase % len(self.actors)]
+
+        member = self.root.attachNewNode(f"member{len(self.members)}")
+        if pos is not None:
+            member.setPos(pos)
+        if hpr is not None:
+            member.setHpr(hpr)
+        if scale is not None:
+            member.setScale(scale)
+        actor.instanceTo(member)
+
+        self.members.append(member)
+        return member
+
+    def addMembers(self, positions: list[Vec3]) -> list[NodePath]:
+        return [self.addMember(pos) for pos in positions]
+
+    def removeMember(self, member: NodePath) -> None:
+        self.members.remove(member)
+        member.removeNode()
+
+    def getNumMembers(self) -> int:
+        return len(self.members)
+
+    def loop(self, animName: str) -> None:
+        """
+        Loops an animation on the whole crowd, offsetting each actor's starting frame by its phase.
+        :param animName:
+        :return:
+        """
+        for i, actor in enumerate(self.actors):
+            actor.loop(animName)
+            if i == 0:
+                continue
+            control = actor.getAnimControl(animName)
+            if control is None:
+                continue
+            control.pose(control.getNumFrames() * i / len(self.actors))
+            control.loop(False)
+
+    def play(self, animName: str) -> None:
+        for actor in self.actors:
+            actor.play(animName)
+
+    def stop(self) -> None:
+        for actor in self.actors:
+            actor.stop()
+
+    def cleanup(self) -> None:
+        """
+        Removes the crowd and destroys its actors.
+        :return:
+        """
+        self.root.removeNode()
+        self.members.clear()
+        for actor in self.actors:
+            actor.cleanup()
+        self.actors.clear()
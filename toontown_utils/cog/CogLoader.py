@@ -1,14 +1,23 @@
+import math
 from typing import Any
 
 from panda3d.core import Vec4
 
 from toontown_utils import LoaderUtils
+from toontown_utils.LazyRegistry import LazyRegistry
+from toontown_utils.TemplateIndex import TemplateIndex
+from toontown_utils.cog import CogGlobals
 
 from toontown_utils.cog.TemplateCog import TemplateCog
 from toontown_utils.cog.Department import Department, Medallion
 from toontown_utils.cog.CogBody import CogBody, Skelecog
 
-Cogs: dict[str, TemplateCog] = {}
+# if enabled, cog templates are kept as raw data until they are first looked up
+lazy: bool = False
+
+Cogs: LazyRegistry[TemplateCog] = LazyRegistry()
+# cog names by department, body, head and size bucket (see getSizeBucket)
+CogIndex = TemplateIndex()
 Departments: dict[str, Department] = {}
 Bodies: dict[str, CogBody] = {}
 
@@ -27,58 +36,125 @@ def readFile(contents: dict[str, dict]) -> None:
         loadCogs(cogs)
 
 
-def loadCogs(cogs: dict[str, Any]) -> None:
-    for cog, data in cogs.items():
-        try:
-            deptName: str = data["department"]
-        except KeyError:
-            print(f"Cog {cog} has no department set!")
-            continue
-
-        try:
-            dept: Department = Departments[deptName]
-        except KeyError:
-            print(f"Cog {cog} is member of unknown department {deptName}")
-            continue
-
-        try:
-            body: str = data["body"]
-        except KeyError:
-            print(f"Cog {cog} has no body set!")
-            continue
+def getModelPaths(bodyType: CogBody, department: Department = None, skelecog=False, lose=False) -> list[str]:
+    """
+    Lists every model and animation file a CogActor with the given appearance loads.
+    :param bodyType:
+    :param department: The department of the medallion
+    :param skelecog:
+    :param lose:
+    :return: The unique paths
+    """
+    paths = []
+    if not skelecog:
+        paths.append(bodyType.loseModel if lose else bodyType.model)
+        paths.append(bodyType.headsModel)
+        if not lose and bodyType.lods is not None:
+            paths.extend(lod.model for lod in bodyType.lods)
+    elif bodyType.skelecog is not None:
+        paths.append(bodyType.skelecog.loseModel if lose else bodyType.skelecog.model)
+        if not lose and bodyType.skelecog.lods is not None:
+            paths.extend(lod.model for lod in bodyType.skelecog.lods)
+
+    if not lose:
+        paths.append(CogGlobals.healthMeterModel)
+        paths.append(CogGlobals.healthMeterGlowModel)
+        if department is not None:
+            paths.append(department.medallion.model)
+        if bodyType.animations is not None:
+            paths.extend(bodyType.animations.values())
+    elif bodyType.animations is not None and bodyType.loseAnim in bodyType.animations:
+        paths.append(bodyType.animations[bodyType.loseAnim])
+
+    return list(dict.fromkeys(path for path in paths if path is not None))
 
-        try:
-            bodyType: CogBody = Bodies[body]
-        except KeyError:
-            print(f"Cog {cog} has unknown body {body}")
-            continue
 
-        try:
-            headColor = LoaderUtils.readColor(data.get("headColor"))
-
-            gloveColor: list | Vec4 = data.get("gloveColor", dept.gloveColor)
-            if gloveColor is None:
-                gloveColor = Vec4(0, 0, 0, 1)
-                print(
-                    f"Cog {cog} does not have a gloveColor set, and {deptName} does not have a default glove color.")
-            if isinstance(gloveColor, list):
-                gloveColor = LoaderUtils.readColor(gloveColor)
-
-            headTexture = LoaderUtils.addExtensionIfMissing(data.get("headTexture"), LoaderUtils.defaultTextureExtension)
-
-            Cogs[cog] = TemplateCog(
-                name=cog,
-                department=dept,
-                body=bodyType,
-                size=data["size"],
-                gloveColor=gloveColor,
-                head=data["head"],
-                head2=data.get("head2"),
-                headTexture=headTexture,
-                headColor=headColor
-            )
-        except KeyError as e:
-            print(f"Cog {cog} is missing required field {e.args[0]}.")
+def loadCogs(cogs: dict[str, Any]) -> None:
+    for cog, data in cogs.items():
+        if lazy:
+            Cogs.addRaw(cog, data, buildCog)
+        else:
+            template = buildCog(cog, data)
+            if template is None:
+                continue
+            Cogs[cog] = template
+        indexCog(cog, data)
+
+
+def indexCog(cog: str, data: dict[str, Any]) -> None:
+    heads = [head for head in (data.get("head"), data.get("head2")) if head is not None]
+    size = data.get("size")
+    CogIndex.add(cog, department=(data.get("department"),), body=(data.get("body"),), head=heads,
+                 size=(getSizeBucket(size),) if isinstance(size, (int, float)) else ())
+
+
+def getSizeBucket(size: float) -> int:
+    """
+    Cogs are indexed by their size rounded down to a whole number.
+    :param size:
+    :return:
+    """
+    return math.floor(size)
+
+
+def buildCog(cog: str, data: dict[str, Any]) -> TemplateCog | None:
+    """
+    Builds a cog template from its JSON data. Its department and body must already be loaded.
+    :param cog: The name of the cog
+    :param data:
+    :return: The template, or None if the data is invalid
+    """
+    try:
+        deptName: str = data["department"]
+    except KeyError:
+        print(f"Cog {cog} has no department set!")
+        return None
+
+    try:
+        dept: Department = Departments[deptName]
+    except KeyError:
+        print(f"Cog {cog} is member of unknown department {deptName}")
+        return None
+
+    try:
+        body: str = data["body"]
+    except KeyError:
+        print(f"Cog {cog} has no body set!")
+        return None
+
+    try:
+        bodyType: CogBody = Bodies[body]
+    except KeyError:
+        print(f"Cog {cog} has unknown body {body}")
+        return None
+
+    try:
+        headColor = LoaderUtils.readColor(data.get("headColor"))
+
+        gloveColor: list | Vec4 = data.get("gloveColor", dept.gloveColor)
+        if gloveColor is None:
+            gloveColor = Vec4(0, 0, 0, 1)
+            print(
+                f"Cog {cog} does not have a gloveColor set, and {deptName} does not have a default glove color.")
+        if isinstance(gloveColor, list):
+            gloveColor = LoaderUtils.readColor(gloveColor)
+
+        headTexture = LoaderUtils.addExtensionIfMissing(data.get("headTexture"), LoaderUtils.defaultTextureExtension)
+
+        return TemplateCog(
+            name=cog,
+            department=dept,
+            body=bodyType,
+            size=data["size"],
+            gloveColor=gloveColor,
+            head=data["head"],
+            head2=data.get("head2"),
+            headTexture=headTexture,
+            headColor=headColor
+        )
+    except KeyError as e:
+        print(f"Cog {cog} is missing required field {e.args[0]}.")
+        return None
 
 
 def loadDepartments(depts: dict[str, Any]) -> None:
@@ -123,7 +199,8 @@ def loadBodies(bodies: dict[str, Any]) -> None:
                     skeleLoseModel = LoaderUtils.addExtensionIfMissing(skelecogData.get("loseModel"), LoaderUtils.defaultModelExtension)
                     skelecog = Skelecog(
                         LoaderUtils.addExtensionIfMissing(skelecogData["model"], LoaderUtils.defaultModelExtension),
-                        skeleLoseModel
+                        skeleLoseModel,
+                        LoaderUtils.readLODs(skelecogData.get("lods"))
                     )
                 except KeyError as e:
                     print(f"Body {bodyType} skelecog is missing required field {e.args[0]}, skipping.")
@@ -135,7 +212,8 @@ def loadBodies(bodies: dict[str, Any]) -> None:
                 loseModel=loseModel,
                 skelecog=skelecog,
                 loseAnim=data.get("loseAnim", "lose"),
-                sizeFactor=data.get("sizeFactor", 1)
+                sizeFactor=data.get("sizeFactor", 1),
+                lods=LoaderUtils.readLODs(data.get("lods"))
             )
         except KeyError as e:
             print(f"Body {bodyType} is missing required field {e.args[0]}.")
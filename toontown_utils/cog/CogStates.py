@@ -0,0 +1,133 @@
+from __future__ import annotations
+from typing import NamedTuple
+
+from panda3d.core import NodePath, RenderState, Texture, TextureAttrib, TextureStage, ColorAttrib, Vec4
+
+from toontown_utils import LoaderUtils
+from toontown_utils.cog import CogGlobals
+from toontown_utils.cog.Department import Department
+from toontown_utils.cog.TemplateCog import TemplateCog
+
+# Render states shared by every cog with the same appearance. Departments, the waiter textures and cog templates are
+# compiled once into states that actors compose onto their nodes in one step, so cogs of the same department end up
+# with the very same states instead of each building their own.
+
+# texture and color states, by texture pointer or color
+_states: dict[tuple, RenderState] = {}
+_bodies: dict[tuple, BodyStates] = {}
+# the templates hold unhashable dicts, they're kept alive next to their states so their ids stay unique
+_templates: dict[int, tuple[TemplateCog, TemplateStates]] = {}
+
+
+class BodyStates(NamedTuple):
+    """
+    The body textures of a department (or of the waiters), and the states applying them.
+    """
+    legTexture: Texture
+    blazerTexture: Texture
+    sleeveTexture: Texture
+    tieTexture: Texture | None
+    legs: RenderState
+    torso: RenderState
+    arms: RenderState
+    tie: RenderState | None
+
+
+class TemplateStates(NamedTuple):
+    """
+    Everything a cog template changes on the look of an actor that has its model.
+    """
+    body: BodyStates
+    gloves: RenderState | None
+    head: RenderState | None
+    headTexture: Texture | None
+
+
+def getTextureState(tex: Texture) -> RenderState:
+    """
+    :param tex:
+    :return: A state overriding the texture of a node, like setTexture(tex, 1)
+    """
+    # the state keeps the texture alive, so its pointer stays unique
+    key = ("texture", tex.this)
+    state = _states.get(key)
+    if state is None:
+        state = _states[key] = RenderState.make(TextureAttrib.make().addOnStage(TextureStage.getDefault(), tex, 1))
+    return state
+
+
+def getColorState(color: Vec4) -> RenderState:
+    """
+    :param color:
+    :return: A state setting the color of a node, like setColor(color)
+    """
+    key = ("color", *color)
+    state = _states.get(key)
+    if state is None:
+        state = _states[key] = RenderState.make(ColorAttrib.makeFlat(color))
+    return state
+
+
+def getBodyStates(leg: str | Texture, blazer: str | Texture, sleeve: str | Texture,
+                  tie: str | Texture = None) -> BodyStates:
+    key = (leg, blazer, sleeve, tie)
+    states = _bodies.get(key)
+    if states is None:
+        legTexture, blazerTexture, sleeveTexture = (_getTexture(tex) for tex in (leg, blazer, sleeve))
+        tieTexture = _getTexture(tie) if tie is not None else None
+        states = BodyStates(legTexture, blazerTexture, sleeveTexture, tieTexture,
+                            getTextureState(legTexture), getTextureState(blazerTexture),
+                            getTextureState(sleeveTexture),
+                            getTextureState(tieTexture) if tieTexture is not None else None)
+        _bodies[key] = states
+    return states
+
+
+def getDepartmentStates(dept: Department) -> BodyStates:
+    return getBodyStates(dept.leg, dept.blazer, dept.sleeve, dept.tie)
+
+
+def getWaiterStates() -> BodyStates:
+    return getBodyStates(CogGlobals.waiterLeg, CogGlobals.waiterBlazer, CogGlobals.waiterSleeve)
+
+
+def getTemplateStates(template: TemplateCog) -> TemplateStates:
+    entry = _templates.get(id(template))
+    if entry is not None and entry[0] is template:
+        return entry[1]
+
+    states = TemplateStates(
+        getDepartmentStates(template.department),
+        getColorState(template.gloveColor) if template.gloveColor is not None else None,
+        getColorState(template.headColor) if template.headColor is not None else None,
+        _getTexture(template.headTexture) if template.headTexture is not None else None
+    )
+    _templates[id(template)] = (template, states)
+    return states
+
+
+def applyState(node: NodePath, state: RenderState) -> None:
+    """
+    Composes a shared state onto a node. Composing the same pair of states again is a lookup in Panda3D's
+    composition cache, so this doesn't create new states once every cog of an appearance has been through it.
+    :param node:
+    :param state:
+    :return:
+    """
+    node.setState(node.getState().compose(state))
+
+
+def clear() -> None:
+    """
+    Forgets every compiled state, e.g. after reloading the templates. Actors keep the states they already have.
+    :return:
+    """
+    _states.clear()
+    _bodies.clear()
+    _templates.clear()
+
+
+def _getTexture(tex: str | Texture) -> Texture:
+    if isinstance(tex, Texture):
+        return tex
+    return LoaderUtils.loadTexture(tex)
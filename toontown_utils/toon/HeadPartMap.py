@@ -0,0 +1,76 @@
+from panda3d.core import NodePath
+
+from toontown_utils import LoaderUtils
+
+# every model analyzed so far, by model path and container path
+_maps: dict[tuple[str, tuple[int, ...]], "HeadPartMap"] = {}
+
+
+class HeadPartMap:
+    """
+    Where each named node of a head model (or of an extra muzzle/eyelash model) is, as the child indices leading to it
+    from the model root. Every copy of a model has the same layout, so the map is built once per model and nodes are
+    then found by walking their path instead of searching the whole model.
+    Stashed nodes are included, with negative indices.
+    """
+    def __init__(self, root: NodePath, container: tuple[int, ...]) -> None:
+        """
+        Analyzes a freshly loaded model. It must not have been modified yet.
+        :param root:
+        :param container: The path of the node whose children are stashed when building a head
+        """
+        self.container = container
+        self.paths: dict[str, tuple[int, ...]] = {}
+
+        # breadth first, so that the shallowest node wins like with find()
+        level = [(root, ())]
+        while level:
+            nextLevel = []
+            for node, path in level:
+                for i, child in enumerate(node.getChildren()):
+                    nextLevel.append((child, path + (i,)))
+                for i, child in enumerate(node.getStashedChildren()):
+                    nextLevel.append((child, path + (-i - 1,)))
+            for child, path in nextLevel:
+                self.paths.setdefault(child.getName(), path)
+            level = nextLevel
+
+    def resolve(self, root: NodePath, names: list[str]) -> dict[str, NodePath]:
+        """
+        Finds nodes of a copy of the model by name. Must be called before anything in the copy is stashed.
+        :param root: The root of the copy
+        :param names:
+        :return: The node of every name, empty if the model has no such node
+        """
+        nodes = {}
+        for name in names:
+            path = self.paths.get(name)
+            nodes[name] = LoaderUtils.walk(root, path) if path is not None else NodePath()
+        return nodes
+
+    def stashContainer(self, root: NodePath) -> None:
+        LoaderUtils.walk(root, self.container).getChildren().stash()
+
+
+def getPartMap(model: str, root: NodePath, container: tuple[int, ...]) -> HeadPartMap:
+    """
+    Gets the map of a model, analyzing it if this is the first time the model is used.
+    :param model: The model path
+    :param root: A freshly loaded copy of the model
+    :param container: The path of the node whose children are stashed when building a head
+    :return:
+    """
+    key = (model, container)
+    partMap = _maps.get(key)
+    if partMap is None:
+        partMap = HeadPartMap(root, container)
+        _maps[key] = partMap
+    return partMap
+
+
+def clear() -> None:
+    """
+    Forgets every analyzed model. Call this if a model file changes.
+    :return:
+    """
+    _maps.clear()
@@ -2,7 +2,9 @@ from panda3d.core import NodePath, Vec4, Texture
 
 from direct.actor.Actor import Actor
 
-from toontown_utils import TemplateManager
+from toontown_utils import TemplateManager, LoaderUtils, AnimCache, ActorRegistry, AssetIndex, PhaseMounter, ActorBaker
+from toontown_utils.toon import ToonLoader, HeadPartMap, ToonCache
+from toontown_utils.toon.ToonDNA import ToonDNA, COLOR_FIELDS
 
 from toontown_utils.toon.ToonSpecies import ToonSpecies
 from toontown_utils.toon.ToonPart import ToonPart
@@ -11,175 +13,680 @@ from toontown_utils.toon.ToonHead import ToonHead, Eyelashes
 
 class ToonActor(Actor):
     def __init__(self, species: ToonSpecies | str, head: str | ToonHead, torso: str | ToonPart, legs: ToonPart | str,
-                 clothingType: str = "skirt", eyelashes: bool = False) -> None:
-        Actor.__init__(self)
-        if isinstance(species, str):
-            species = TemplateManager.Species[species]
+                 clothingType: str = "skirt", eyelashes: bool = False, cache: bool = False) -> None:
+        """
+        ToonActor constructor.
+        If the torso or legs have levels of detail, the toon becomes an LOD actor that switches between them by
+        distance, using the distances of the part with the most levels. The head is shared by every level.
+        :param cache: Should the toon be copied from the ToonCache? Toons with the same appearance are then only
+        assembled once, into a toon kept by the cache, and every toon with that appearance is copied from it. The first
+        toon of an appearance costs a copy on top of the assembly, so only enable it for appearances that repeat.
+        """
+        # the names of the parts, if they were given by name
+        names = tuple(part if isinstance(part, str) else None for part in (species, head, torso, legs))
+        species, head, torso, legs = self.resolveParts(species, head, torso, legs, clothingType)
+
+        prototype: ToonActor = None
+        if cache and ToonCache.maxSize > 0:
+            prototype = ToonCache.getPrototype(
+                ToonCache.getKey(species, head, torso, legs, eyelashes),
+                lambda: ToonActor(species, head, torso, legs, eyelashes=eyelashes, cache=False).prepareCopySource())
+            Actor.__init__(self, other=prototype)
+        else:
+            Actor.__init__(self)
+        ActorRegistry.register(self)
 
-        if isinstance(torso, str):
-            torso = TemplateManager.getTorso(torso, clothingType)
+        self._setupState(species, head, torso, legs, clothingType, eyelashes, names)
 
-        if isinstance(legs, str):
-            legs = TemplateManager.getLegs(legs, clothingType)
+        if prototype is not None:
+            self.copyModel(prototype)
+        else:
+            self.createModel(species, self.headType, self.torsoType, self.legsType, eyelashes)
 
-        self.headType = species.heads[head]
+    def _setupState(self, species: ToonSpecies, head: ToonHead, torso: ToonPart, legs: ToonPart, clothingType: str,
+                    eyelashes: bool, names: tuple[str | None, ...]) -> None:
+        # sets up everything but the model, for the constructor and fromBaked()
+        self.species = species
+        self.headType = head
         self.torsoType = torso
         self.legsType = legs
+        self.clothingType = clothingType
+        self.eyelashes = eyelashes
+        self._names = names
+        # colors and textures set on the toon, by ToonDNA field
+        self._appearance: dict[str, Vec4 | str] = {}
 
         self.head: NodePath = None
         self.muzzles: dict[str, NodePath] = {}
+        self.currentMuzzle = "neutral"
+        self.lashesModel: NodePath = None
         self.leftPupil: NodePath = None
         self.rightPupil: NodePath = None
 
         self.torso: NodePath = None
         self.legs: NodePath = None
+        # the node indices of each part, one per level of detail
+        self._nodeIndex: dict[str, list[dict[str, NodePath]]] = {}
+        # the names of the levels of detail, from the most detailed, empty if the toon isn't an LOD actor
+        self._lodNames: list[str] = []
+        # paths to the stashed nodes, pupils and muzzles, only set on toons in the ToonCache
+        self._copyPaths: dict = None
+        self._frozen = False
+
+    @classmethod
+    async def create(cls, species: ToonSpecies | str, head: str | ToonHead, torso: str | ToonPart,
+                     legs: ToonPart | str, clothingType: str = "skirt", eyelashes: bool = False,
+                     parent: NodePath = None, cache: bool = False) -> "ToonActor":
+        """
+        Asynchronously creates a ToonActor. Every model and animation it needs is loaded in parallel on Panda3D's
+        loader threads first, so that building the actor afterwards doesn't stall the frame on disk access.
+        Use it with await inside a coroutine, or pass it to taskMgr.add() and await/poll the returned task.
+        Takes the same arguments as the constructor.
+        :param parent: The node to parent the actor to once it is fully built.
+        :return: The new actor
+        """
+        species, head, torso, legs = cls.resolveParts(species, head, torso, legs, clothingType)
+        await LoaderUtils.loadModelsAsync(ToonLoader.getModelPaths(head, torso, legs, eyelashes))
+
+        actor = cls(species, head, torso, legs, clothingType=clothingType, eyelashes=eyelashes, cache=cache)
+        if parent is not None:
+            actor.reparentTo(parent)
+        return actor
+
+    @staticmethod
+    def resolveParts(species: ToonSpecies | str, head: str | ToonHead, torso: str | ToonPart, legs: ToonPart | str,
+                     clothingType: str = "skirt") -> tuple[ToonSpecies, ToonHead, ToonPart, ToonPart]:
+        """
+        Looks up any parts given by name in the TemplateManager.
+        :return: The species, head, torso and legs templates
+        """
+        if isinstance(species, str):
+            species = TemplateManager.Species[species]
+
+        if isinstance(head, str):
+            head = species.heads[head]
+
+        if isinstance(torso, str):
+            torso = TemplateManager.getTorso(torso, clothingType)
+
+        if isinstance(legs, str):
+            legs = TemplateManager.getLegs(legs, clothingType)
 
-        self.createModel(species, self.headType, self.torsoType, self.legsType, eyelashes)
+        return species, head, torso, legs
+
+    def resetState(self) -> None:
+        """
+        Returns the actor to a neutral state without unloading its model, so that it can be reused for another toon
+        with the same parts. Stops animations, resets the transform, shows the neutral muzzle and clears all colors and
+        textures set on the body parts.
+        :return:
+        """
+        self.stop()
+        self.clearTransform()
+        self.clearColorScale()
+        self._appearance.clear()
+        self.show()
+        self.setScale(self.species.size)
+
+        if "neutral" in self.muzzles:
+            self.showMuzzle("neutral")
+
+        for pieceName in ("legs", "feet", "torso-top", "sleeves", "torso-bot"):
+            for piece in self.findNodes("legs", pieceName):
+                piece.clearColor()
+        for pieceName in ("arms", "neck", "hands", "torso-top", "sleeves", "torso-bot"):
+            for piece in self.findNodes("torso", pieceName):
+                piece.clearColor()
+                piece.clearTexture()
+        for partName in self.headType.colorParts:
+            part: NodePath = self.findNode("head", partName)
+            if not part.isEmpty():
+                part.clearColor()
+        eyes = self.findNode("head", self.headType.eyes)
+        if not eyes.isEmpty():
+            eyes.clearTexture()
 
     def createModel(self, species: ToonSpecies, head: ToonHead, torso: ToonPart, legs: ToonPart, eyelashes: bool) -> None:
+        lods = max(torso.lods or [], legs.lods or [], key=len)
+        if lods and not self._lodNames and not self.getPartNames():
+            # the levels of detail can only be set up before the first model is loaded
+            self._lodNames = LoaderUtils.setupLODs(self, lods)
         self.createHead(head, eyelashes)
         self.createTorso(torso)
         self.createLegs(legs)
         self.setScale(species.size)
 
+    def copyModel(self, prototype: "ToonActor") -> None:
+        """
+        Picks up the parts, pupils and muzzles of a model copied from a toon in the ToonCache by the Actor copy
+        constructor, and stashes what the original toon had stashed.
+        :param prototype: The toon the model was copied from, see prepareCopySource()
+        :return:
+        """
+        self._lodNames = list(prototype._lodNames)
+        lodName = self.getLODNamesInUse()[0]
+        self.legs = self.getPart("legs", lodName)
+        self.torso = self.getPart("torso", lodName)
+        self.head = self.getPart("head", lodName)
+
+        # every node is found before anything is stashed, stashing changes the paths
+        paths = prototype._copyPaths
+        stashed = [LoaderUtils.walk(self, path) for path in paths["stashed"]]
+        self.leftPupil = LoaderUtils.walk(self.head, paths["leftPupil"])
+        self.rightPupil = LoaderUtils.walk(self.head, paths["rightPupil"])
+        self.muzzles = {muzzle: LoaderUtils.walk(self.head, path) for muzzle, path in paths["muzzles"].items()}
+        if paths["lashesModel"] is not None:
+            self.lashesModel = LoaderUtils.walk(self.head, paths["lashesModel"])
+        for node in stashed:
+            node.stash()
+
+        for partName in ("legs", "torso", "head"):
+            self.buildNodeIndex(partName)
+        if self._lodNames:
+            self.attachTorso()
+            self.attachHead()
+
+    def prepareCopySource(self) -> "ToonActor":
+        """
+        Prepares the toon to be copied by copyModel(). Copying a node skips its stashed children, so every stashed node
+        is unstashed and its path remembered for the copies to stash it again. The toon itself shouldn't be shown
+        afterwards.
+        :return: The toon
+        """
+        # the toon now belongs to the ToonCache rather than to the game
+        ActorRegistry.unregister(self)
+        # the lower levels of detail share the joints of the most detailed one, which copying only handles for parts
+        # directly below their level: they're taken apart here and put back together by copyModel()
+        for neck in self.findNodes("torso", "def_head")[1:]:
+            neck.node().removeChild(self.head.node())
+        for lodName, torso in zip(self._lodNames[1:], self.getParts("torso")[1:]):
+            torso.reparentTo(self.getLOD(lodName))
+
+        stashed = []
+        stack = [NodePath(self)]
+        while stack:
+            node = stack.pop()
+            stashed.extend(node.getStashedChildren())
+            stack.extend(node.getStashedChildren())
+            stack.extend(node.getChildren())
+        for node in stashed:
+            node.unstash()
+
+        self._copyPaths = {
+            "stashed": [LoaderUtils.pathTo(self, node) for node in stashed],
+            "leftPupil": LoaderUtils.pathTo(self.head, self.leftPupil),
+            "rightPupil": LoaderUtils.pathTo(self.head, self.rightPupil),
+            "muzzles": {muzzle: LoaderUtils.pathTo(self.head, node) for muzzle, node in self.muzzles.items()},
+            "lashesModel": LoaderUtils.pathTo(self.head, self.lashesModel) if self.lashesModel is not None else None,
+        }
+        return self
+
+    def cleanup(self) -> None:
+        ActorRegistry.unregister(self)
+        Actor.cleanup(self)
+
+    def loadModel(self, modelPath, *args, **kwargs) -> None:
+        if isinstance(modelPath, str):
+            PhaseMounter.require(modelPath)
+            modelPath = AssetIndex.resolve(modelPath)
+        ActorRegistry.noteModelLoad(modelPath)
+        Actor.loadModel(self, modelPath, *args, **kwargs)
+
     def createLegs(self, legsPart: ToonPart) -> None:
-        self.loadModel(legsPart.model, "legs")
-        self.loadAnims(legsPart.anims, "legs")
-        self.legs = self.getPart("legs")
+        self.loadPartModels("legs", legsPart)
+        AnimCache.loadAnims(self, legsPart.anims, "legs")
+        self.legs = self.getPart("legs", self.getLODNamesInUse()[0])
+        self.buildNodeIndex("legs")
 
-        self.legs.find("**/shoes").stash()
-        self.legs.find("**/boots_short").stash()
-        self.legs.find("**/boots_long").stash()
+        for pieceName in ("shoes", "boots_short", "boots_long"):
+            for piece in self.findNodes("legs", pieceName):
+                piece.stash()
 
         if self.torso is not None:
-            self.torso.reparentTo(self.legs.find("**/joint_hips"))
+            self.attachTorso()
 
     def createTorso(self, torsoPart: ToonPart) -> None:
-        self.loadModel(torsoPart.model, "torso")
-        self.loadAnims(torsoPart.anims, "torso")
-        self.torso = self.getPart("torso")
+        self.loadPartModels("torso", torsoPart)
+        AnimCache.loadAnims(self, torsoPart.anims, "torso")
+        self.torso = self.getPart("torso", self.getLODNamesInUse()[0])
+        self.buildNodeIndex("torso")
 
         if self.legs is not None:
-            self.torso.reparentTo(self.legs.find("**/joint_hips"))
+            self.attachTorso()
         if self.head is not None:
-            self.head.reparentTo(self.torso.find("**/def_head"))
+            self.attachHead()
+
+    def loadPartModels(self, partName: str, part: ToonPart) -> None:
+        """
+        Loads the model of the legs or torso into every level of detail of the toon.
+        :param partName: legs or torso
+        :param part:
+        :return:
+        """
+        lodNames = self.getLODNamesInUse()
+        for lodName, model in zip(lodNames, LoaderUtils.getLevelModels(part.model, part.lods, len(lodNames))):
+            self.loadModel(model, partName, lodName)
+
+    def attachTorso(self) -> None:
+        for level, torso in enumerate(self.getParts("torso")):
+            torso.reparentTo(self.findNode("legs", "joint_hips", level))
+
+    def attachHead(self) -> None:
+        # the head is only loaded into the most detailed level, the other levels show instances of it
+        self.head.reparentTo(self.findNode("torso", "def_head"))
+        for level in range(1, len(self._lodNames)):
+            neck = self.findNode("torso", "def_head", level)
+            if not neck.isEmpty():
+                self.head.instanceTo(neck)
+
+    def getLODNamesInUse(self) -> list[str]:
+        """
+        :return: The names of the toon's levels of detail from the most detailed, or just lodRoot if it has none
+        """
+        return self._lodNames or ["lodRoot"]
+
+    def getParts(self, partName: str) -> list[NodePath]:
+        """
+        :param partName: legs, torso or head
+        :return: The part in every level of detail that has it, from the most detailed
+        """
+        lodNames = self.getLODNamesInUse()
+        if partName == "head":
+            # the head is only loaded into the most detailed level
+            lodNames = lodNames[:1]
+        parts = [self.getPart(partName, lodName) for lodName in lodNames]
+        return [part for part in parts if part is not None]
 
     def createHead(self, head: ToonHead, eyelashes: bool = False) -> None:
         # TODO: maybe remove nodes instead of stashing them
-        self.loadModel(head.model, "head")
+        self.loadModel(head.model, "head", self.getLODNamesInUse()[0])
         if head.anims is not None:
-            self.loadAnims(head.anims, "head")
-        self.head: NodePath = self.getPart("head")
+            AnimCache.loadAnims(self, head.anims, "head")
+        self.head: NodePath = self.getPart("head", self.getLODNamesInUse()[0])
+
+        # TODO: dirty fix, do this better
+        container = () if self.head.getNumChildren() > 1 else (0,)
+        partMap = HeadPartMap.getPartMap(head.model, self.head, container)
+        # every node is found before anything is stashed, stashing changes the paths
+        names = [*head.colorParts, head.leftPupil, head.rightPupil, head.eyes, head.eyelashes.closed]
+        if head.keepParts is not None:
+            names.extend(head.keepParts)
+        if head.muzzles is not None:
+            names.extend(head.muzzles.values())
+        parts = partMap.resolve(self.head, names)
 
         if not head.keepAllParts:
-            # TODO: dirty fix, do this better
-            if self.head.getNumChildren() > 1:
-                self.head.getChildren().stash()
-            else:
-                self.head.getChildren()[0].getChildren().stash()
+            partMap.stashContainer(self.head)
             if head.keepParts is not None:
                 for part in head.keepParts:
-                    partNode: NodePath = self.head.find(f"**/{part};+s")
+                    partNode: NodePath = parts[part]
                     if partNode.isEmpty():
                         continue
                     partNode.unstash()
 
         for part in head.colorParts:
-            partNode: NodePath = self.head.find(f"**/{part};+s")
+            partNode: NodePath = parts[part]
             if partNode.isEmpty():
                 continue
             partNode.unstash()
 
-        self.leftPupil = self.head.find(f"**/{head.leftPupil};+s")
+        self.leftPupil = parts[head.leftPupil]
         self.leftPupil.unstash()
-        self.rightPupil = self.head.find(f"**/{head.rightPupil};+s")
+        self.rightPupil = parts[head.rightPupil]
         self.rightPupil.unstash()
-        self.head.find(f"**/{head.eyes};+s").unstash()
+        parts[head.eyes].unstash()
 
-        self.createMuzzles(head)
+        self.createMuzzles(head, parts)
 
         if eyelashes:
-            self.createEyelashes(head.eyelashes)
+            self.createEyelashes(head.eyelashes, parts)
 
-        if self.torso is not None:
-            self.head.reparentTo(self.torso.find("**/def_head"))
+        self.buildNodeIndex("head")
 
-    def createEyelashes(self, lashes: Eyelashes) -> None:
+        if self.torso is not None:
+            self.attachHead()
+
+    def createEyelashes(self, lashes: Eyelashes, parts: dict[str, NodePath] = None) -> None:
+        """
+        :param lashes:
+        :param parts: Nodes of the head by name, as found by createHead(). Searched for if not given.
+        :return:
+        """
         if lashes.model:
-            eyelashes = loader.loadModel(lashes.model)
-            eyelashes.getChildren()[0].getChildren().stash()
-            eyelashes.find(f"**/{lashes.open};+s").unstash()
+            eyelashes = LoaderUtils.loadModel(lashes.model)
+            lashMap = HeadPartMap.getPartMap(lashes.model, eyelashes, (0,))
+            openLashes = lashMap.resolve(eyelashes, [lashes.open])[lashes.open]
+            lashMap.stashContainer(eyelashes)
+            openLashes.unstash()
             eyelashes.reparentTo(self.head)
+            self.lashesModel = eyelashes
+        elif parts is not None:
+            parts[lashes.closed].stash()
         else:
             self.head.find(f"**/{lashes.closed};+s").stash()
 
-    def createMuzzles(self, head: ToonHead) -> None:
+    def createMuzzles(self, head: ToonHead, parts: dict[str, NodePath] = None) -> None:
+        """
+        :param head:
+        :param parts: Nodes of the head by name, as found by createHead(). Searched for if not given.
+        :return:
+        """
         self.muzzles = {}
         if head.muzzles is not None:
             for muzzle, part in head.muzzles.items():
-                muzzleNode: NodePath = self.head.find(f"**/{part};+s")
+                muzzleNode: NodePath = parts[part] if parts is not None else self.head.find(f"**/{part};+s")
                 self.muzzles[muzzle] = muzzleNode
                 muzzleNode.stash()
 
         if head.extraMuzzles is not None:
             for model, muzzles in head.extraMuzzles.items():
-                node: NodePath = loader.loadModel(model)
-                node.getChildren()[0].getChildren().stash()
-                node.reparentTo(self.head)
+                node: NodePath = LoaderUtils.loadModel(model)
+                muzzleMap = HeadPartMap.getPartMap(model, node, (0,))
+                muzzleNodes = muzzleMap.resolve(node, list(muzzles.values()))
                 for muzzle, part in muzzles.items():
-                    self.muzzles[muzzle] = node.find(f"**/{part};+s")
+                    self.muzzles[muzzle] = muzzleNodes[part]
+                muzzleMap.stashContainer(node)
+                node.reparentTo(self.head)
 
         self.muzzles["neutral"].unstash()
+        self.currentMuzzle = "neutral"
+
+    def freeze(self) -> LoaderUtils.FreezeReport:
+        """
+        Frees what the current appearance doesn't need, for toons whose appearance is final: removes every stashed
+        node (unused head parts, eyelashes, shoes and boots) and flattens the eyelash model. The muzzles are kept, so
+        the toon can still change expressions.
+        :return: How many nodes and Geoms were removed
+        """
+        nodesBefore, geomsBefore = LoaderUtils.countNodes(self)
+        LoaderUtils.removeStashed(self, list(self.muzzles.values()))
+        if self.lashesModel is not None:
+            self.lashesModel.flattenStrong()
+        for partName in ("legs", "torso", "head"):
+            self.buildNodeIndex(partName)
+        self._frozen = True
+
+        nodesAfter, geomsAfter = LoaderUtils.countNodes(self)
+        return LoaderUtils.FreezeReport(nodesBefore - nodesAfter, geomsBefore - geomsAfter)
+
+    def unfreeze(self) -> None:
+        """
+        Rebuilds the model of a toon frozen by freeze(), keeping its transform, colors and textures. Stops animations.
+        :return:
+        """
+        if not self._frozen:
+            return
+        self._frozen = False
+
+        dna = self.toDNA()
+        transform = self.getTransform()
+        self.stop()
+        lodNames = self.getLODNamesInUse()
+        for partName in ("head", "torso", "legs"):
+            self.removePart(partName, lodNames[0])
+        # the animations removed with the parts are shared by every level, so the other levels only have their models
+        # removed, they're replaced when the model is created again
+        for lodName in lodNames[1:]:
+            for partName in ("torso", "legs"):
+                self.getPart(partName, lodName).removeNode()
+        self.head = None
+        self.torso = None
+        self.legs = None
+        self.lashesModel = None
+        self._nodeIndex.clear()
+
+        self.createModel(self.species, self.headType, self.torsoType, self.legsType, self.eyelashes)
+        self.setTransform(transform)
+        self.applyDNA(dna)
+
+    def isFrozen(self) -> bool:
+        return self._frozen
+
+    def buildNodeIndex(self, partName: str) -> None:
+        """
+        Indexes the nodes of a part by name for findNode(). Called whenever a part is created, you only need to call
+        this if you modify the part manually.
+        :param partName: legs, torso or head
+        :return:
+        """
+        self._nodeIndex[partName] = [LoaderUtils.indexNodes(part) for part in self.getParts(partName)]
+
+    def findNode(self, partName: str, name: str, level: int = 0) -> NodePath:
+        """
+        Finds a node of a part by name without searching the scene graph.
+        :param partName: legs, torso or head
+        :param name:
+        :param level: The level of detail to search, 0 being the most detailed
+        :return: The node, or an empty NodePath if there is none
+        """
+        indices = self._nodeIndex.get(partName, [])
+        node = indices[level].get(name) if level < len(indices) else None
+        if node is None:
+            part = self.getPart(partName, self.getLODNamesInUse()[level])
+            return part.find(f"**/{name}") if part is not None else NodePath()
+        return node
+
+    def findNodes(self, partName: str, name: str) -> list[NodePath]:
+        """
+        Finds a node of a part in every level of detail.
+        :param partName: legs, torso or head
+        :param name:
+        :return: The node of each level that has it, from the most detailed
+        """
+        nodes = (self.findNode(partName, name, level) for level in range(len(self.getLODNamesInUse())))
+        return [node for node in nodes if not node.isEmpty()]
 
     def showMuzzle(self, muzzle: str) -> None:
         for node in self.muzzles.values():
             node.stash()
         self.muzzles[muzzle].unstash()
+        self.currentMuzzle = muzzle
 
     def setEyesTexture(self, tex: Texture) -> None:
-        self.head.find(f"**/{self.headType.eyes}").setTexture(tex, 1)
+        self.findNode("head", self.headType.eyes).setTexture(tex, 1)
 
     def setLegsColor(self, color: Vec4) -> None:
+        self._appearance["legsColor"] = color
         for pieceName in ("legs", "feet"):
-            piece = self.legs.find(f"**/{pieceName}")
-            piece.setColor(color)
+            for piece in self.findNodes("legs", pieceName):
+                piece.setColor(color)
 
     def setTorsoColor(self, color: Vec4) -> None:
+        self._appearance["torsoColor"] = color
         for pieceName in ("arms", "neck"):
-            piece = self.torso.find(f"**/{pieceName}")
-            piece.setColor(color)
+            for piece in self.findNodes("torso", pieceName):
+                piece.setColor(color)
 
     def setHeadColor(self, color: Vec4) -> None:
+        self._appearance["headColor"] = color
         for partName in self.headType.colorParts:
-            part: NodePath = self.head.find(f"**/{partName}")
+            part: NodePath = self.findNode("head", partName)
             if part.isEmpty():
                 continue
             part.setColor(color)
 
     def setGlovesColor(self, color: Vec4) -> None:
-        gloves = self.torso.find("**/hands")
-        gloves.setColor(color)
+        self._appearance["glovesColor"] = color
+        for gloves in self.findNodes("torso", "hands"):
+            gloves.setColor(color)
 
     def setTopColor(self, color: Vec4) -> None:
+        self._appearance["topColor"] = color
         for pieceName in ("torso-top", "sleeves"):
-            piece = self.legs.find(f"**/{pieceName}")
-            piece.setColor(color)
+            for piece in self.findNodes("torso", pieceName):
+                piece.setColor(color)
 
     def setBottomColor(self, color: Vec4) -> None:
-        piece = self.legs.find("**/torso-bot")
-        piece.setColor(color)
+        self._appearance["bottomColor"] = color
+        for piece in self.findNodes("torso", "torso-bot"):
+            piece.setColor(color)
 
     def setBottomTexture(self, tex: Texture | str) -> None:
+        self._appearance["bottomTexture"] = tex if isinstance(tex, str) else tex.getFilename().getFullpath()
         if not isinstance(tex, Texture):
-            tex = loader.loadTexture(tex)
-        self.torso.find("**/torso-bot").setTexture(tex, 1)
+            tex = LoaderUtils.loadTexture(tex)
+        for piece in self.findNodes("torso", "torso-bot"):
+            piece.setTexture(tex, 1)
 
     def setTopTexture(self, tex: Texture | str) -> None:
+        self._appearance["topTexture"] = tex if isinstance(tex, str) else tex.getFilename().getFullpath()
         if not isinstance(tex, Texture):
-            tex = loader.loadTexture(tex)
-        self.torso.find("**/torso-top").setTexture(tex, 1)
+            tex = LoaderUtils.loadTexture(tex)
+        for piece in self.findNodes("torso", "torso-top"):
+            piece.setTexture(tex, 1)
 
     def setSleeveTexture(self, tex: Texture | str) -> None:
+        self._appearance["sleeveTexture"] = tex if isinstance(tex, str) else tex.getFilename().getFullpath()
         if not isinstance(tex, Texture):
-            tex = loader.loadTexture(tex)
-        self.torso.find("**/sleeves").setTexture(tex, 1)
+            tex = LoaderUtils.loadTexture(tex)
+        for piece in self.findNodes("torso", "sleeves"):
+            piece.setTexture(tex, 1)
+
+    def bake(self, path: str, embedTextures=False) -> bool:
+        """
+        Writes the toon as it is assembled, with its colors, clothing textures, muzzle and eyelashes, to a single BAM
+        file that fromBaked() loads back in one go.
+        Only toons made of templates loaded in the TemplateManager can be baked, as they're found again by name.
+        :param path: The .bam file to write
+        :param embedTextures: Should the textures be stored in the file? They're loaded by path otherwise, like the
+        textures of the models.
+        :return: Whether the file was written
+        """
+        dna = self.toDNA()
+        parts = [dna.species, dna.head, dna.torso, dna.legs]
+        if None in parts:
+            print("ToonActor: bake() called, but the toon isn't made of templates loaded in the TemplateManager")
+            return False
+
+        metadata = {
+            "templates": parts,
+            "clothingType": self.clothingType,
+            "eyelashes": self.eyelashes,
+            "appearance": {field: ActorBaker.encodeColor(value) if field in COLOR_FIELDS else value
+                           for field, value in self._appearance.items()},
+            "frozen": self._frozen,
+            "currentMuzzle": self.currentMuzzle,
+            "lodDistances": ActorBaker.getLODDistances(self, self._lodNames),
+            "scale": list(self.getScale()),
+            "nodes": {
+                "leftPupil": LoaderUtils.pathTo(self.head, self.leftPupil),
+                "rightPupil": LoaderUtils.pathTo(self.head, self.rightPupil),
+                "muzzles": {muzzle: LoaderUtils.pathTo(self.head, node) for muzzle, node in self.muzzles.items()},
+                "lashesModel": None if self.lashesModel is None else LoaderUtils.pathTo(self.head, self.lashesModel),
+            },
+        }
+        return ActorBaker.write(self, path, "toon", metadata, embedTextures)
+
+    @classmethod
+    def fromBaked(cls, path: str) -> "ToonActor | None":
+        """
+        Creates a toon from a file written by bake(), loading its whole model at once.
+        Its templates must be loaded in the TemplateManager, like for a ToonDNA.
+        :param path:
+        :return: The new actor, None if the file couldn't be loaded
+        """
+        baked = ActorBaker.read(path, "toon")
+        if baked is None:
+            return None
+        data = baked.metadata
+        try:
+            species, head, torso, legs = cls.resolveParts(*data["templates"], data["clothingType"])
+        except KeyError as e:
+            print(f"ToonActor: Can't load the baked toon {path}, {e} isn't loaded in the TemplateManager")
+            return None
+
+        actor = cls.__new__(cls)
+        Actor.__init__(actor)
+        ActorRegistry.register(actor)
+        actor._setupState(species, head, torso, legs, data["clothingType"], data["eyelashes"],
+                          tuple(data["templates"]))
+
+        actor._lodNames = ActorBaker.setupLODs(actor, data["lodDistances"])
+        for partName, lodName, model in baked.parts:
+            if partName == "head":
+                # the head is instanced to every level, attachHead() instances it again
+                LoaderUtils.removeInstances(model)
+                model = NodePath(model.node())
+            actor.loadModel(model, partName, lodName, copy=False)
+
+        lodName = actor.getLODNamesInUse()[0]
+        actor.legs = actor.getPart("legs", lodName)
+        actor.torso = actor.getPart("torso", lodName)
+        actor.head = actor.getPart("head", lodName)
+        for partName in ("legs", "torso", "head"):
+            actor.buildNodeIndex(partName)
+        actor.attachTorso()
+        actor.attachHead()
+
+        nodes = data["nodes"]
+        actor.leftPupil = LoaderUtils.walk(actor.head, nodes["leftPupil"])
+        actor.rightPupil = LoaderUtils.walk(actor.head, nodes["rightPupil"])
+        actor.muzzles = {muzzle: LoaderUtils.walk(actor.head, nodePath)
+                         for muzzle, nodePath in nodes["muzzles"].items()}
+        if nodes["lashesModel"] is not None:
+            actor.lashesModel = LoaderUtils.walk(actor.head, nodes["lashesModel"])
+        actor.currentMuzzle = data["currentMuzzle"]
+        actor._frozen = data["frozen"]
+        actor._appearance = {field: ActorBaker.decodeColor(value) if field in COLOR_FIELDS else value
+                             for field, value in data["appearance"].items()}
+
+        actor.setScale(*data["scale"])
+        AnimCache.loadAnims(actor, legs.anims, "legs")
+        AnimCache.loadAnims(actor, torso.anims, "torso")
+        if head.anims is not None:
+            AnimCache.loadAnims(actor, head.anims, "head")
+        return actor
+
+    @classmethod
+    def fromDNA(cls, dna: ToonDNA, cache: bool = False) -> "ToonActor":
+        """
+        Creates a toon with the appearance described by the DNA.
+        :param dna:
+        :param cache: See the constructor
+        :return: The new actor
+        """
+        actor = cls(dna.species, dna.head, dna.torso, dna.legs, clothingType=dna.clothingType,
+                    eyelashes=dna.eyelashes, cache=cache)
+        actor.applyDNA(dna)
+        return actor
+
+    def applyDNA(self, dna: ToonDNA) -> None:
+        """
+        Applies the colors and textures of the DNA. Its parts are ignored, they can only be set when creating the toon.
+        :param dna:
+        :return:
+        """
+        setters = {
+            "headColor": self.setHeadColor,
+            "torsoColor": self.setTorsoColor,
+            "legsColor": self.setLegsColor,
+            "glovesColor": self.setGlovesColor,
+            "topColor": self.setTopColor,
+            "bottomColor": self.setBottomColor,
+            "topTexture": self.setTopTexture,
+            "bottomTexture": self.setBottomTexture,
+            "sleeveTexture": self.setSleeveTexture,
+        }
+        for field, setter in setters.items():
+            value = getattr(dna, field)
+            if value is not None:
+                setter(value)
+
+    def toDNA(self) -> ToonDNA:
+        """
+        :return: The DNA of the toon's parts and of every color and texture set on it
+        """
+        speciesName, headName, torsoName, legsName = self._names
+        if speciesName is None:
+            speciesName = TemplateManager.findName(TemplateManager.Species, self.species)
+        if headName is None:
+            headName = TemplateManager.findName(self.species.heads, self.headType)
+        if torsoName is None:
+            torsoName = TemplateManager.findName(TemplateManager.Torsos.get(self.clothingType, {}), self.torsoType) or \
+                        TemplateManager.findName(TemplateManager.Torsos["all"], self.torsoType)
+        if legsName is None:
+            legsName = TemplateManager.findName(TemplateManager.Legs.get(self.clothingType, {}), self.legsType) or \
+                       TemplateManager.findName(TemplateManager.Legs["all"], self.legsType)
+        return ToonDNA(speciesName, headName, torsoName, legsName, self.clothingType, self.eyelashes,
+                       **self._appearance)
+
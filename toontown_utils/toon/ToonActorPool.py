@@ -0,0 +1,42 @@
+from typing import Hashable
+
+from toontown_utils.ActorPool import ActorPool
+from toontown_utils.toon.ToonActor import ToonActor
+from toontown_utils.toon.ToonSpecies import ToonSpecies
+from toontown_utils.toon.ToonPart import ToonPart
+from toontown_utils.toon.ToonHead import ToonHead
+
+
+class ToonActorPool(ActorPool):
+    """
+    Recycles ToonActors. Actors are keyed by all of their parts, so only toons that look the same (apart from colors
+    and textures) can be reused for each other.
+    """
+    def acquire(self, species: ToonSpecies | str, head: str | ToonHead, torso: str | ToonPart, legs: ToonPart | str,
+                clothingType: str = "skirt", eyelashes: bool = False) -> ToonActor:
+        """
+        Gets an actor for the given toon, reusing a released one if possible. The actor is not parented to anything.
+        Takes the same arguments as the ToonActor constructor.
+        :return: The actor
+        """
+        species, head, torso, legs = ToonActor.resolveParts(species, head, torso, legs, clothingType)
+        actor: ToonActor = self._take(self.getKey(species, head, torso, legs, eyelashes),
+                                      (species, head, torso, legs, eyelashes))
+        if actor is None:
+            actor = self.buildActor(species, head, torso, legs, eyelashes)
+        return actor
+
+    @staticmethod
+    def getKey(species: ToonSpecies, head: ToonHead, torso: ToonPart, legs: ToonPart, eyelashes: bool) -> Hashable:
+        # the templates hold dicts so they can't be hashed, but they stay alive as long as a pooled actor uses them
+        return id(species), id(head), id(torso), id(legs), eyelashes
+
+    def getActorKey(self, actor: ToonActor) -> Hashable:
+        return self.getKey(actor.species, actor.headType, actor.torsoType, actor.legsType, actor.eyelashes)
+
+    def buildActor(self, species: ToonSpecies, head: ToonHead, torso: ToonPart, legs: ToonPart,
+                   eyelashes: bool) -> ToonActor:
+        return ToonActor(species, head, torso, legs, eyelashes=eyelashes)
+
+    def resetActor(self, actor: ToonActor) -> None:
+        actor.resetState()
@@ -0,0 +1,92 @@
+from __future__ import annotations
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Callable, NamedTuple
+
+if TYPE_CHECKING:
+    from toontown_utils.toon.ToonActor import ToonActor
+    from toontown_utils.toon.ToonHead import ToonHead
+    from toontown_utils.toon.ToonPart import ToonPart
+    from toontown_utils.toon.ToonSpecies import ToonSpecies
+
+# Fully assembled toons, one per appearance (species, head, torso, legs and eyelashes). ToonActors created with
+# cache=True and an appearance that is already cached are copied from it instead of being assembled from their parts.
+# The least recently used toon is evicted once the cache holds more than maxSize entries.
+maxSize: int = 32
+
+hits: int = 0
+misses: int = 0
+
+_prototypes: OrderedDict[tuple, ToonActor] = OrderedDict()
+
+
+class CacheStats(NamedTuple):
+    hits: int
+    misses: int
+    size: int
+
+
+def setMaxSize(size: int) -> None:
+    """
+    Sets the maximum amount of toons kept in the cache, evicting the oldest ones if necessary.
+    :param size: The new limit. 0 disables caching.
+    :return:
+    """
+    global maxSize
+    maxSize = size
+    trim(maxSize)
+
+
+def getStats() -> CacheStats:
+    return CacheStats(hits, misses, len(_prototypes))
+
+
+def resetStats() -> None:
+    global hits, misses
+    hits = 0
+    misses = 0
+
+
+def clear() -> None:
+    """
+    Destroys every cached toon. Toons already copied from them are not affected.
+    :return:
+    """
+    trim(0)
+
+
+def trim(size: int) -> None:
+    """
+    Evicts the least recently used toons until at most size are left, e.g. when memory is running low.
+    :param size:
+    :return:
+    """
+    while len(_prototypes) > max(size, 0):
+        _, prototype = _prototypes.popitem(last=False)
+        prototype.cleanup()
+
+
+def getKey(species: ToonSpecies, head: ToonHead, torso: ToonPart, legs: ToonPart, eyelashes: bool) -> tuple:
+    # the templates hold unhashable dicts, the cached toon keeps them alive so their ids stay unique
+    return id(species), id(head), id(torso), id(legs), eyelashes
+
+
+def getPrototype(key: tuple, build: Callable[[], ToonActor]) -> ToonActor:
+    """
+    Gets the cached toon with the given appearance, building it if it isn't cached.
+    :param key: See getKey()
+    :param build: Builds a toon with the appearance, without using the cache
+    :return: The cached toon. It must not be modified, only copied.
+    """
+    global hits, misses
+    prototype = _prototypes.get(key)
+    if prototype is not None:
+        hits += 1
+        _prototypes.move_to_end(key)
+        return prototype
+
+    misses += 1
+    prototype = build()
+    prototype.detachNode()
+    _prototypes[key] = prototype
+    trim(maxSize)
+    return prototype
@@ -0,0 +1,188 @@
+from __future__ import annotations
+import struct
+from typing import Iterable
+
+from panda3d.core import Vec4
+
+from toontown_utils import TemplateManager
+
+COLOR_FIELDS = ("headColor", "torsoColor", "legsColor", "glovesColor", "topColor", "bottomColor")
+TEXTURE_FIELDS = ("topTexture", "bottomTexture", "sleeveTexture")
+
+# species, head, torso, legs, clothing type, flags, 6 RGBA8 colors, 3 texture indices
+_record = struct.Struct("<HHHHBB6I3H")
+RECORD_SIZE = _record.size
+# amount of clothing types, amount of textures, amount of records
+_header = struct.Struct("<HHI")
+_stringLength = struct.Struct("<H")
+
+_NO_TEXTURE = 0xFFFF
+_EYELASHES_FLAG = 1
+
+
+class ToonDNA:
+    """
+    The complete appearance of a toon: its parts, colors and clothing textures.
+    Records are encoded to a fixed size binary form that stores species, heads and parts as indices into the loaded
+    templates (sorted by name), so the decoding side needs to have loaded the same templates. The clothing types and
+    textures used by a batch of records are written in its header, so they don't depend on the decoding side.
+    Colors that are None were never set. Encoded colors are rounded to 8 bits per channel.
+    """
+    __slots__ = ("species", "head", "torso", "legs", "clothingType", "eyelashes",
+                 "headColor", "torsoColor", "legsColor", "glovesColor", "topColor", "bottomColor",
+                 "topTexture", "bottomTexture", "sleeveTexture")
+
+    def __init__(self, species: str, head: str, torso: str, legs: str, clothingType: str = "skirt",
+                 eyelashes: bool = False, headColor: Vec4 = None, torsoColor: Vec4 = None, legsColor: Vec4 = None,
+                 glovesColor: Vec4 = None, topColor: Vec4 = None, bottomColor: Vec4 = None, topTexture: str = None,
+                 bottomTexture: str = None, sleeveTexture: str = None) -> None:
+        self.species = species
+        self.head = head
+        self.torso = torso
+        self.legs = legs
+        self.clothingType = clothingType
+        self.eyelashes = eyelashes
+
+        self.headColor = headColor
+        self.torsoColor = torsoColor
+        self.legsColor = legsColor
+        self.glovesColor = glovesColor
+        self.topColor = topColor
+        self.bottomColor = bottomColor
+
+        self.topTexture = topTexture
+        self.bottomTexture = bottomTexture
+        self.sleeveTexture = sleeveTexture
+
+    def encode(self) -> bytes:
+        return encodeMany((self,))
+
+    @staticmethod
+    def decode(data: bytes) -> ToonDNA:
+        return decodeMany(data)[0]
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, ToonDNA):
+            return NotImplemented
+        return all(getattr(self, field) == getattr(other, field) for field in self.__slots__)
+
+    def __repr__(self) -> str:
+        fields = ", ".join(f"{field}={getattr(self, field)!r}" for field in self.__slots__
+                           if getattr(self, field) is not None)
+        return f"ToonDNA({fields})"
+
+
+class _Tables:
+    """
+    The name <-> index tables of the loaded templates, built once per batch.
+    """
+    def __init__(self) -> None:
+        self.species = sorted(TemplateManager.Species)
+        self.speciesIndices = {name: i for i, name in enumerate(self.species)}
+        self.clothingTypes = sorted(TemplateManager.Legs)
+        self._heads: dict[str, list[str]] = {}
+        self._parts: dict[tuple[str, str], list[str]] = {}
+
+    def getHeads(self, species: str) -> list[str]:
+        heads = self._heads.get(species)
+        if heads is None:
+            heads = self._heads[species] = sorted(TemplateManager.Species[species].heads)
+        return heads
+
+    def getParts(self, area: str, clothingType: str) -> list[str]:
+        parts = self._parts.get((area, clothingType))
+        if parts is None:
+            parts = self._parts[(area, clothingType)] = sorted(TemplateManager.queryParts(area, clothingType))
+        return parts
+
+
+def encodeMany(records: Iterable[ToonDNA]) -> bytes:
+    """
+    Encodes DNA records into one buffer: a header listing the clothing types and textures of the batch, then
+    RECORD_SIZE bytes per record.
+    :param records:
+    :return:
+    """
+    tables = _Tables()
+    clothingIndices = {name: i for i, name in enumerate(tables.clothingTypes)}
+    textureIndices: dict[str, int] = {}
+    buffer = bytearray()
+    count = 0
+    for dna in records:
+        flags = _EYELASHES_FLAG if dna.eyelashes else 0
+        colors = []
+        for i, field in enumerate(COLOR_FIELDS):
+            color = getattr(dna, field)
+            if color is not None:
+                flags |= 2 << i
+            colors.append(_packColor(color))
+        textureIndex = []
+        for field in TEXTURE_FIELDS:
+            path = getattr(dna, field)
+            textureIndex.append(_NO_TEXTURE if path is None else textureIndices.setdefault(path, len(textureIndices)))
+        buffer += _record.pack(
+            tables.speciesIndices[dna.species],
+            tables.getHeads(dna.species).index(dna.head),
+            tables.getParts("torsos", dna.clothingType).index(dna.torso),
+            tables.getParts("legs", dna.clothingType).index(dna.legs),
+            clothingIndices[dna.clothingType],
+            flags,
+            *colors,
+            *textureIndex
+        )
+        count += 1
+
+    header = bytearray(_header.pack(len(tables.clothingTypes), len(textureIndices), count))
+    for string in (*tables.clothingTypes, *textureIndices):
+        encoded = string.encode("utf-8")
+        header += _stringLength.pack(len(encoded))
+        header += encoded
+    return bytes(header + buffer)
+
+
+def decodeMany(data: bytes) -> list[ToonDNA]:
+    """
+    Decodes a buffer written by encodeMany().
+    :param data:
+    :return: The records
+    """
+    tables = _Tables()
+    numClothingTypes, numTextures, count = _header.unpack_from(data)
+    offset = _header.size
+    strings = []
+    for _ in range(numClothingTypes + numTextures):
+        length, = _stringLength.unpack_from(data, offset)
+        offset += _stringLength.size
+        strings.append(bytes(data[offset:offset + length]).decode("utf-8"))
+        offset += length
+    clothingTypes = strings[:numClothingTypes]
+    textures = strings[numClothingTypes:]
+
+    records = []
+    body = data[offset:offset + count * RECORD_SIZE]
+    for species, head, torso, legs, clothing, flags, *rest in _record.iter_unpack(body):
+        speciesName = tables.species[species]
+        clothingType = clothingTypes[clothing]
+        dna = ToonDNA(speciesName, tables.getHeads(speciesName)[head], tables.getParts("torsos", clothingType)[torso],
+                      tables.getParts("legs", clothingType)[legs], clothingType, bool(flags & _EYELASHES_FLAG))
+        for i, field in enumerate(COLOR_FIELDS):
+            if flags & (2 << i):
+                setattr(dna, field, _unpackColor(rest[i]))
+        for field, index in zip(TEXTURE_FIELDS, rest[len(COLOR_FIELDS):]):
+            if index != _NO_TEXTURE:
+                setattr(dna, field, textures[index])
+        records.append(dna)
+    return records
+
+
+def _packColor(color: Vec4 | None) -> int:
+    if color is None:
+        return 0
+    if len(color) == 3:
+        color = (*color, 1)
+    r, g, b, a = (min(max(round(component * 255), 0), 255) for component in color)
+    return r << 24 | g << 16 | b << 8 | a
+
+
+def _unpackColor(value: int) -> Vec4:
+    return Vec4((value >> 24) / 255, (value >> 16 & 0xFF) / 255, (value >> 8 & 0xFF) / 255, (value & 0xFF) / 255)
@@ -1,20 +1,28 @@
-from typing import Any
+from functools import partial
+from typing import Any, Iterable
 
 from toontown_utils import LoaderUtils
+from toontown_utils.LazyRegistry import LazyRegistry
+from toontown_utils.TemplateIndex import TemplateIndex
 from toontown_utils.toon.ToonPart import ToonPart
 from toontown_utils.toon.ToonSpecies import ToonSpecies
 from toontown_utils.toon.ToonHead import ToonHead, Eyelashes
 
-Species: dict[str, ToonSpecies] = {}
-Legs: dict[str, dict[str, ToonPart]] = {
-    "all": {},
-    "shorts": {},
-    "skirt": {}
+# if enabled, species, heads and parts are kept as raw data until they are first looked up
+lazy: bool = False
+
+Species: LazyRegistry[ToonSpecies] = LazyRegistry()
+# (species, head) pairs by species and head name
+HeadIndex = TemplateIndex()
+Legs: dict[str, LazyRegistry[ToonPart]] = {
+    "all": LazyRegistry(),
+    "shorts": LazyRegistry(),
+    "skirt": LazyRegistry()
 }
-Torsos: dict[str, dict[str, ToonPart]] = {
-    "all": {},
-    "shorts": {},
-    "skirt": {}
+Torsos: dict[str, LazyRegistry[ToonPart]] = {
+    "all": LazyRegistry(),
+    "shorts": LazyRegistry(),
+    "skirt": LazyRegistry()
 }
 
 
@@ -28,6 +36,30 @@ def readFile(contents: dict[str, dict]) -> None:
         loadSpecies(species)
 
 
+def getModelPaths(head: ToonHead, torso: ToonPart, legs: ToonPart, eyelashes: bool = False) -> list[str]:
+    """
+    Lists every model and animation file a ToonActor with the given parts loads.
+    :param head:
+    :param torso:
+    :param legs:
+    :param eyelashes:
+    :return: The unique paths
+    """
+    paths = [head.model, torso.model, legs.model]
+    for part in (torso, legs):
+        if part.lods is not None:
+            paths.extend(lod.model for lod in part.lods)
+    for anims in (head.anims, torso.anims, legs.anims):
+        if anims is not None:
+            paths.extend(anims.values())
+    if head.extraMuzzles is not None:
+        paths.extend(head.extraMuzzles.keys())
+    if eyelashes and head.eyelashes.model:
+        paths.append(head.eyelashes.model)
+
+    return list(dict.fromkeys(path for path in paths if path is not None))
+
+
 def loadAllParts(parts: dict[str, dict[str, dict[str, Any]]]) -> None:
     areaParts = parts.get("legs")
     if areaParts is not None:
@@ -46,37 +78,86 @@ def loadAllParts(parts: dict[str, dict[str, dict[str, Any]]]) -> None:
             loadParts(catData, Torsos[cat])
 
 
-def loadParts(parts: dict[str, Any], partDict: dict[str, ToonPart]) -> None:
+def loadParts(parts: dict[str, Any], partDict: LazyRegistry[ToonPart]) -> None:
     for part, data in parts.items():
-        try:
-            animations = data.get("anims")
-            if animations is not None:
-                LoaderUtils.addExtensions(animations, LoaderUtils.defaultModelExtension)
-            else:
-                print(f"WARN: ToonPart {part} has no animations.")
-            partDict[part] = ToonPart(
-                model=LoaderUtils.addExtensionIfMissing(data["model"], LoaderUtils.defaultModelExtension),
-                anims=animations)
-        except KeyError as e:
-            print(f"ToonPart {part} is missing required field {e.args[0]}.")
+        if lazy:
+            partDict.addRaw(part, data, buildPart)
+            continue
+        template = buildPart(part, data)
+        if template is not None:
+            partDict[part] = template
+
+
+def buildPart(part: str, data: dict[str, Any]) -> ToonPart | None:
+    try:
+        animations = data.get("anims")
+        if animations is not None:
+            LoaderUtils.addExtensions(animations, LoaderUtils.defaultModelExtension)
+        else:
+            print(f"WARN: ToonPart {part} has no animations.")
+        return ToonPart(
+            model=LoaderUtils.addExtensionIfMissing(data["model"], LoaderUtils.defaultModelExtension),
+            anims=animations,
+            lods=LoaderUtils.readLODs(data.get("lods")))
+    except KeyError as e:
+        print(f"ToonPart {part} is missing required field {e.args[0]}.")
+        return None
 
 
 def loadSpecies(species: dict[str, dict[str, Any]]):
     for speciesName, data in species.items():
-        try:
-            heads: dict[str, ToonHead] = {}
-            for head, headData in data["heads"].items():
-                try:
-                    heads[head] = loadHead(headData)
-                except KeyError as e:
-                    print(f"{speciesName} head {head} is missing required field {e.args[0]}.")
-
-            Species[speciesName] = ToonSpecies(
-                heads=heads,
-                size=data.get("size", 1)
-            )
-        except KeyError as e:
-            print(f"Species {speciesName} is missing required field {e.args[0]}.")
+        if lazy:
+            Species.addRaw(speciesName, data, buildSpecies)
+            heads = data.get("heads", {})
+        else:
+            template = buildSpecies(speciesName, data)
+            if template is None:
+                continue
+            Species[speciesName] = template
+            heads = template.heads
+        indexSpecies(speciesName, heads)
+
+
+def indexSpecies(speciesName: str, heads: Iterable[str]) -> None:
+    for key in HeadIndex.query(species=speciesName):
+        HeadIndex.remove(key)
+    for head in heads:
+        HeadIndex.add((speciesName, head), species=(speciesName,), head=(head,))
+
+
+def buildSpecies(speciesName: str, data: dict[str, Any]) -> ToonSpecies | None:
+    """
+    Builds a species template from its JSON data. In lazy mode, its heads are only built when they are looked up.
+    :param speciesName:
+    :param data:
+    :return: The template, or None if the data is invalid
+    """
+    try:
+        headBuilder = partial(buildHead, speciesName)
+        heads: dict[str, ToonHead] | LazyRegistry[ToonHead] = LazyRegistry() if lazy else {}
+        for head, headData in data["heads"].items():
+            if lazy:
+                heads.addRaw(head, headData, headBuilder)
+                continue
+            headTemplate = headBuilder(head, headData)
+            if headTemplate is not None:
+                heads[head] = headTemplate
+
+        return ToonSpecies(
+            heads=heads,
+            size=data.get("size", 1)
+        )
+    except KeyError as e:
+        print(f"Species {speciesName} is missing required field {e.args[0]}.")
+        return None
+
+
+def buildHead(speciesName: str, head: str, data: dict[str, Any]) -> ToonHead | None:
+    try:
+        return loadHead(data)
+    except KeyError as e:
+        print(f"{speciesName} head {head} is missing required field {e.args[0]}.")
+        return None
 
 
 def loadHead(data: dict[str, Any]) -> ToonHead:
@@ -1,6 +1,10 @@
 from typing import NamedTuple
 
+from toontown_utils.LoaderUtils import ModelLOD
+
 
 class ToonPart(NamedTuple):
     model: str
     anims: dict[str, str]
+    # lower levels of detail of the model
+    lods: list[ModelLOD] = None